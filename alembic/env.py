@@ -13,9 +13,18 @@ if str(PROJECT_ROOT) not in sys.path:
 from app.db.base import Base
 from app.models.auth_magic_link_token import AuthMagicLinkToken  # noqa: F401
 from app.models.auth_refresh_token import AuthRefreshToken  # noqa: F401
+from app.models.email_outbox import EmailOutbox  # noqa: F401
 from app.models.fit_scan import FitScan  # noqa: F401
 from app.models.ngo_profile import NGOProfile  # noqa: F401
+from app.models.rate_limit_window import RateLimitWindow  # noqa: F401
+from app.models.usage_archived_total import UsageArchivedTotal  # noqa: F401
+from app.models.usage_counter import UsageCounter  # noqa: F401
+from app.models.usage_daily import UsageDaily  # noqa: F401
+from app.models.usage_daily_by_plan import UsageDailyByPlan  # noqa: F401
+from app.models.usage_idempotency_key import UsageIdempotencyKey  # noqa: F401
 from app.models.usage_ledger import UsageLedger  # noqa: F401
+from app.models.usage_reservation import UsageReservation  # noqa: F401
+from app.models.usage_rollup_watermark import UsageRollupWatermark  # noqa: F401
 from app.models.user import User  # noqa: F401
 from app.models.user_plan import UserPlan  # noqa: F401
 
@@ -0,0 +1,114 @@
+"""Create usage_counters table and backfill from usage_ledger.
+
+Revision ID: 0007_usage_counters
+Revises: 0006_fit_scans
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0007_usage_counters"
+down_revision: Union[str, Sequence[str], None] = "0006_fit_scans"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Counter key for FREE (lifetime) usage; must match app.models.usage_counter.
+LIFETIME_PERIOD_START = "1970-01-01 00:00:00+00"
+
+
+def _table_exists(inspector: sa.Inspector, table_name: str) -> bool:
+    return table_name in inspector.get_table_names()
+
+
+def _column_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def _align_user_plans(inspector: sa.Inspector) -> None:
+    # 0005 created billing_period_* columns while the UserPlan model (and quota code)
+    # reads plan_activated_at/current_period_*; add the model columns, keep the old ones.
+    existing_columns = _column_names(inspector, "user_plans")
+    if "plan_activated_at" not in existing_columns:
+        op.add_column(
+            "user_plans",
+            sa.Column(
+                "plan_activated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+        )
+        op.execute("UPDATE user_plans SET plan_activated_at = created_at")
+    for column in ("current_period_start", "current_period_end"):
+        if column not in existing_columns:
+            op.add_column("user_plans", sa.Column(column, sa.DateTime(timezone=True)))
+            legacy = column.replace("current_", "billing_")
+            if legacy in existing_columns:
+                op.execute(f"UPDATE user_plans SET {column} = {legacy}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    _align_user_plans(inspector)
+
+    if not _table_exists(inspector, "usage_counters"):
+        op.create_table(
+            "usage_counters",
+            sa.Column(
+                "user_id",
+                postgresql.UUID(as_uuid=True),
+                sa.ForeignKey("users.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("action_type", sa.Text(), primary_key=True),
+            sa.Column("period_start", sa.DateTime(timezone=True), primary_key=True),
+            sa.Column("used", sa.Integer(), nullable=False, server_default=sa.text("0")),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+        )
+
+    # Backfill: lifetime totals for FREE users, current-period totals for paid users.
+    op.execute(
+        f"""
+        INSERT INTO usage_counters (user_id, action_type, period_start, used)
+        SELECT
+            l.user_id,
+            l.action_type,
+            CASE
+                WHEN p.plan_name IS NOT NULL AND p.plan_name <> 'FREE'
+                    THEN COALESCE(p.current_period_start, p.plan_activated_at)
+                ELSE TIMESTAMPTZ '{LIFETIME_PERIOD_START}'
+            END AS period_start,
+            count(*) AS used
+        FROM usage_ledger l
+        LEFT JOIN user_plans p ON p.user_id = l.user_id
+        WHERE p.plan_name IS NULL
+           OR p.plan_name = 'FREE'
+           OR (
+                l.created_at >= COALESCE(p.current_period_start, p.plan_activated_at)
+                AND l.created_at < COALESCE(
+                    p.current_period_end, p.plan_activated_at + interval '30 days'
+                )
+           )
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, action_type, period_start) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if _table_exists(inspector, "usage_counters"):
+        op.drop_table("usage_counters")
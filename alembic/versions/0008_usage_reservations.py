@@ -0,0 +1,84 @@
+"""Add quota reservations (usage_counters.reserved, usage_reservations).
+
+Revision ID: 0008_usage_reservations
+Revises: 0007_usage_counters
+Create Date: 2026-02-09
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0008_usage_reservations"
+down_revision: Union[str, Sequence[str], None] = "0007_usage_counters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(inspector: sa.Inspector, table_name: str) -> bool:
+    return table_name in inspector.get_table_names()
+
+
+def _column_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def _has_index(inspector: sa.Inspector, table_name: str, index_name: str) -> bool:
+    return any(index["name"] == index_name for index in inspector.get_indexes(table_name))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "reserved" not in _column_names(inspector, "usage_counters"):
+        op.add_column(
+            "usage_counters",
+            sa.Column("reserved", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        )
+
+    if not _table_exists(inspector, "usage_reservations"):
+        op.create_table(
+            "usage_reservations",
+            sa.Column(
+                "id",
+                postgresql.UUID(as_uuid=True),
+                primary_key=True,
+                server_default=sa.text("gen_random_uuid()"),
+            ),
+            sa.Column(
+                "user_id",
+                postgresql.UUID(as_uuid=True),
+                sa.ForeignKey("users.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("action_type", sa.Text(), nullable=False),
+            sa.Column("period_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        )
+        inspector = sa.inspect(bind)
+
+    if not _has_index(inspector, "usage_reservations", "idx_usage_reservations_expires"):
+        op.create_index(
+            "idx_usage_reservations_expires", "usage_reservations", ["expires_at"]
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if _table_exists(inspector, "usage_reservations"):
+        op.drop_table("usage_reservations")
+    if _table_exists(inspector, "usage_counters") and "reserved" in _column_names(
+        inspector, "usage_counters"
+    ):
+        op.drop_column("usage_counters", "reserved")
@@ -0,0 +1,217 @@
+"""Convert usage_ledger to monthly range partitions on created_at.
+
+Revision ID: 0009_usage_ledger_partitions
+Revises: 0008_usage_reservations
+Create Date: 2026-02-16
+
+Rows are copied into a new partitioned table inside this migration; run it in a
+maintenance window sized to the ledger. Global idempotency moves to
+usage_idempotency_keys, and usage_archived_totals keeps lifetime counts for
+partitions archived by scripts/usage_ledger_maintenance.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0009_usage_ledger_partitions"
+down_revision: Union[str, Sequence[str], None] = "0008_usage_reservations"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENSURE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION usage_ledger_ensure_partitions(
+    start_at timestamptz,
+    end_at timestamptz
+) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    bound_start timestamptz := date_trunc('month', start_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    bound_end timestamptz;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    WHILE bound_start <= end_at LOOP
+        bound_end := ((bound_start AT TIME ZONE 'UTC') + interval '1 month') AT TIME ZONE 'UTC';
+        partition_name := format(
+            'usage_ledger_p%s', to_char(bound_start AT TIME ZONE 'UTC', 'YYYY_MM')
+        );
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Build the partition detached so rows that already fell into the
+            -- default partition can be moved before the range is attached.
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE usage_ledger INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM usage_ledger_default '
+                'WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                bound_start, bound_end, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE usage_ledger ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, bound_start, bound_end
+            );
+            created := created + 1;
+        END IF;
+        bound_start := bound_end;
+    END LOOP;
+    RETURN created;
+END
+$$;
+"""
+
+
+def _table_exists(inspector: sa.Inspector, table_name: str) -> bool:
+    return table_name in inspector.get_table_names()
+
+
+def _is_partitioned(bind, table_name: str) -> bool:
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name"
+            ),
+            {"name": table_name},
+        ).scalar()
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not _table_exists(inspector, "usage_idempotency_keys"):
+        op.create_table(
+            "usage_idempotency_keys",
+            sa.Column("idempotency_key", sa.Text(), primary_key=True),
+            sa.Column("ledger_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("ledger_created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+        )
+
+    if not _table_exists(inspector, "usage_archived_totals"):
+        op.create_table(
+            "usage_archived_totals",
+            sa.Column(
+                "user_id",
+                postgresql.UUID(as_uuid=True),
+                sa.ForeignKey("users.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("action_type", sa.Text(), primary_key=True),
+            sa.Column(
+                "archived_count", sa.BigInteger(), nullable=False, server_default=sa.text("0")
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+        )
+
+    if _is_partitioned(bind, "usage_ledger"):
+        op.execute(ENSURE_PARTITIONS_FUNCTION)
+        return
+
+    op.execute("ALTER TABLE usage_ledger RENAME TO usage_ledger_legacy")
+    op.execute("ALTER INDEX IF EXISTS usage_ledger_pkey RENAME TO usage_ledger_legacy_pkey")
+    for index_name in (
+        "idx_usage_ledger_idempotency",
+        "idx_usage_ledger_user_created",
+        "idx_usage_ledger_action",
+        "idx_usage_ledger_user",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+    op.execute(
+        """
+        CREATE TABLE usage_ledger (
+            id uuid NOT NULL DEFAULT gen_random_uuid(),
+            user_id uuid NOT NULL,
+            action_type text NOT NULL,
+            idempotency_key text NOT NULL,
+            metadata jsonb NOT NULL DEFAULT '{}'::jsonb,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT usage_ledger_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT usage_ledger_user_id_fkey FOREIGN KEY (user_id)
+                REFERENCES users (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE usage_ledger_default PARTITION OF usage_ledger DEFAULT")
+    op.execute(
+        "CREATE INDEX idx_usage_ledger_user_created ON usage_ledger (user_id, created_at DESC)"
+    )
+    op.execute(ENSURE_PARTITIONS_FUNCTION)
+    op.execute(
+        """
+        SELECT usage_ledger_ensure_partitions(
+            COALESCE((SELECT min(created_at) FROM usage_ledger_legacy), now()),
+            now() + interval '3 months'
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO usage_ledger (id, user_id, action_type, idempotency_key, metadata, created_at)
+        SELECT id, user_id, action_type, idempotency_key, metadata, created_at
+        FROM usage_ledger_legacy
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO usage_idempotency_keys (idempotency_key, ledger_id, ledger_created_at)
+        SELECT idempotency_key, id, created_at FROM usage_ledger_legacy
+        ON CONFLICT (idempotency_key) DO NOTHING
+        """
+    )
+    op.execute("DROP TABLE usage_ledger_legacy")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if _is_partitioned(bind, "usage_ledger"):
+        op.execute("ALTER TABLE usage_ledger RENAME TO usage_ledger_partitioned")
+        op.execute("ALTER INDEX IF EXISTS usage_ledger_pkey RENAME TO usage_ledger_partitioned_pkey")
+        op.execute("DROP INDEX IF EXISTS idx_usage_ledger_user_created")
+        op.execute(
+            """
+            CREATE TABLE usage_ledger (
+                id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+                user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+                action_type text NOT NULL,
+                idempotency_key text NOT NULL,
+                metadata jsonb NOT NULL DEFAULT '{}'::jsonb,
+                created_at timestamptz NOT NULL DEFAULT now()
+            )
+            """
+        )
+        op.execute("INSERT INTO usage_ledger SELECT * FROM usage_ledger_partitioned")
+        op.execute("DROP TABLE usage_ledger_partitioned")
+        op.create_index("idx_usage_ledger_user", "usage_ledger", ["user_id"])
+        op.create_index("idx_usage_ledger_action", "usage_ledger", ["action_type"])
+        op.execute(
+            "CREATE INDEX idx_usage_ledger_user_created "
+            "ON usage_ledger (user_id, created_at DESC)"
+        )
+        op.create_index(
+            "idx_usage_ledger_idempotency", "usage_ledger", ["idempotency_key"], unique=True
+        )
+    op.execute("DROP FUNCTION IF EXISTS usage_ledger_ensure_partitions(timestamptz, timestamptz)")
+
+    if _table_exists(inspector, "usage_archived_totals"):
+        op.drop_table("usage_archived_totals")
+    if _table_exists(inspector, "usage_idempotency_keys"):
+        op.drop_table("usage_idempotency_keys")
@@ -0,0 +1,77 @@
+"""Add daily usage rollups (usage_daily, usage_daily_by_plan, usage_rollup_watermarks).
+
+Revision ID: 0010_usage_daily_rollups
+Revises: 0009_usage_ledger_partitions
+Create Date: 2026-02-23
+
+Tables start empty; the first `scripts/roll_up_usage.py` run aggregates the
+existing ledger.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0010_usage_daily_rollups"
+down_revision: Union[str, Sequence[str], None] = "0009_usage_ledger_partitions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(inspector: sa.Inspector, table_name: str) -> bool:
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not _table_exists(inspector, "usage_daily"):
+        op.create_table(
+            "usage_daily",
+            sa.Column(
+                "user_id",
+                postgresql.UUID(as_uuid=True),
+                sa.ForeignKey("users.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("action_type", sa.Text(), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("count", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        )
+        op.create_index("idx_usage_daily_day", "usage_daily", ["day"])
+
+    if not _table_exists(inspector, "usage_daily_by_plan"):
+        op.create_table(
+            "usage_daily_by_plan",
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("plan_name", sa.Text(), primary_key=True),
+            sa.Column("action_type", sa.Text(), primary_key=True),
+            sa.Column("count", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        )
+
+    if not _table_exists(inspector, "usage_rollup_watermarks"):
+        op.create_table(
+            "usage_rollup_watermarks",
+            sa.Column("name", sa.Text(), primary_key=True),
+            sa.Column("processed_until", sa.DateTime(timezone=True), nullable=False),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if _table_exists(inspector, "usage_rollup_watermarks"):
+        op.drop_table("usage_rollup_watermarks")
+    if _table_exists(inspector, "usage_daily_by_plan"):
+        op.drop_table("usage_daily_by_plan")
+    if _table_exists(inspector, "usage_daily"):
+        op.drop_table("usage_daily")
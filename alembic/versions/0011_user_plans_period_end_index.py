@@ -0,0 +1,34 @@
+"""Index user_plans.current_period_end for the billing-period rollover job.
+
+Revision ID: 0011_user_plans_period_end_index
+Revises: 0010_usage_daily_rollups
+Create Date: 2026-03-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0011_user_plans_period_end_index"
+down_revision: Union[str, Sequence[str], None] = "0010_usage_daily_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "idx_user_plans_current_period_end"
+
+
+def _has_index(inspector: sa.Inspector, table_name: str, index_name: str) -> bool:
+    return any(index["name"] == index_name for index in inspector.get_indexes(table_name))
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not _has_index(inspector, "user_plans", INDEX_NAME):
+        op.create_index(INDEX_NAME, "user_plans", ["current_period_end"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if _has_index(inspector, "user_plans", INDEX_NAME):
+        op.drop_index(INDEX_NAME, table_name="user_plans")
@@ -0,0 +1,41 @@
+"""Add the UNLOGGED rate_limit_windows table for shared sliding-window limits.
+
+Revision ID: 0012_rate_limit_windows
+Revises: 0011_user_plans_period_end_index
+Create Date: 2026-03-09
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0012_rate_limit_windows"
+down_revision: Union[str, Sequence[str], None] = "0011_user_plans_period_end_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(inspector: sa.Inspector, table_name: str) -> bool:
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not _table_exists(inspector, "rate_limit_windows"):
+        op.create_table(
+            "rate_limit_windows",
+            sa.Column("key", sa.Text(), primary_key=True),
+            sa.Column("window_index", sa.BigInteger(), nullable=False),
+            sa.Column("current_count", sa.Integer(), nullable=False),
+            sa.Column("previous_count", sa.Integer(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+            prefixes=["UNLOGGED"],
+        )
+        op.create_index("idx_rate_limit_windows_expires", "rate_limit_windows", ["expires_at"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if _table_exists(inspector, "rate_limit_windows"):
+        op.drop_table("rate_limit_windows")
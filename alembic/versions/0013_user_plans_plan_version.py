@@ -0,0 +1,59 @@
+"""Add user_plans.plan_version, bumped whenever the plan or its period end changes.
+
+Revision ID: 0013_user_plans_plan_version
+Revises: 0012_rate_limit_windows
+Create Date: 2026-03-16
+
+Access tokens carry the plan_version they were issued with; a trigger bumps it
+for every writer (ORM, webhooks, rollover batch) so stale plan claims are
+detected without trusting application code to remember.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0013_user_plans_plan_version"
+down_revision: Union[str, Sequence[str], None] = "0012_rate_limit_windows"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BUMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION user_plans_bump_plan_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.plan_name IS DISTINCT FROM OLD.plan_name
+        OR NEW.current_period_end IS DISTINCT FROM OLD.current_period_end THEN
+        NEW.plan_version := OLD.plan_version + 1;
+    END IF;
+    RETURN NEW;
+END
+$$;
+"""
+
+
+def _column_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "plan_version" not in _column_names(inspector, "user_plans"):
+        op.add_column(
+            "user_plans",
+            sa.Column("plan_version", sa.Integer(), nullable=False, server_default=sa.text("1")),
+        )
+    op.execute(BUMP_FUNCTION)
+    op.execute("DROP TRIGGER IF EXISTS trg_user_plans_plan_version ON user_plans")
+    op.execute(
+        "CREATE TRIGGER trg_user_plans_plan_version BEFORE UPDATE ON user_plans "
+        "FOR EACH ROW EXECUTE FUNCTION user_plans_bump_plan_version()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_user_plans_plan_version ON user_plans")
+    op.execute("DROP FUNCTION IF EXISTS user_plans_bump_plan_version()")
+    inspector = sa.inspect(op.get_bind())
+    if "plan_version" in _column_names(inspector, "user_plans"):
+        op.drop_column("user_plans", "plan_version")
@@ -0,0 +1,72 @@
+"""Add email_outbox for transactional, batched email delivery.
+
+Revision ID: 0014_email_outbox
+Revises: 0013_user_plans_plan_version
+Create Date: 2026-03-23
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0014_email_outbox"
+down_revision: Union[str, Sequence[str], None] = "0013_user_plans_plan_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(inspector: sa.Inspector, table_name: str) -> bool:
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not _table_exists(inspector, "email_outbox"):
+        op.create_table(
+            "email_outbox",
+            sa.Column(
+                "id",
+                postgresql.UUID(as_uuid=True),
+                primary_key=True,
+                server_default=sa.text("gen_random_uuid()"),
+            ),
+            sa.Column("to_address", sa.Text(), nullable=False),
+            sa.Column("subject", sa.Text(), nullable=False),
+            sa.Column("body_text", sa.Text(), nullable=True),
+            sa.Column("status", sa.Text(), nullable=False, server_default=sa.text("'PENDING'")),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+            sa.Column(
+                "next_attempt_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+            sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("provider_message_id", sa.Text(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.text("now()"),
+            ),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+            sa.CheckConstraint(
+                "status IN ('PENDING', 'SENT', 'FAILED', 'EXPIRED')",
+                name="ck_email_outbox_status",
+            ),
+        )
+        op.create_index(
+            "idx_email_outbox_due",
+            "email_outbox",
+            ["next_attempt_at"],
+            postgresql_where=sa.text("status = 'PENDING'"),
+        )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if _table_exists(inspector, "email_outbox"):
+        op.drop_table("email_outbox")
@@ -0,0 +1,77 @@
+"""Index refresh tokens for the token sweeper and per-user revocation.
+
+Revision ID: 0015_auth_token_sweep
+Revises: 0014_email_outbox
+Create Date: 2026-03-30
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0015_auth_token_sweep"
+down_revision: Union[str, Sequence[str], None] = "0014_email_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_INDEX = "ix_auth_refresh_tokens_user_active"
+REVOKED_INDEX = "ix_auth_refresh_tokens_revoked_at"
+REPLACED_BY_FK = "fk_auth_refresh_tokens_replaced_by_token_id"
+
+
+def _has_index(inspector: sa.Inspector, table_name: str, index_name: str) -> bool:
+    return any(index["name"] == index_name for index in inspector.get_indexes(table_name))
+
+
+def _replaced_by_fk(inspector: sa.Inspector) -> dict | None:
+    for foreign_key in inspector.get_foreign_keys("auth_refresh_tokens"):
+        if foreign_key["constrained_columns"] == ["replaced_by_token_id"]:
+            return foreign_key
+    return None
+
+
+def _recreate_replaced_by_fk(inspector: sa.Inspector, ondelete: str | None) -> None:
+    foreign_key = _replaced_by_fk(inspector)
+    if foreign_key is not None:
+        if foreign_key.get("options", {}).get("ondelete") == ondelete:
+            return
+        op.drop_constraint(foreign_key["name"], "auth_refresh_tokens", type_="foreignkey")
+    op.create_foreign_key(
+        REPLACED_BY_FK,
+        "auth_refresh_tokens",
+        "auth_refresh_tokens",
+        ["replaced_by_token_id"],
+        ["id"],
+        ondelete=ondelete,
+    )
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Login and refresh revoke a user's active tokens; revoked rows are never read.
+    if not _has_index(inspector, "auth_refresh_tokens", ACTIVE_INDEX):
+        op.create_index(
+            ACTIVE_INDEX,
+            "auth_refresh_tokens",
+            ["user_id"],
+            postgresql_where=sa.text("revoked_at IS NULL"),
+        )
+    if not _has_index(inspector, "auth_refresh_tokens", REVOKED_INDEX):
+        op.create_index(
+            REVOKED_INDEX,
+            "auth_refresh_tokens",
+            ["revoked_at"],
+            postgresql_where=sa.text("revoked_at IS NOT NULL"),
+        )
+    # The sweeper deletes a token while the row it replaced may be kept longer.
+    _recreate_replaced_by_fk(inspector, "SET NULL")
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    _recreate_replaced_by_fk(inspector, None)
+    if _has_index(inspector, "auth_refresh_tokens", REVOKED_INDEX):
+        op.drop_index(REVOKED_INDEX, table_name="auth_refresh_tokens")
+    if _has_index(inspector, "auth_refresh_tokens", ACTIVE_INDEX):
+        op.drop_index(ACTIVE_INDEX, table_name="auth_refresh_tokens")
@@ -180,36 +180,54 @@ class FitScanExecutor:
     def __init__(self, client: OpenAIClient | None = None) -> None:
         self._client = client or OpenAIClient()
 
-    def execute(self, prompt_inputs: dict) -> dict[str, Any]:
-        prompt_inputs_json = json.dumps(prompt_inputs, separators=(",", ":"), ensure_ascii=False)
-        selected_variant_id = (
-            prompt_inputs.get("prompt_inputs", {})
-            .get("derived", {})
-            .get("selected_variant_id")
+    def execute(
+        self,
+        prompt_inputs: dict,
+        *,
+        plan_name: str | None = None,
+        user_id: object | None = None,
+    ) -> dict[str, Any]:
+        response = self._client.create_chat_completion(
+            **build_chat_request(prompt_inputs),
+            plan_name=plan_name,
+            user_id=user_id,
         )
-        selected_variant_id = selected_variant_id or ""
+        return parse_fit_scan_response(response)
 
-        user_prompt = USER_PROMPT_TEMPLATE.format(
-            prompt_inputs_json=prompt_inputs_json,
-            selected_variant_id=selected_variant_id,
-        )
 
-        response = self._client.create_chat_completion(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2,
-            top_p=1.0,
-            frequency_penalty=0.0,
-            presence_penalty=0.0,
-            max_tokens=900,
-        )
-        payload = _extract_json_payload(response)
-        _validate_fit_scan_payload(payload)
-        return payload
+def build_chat_request(prompt_inputs: dict) -> dict[str, Any]:
+    prompt_inputs_json = json.dumps(prompt_inputs, separators=(",", ":"), ensure_ascii=False)
+    selected_variant_id = (
+        prompt_inputs.get("prompt_inputs", {})
+        .get("derived", {})
+        .get("selected_variant_id")
+    )
+    selected_variant_id = selected_variant_id or ""
+
+    # The template embeds a literal JSON schema, so str.format() cannot be used.
+    user_prompt = USER_PROMPT_TEMPLATE.replace(
+        "{prompt_inputs_json}", prompt_inputs_json
+    ).replace("{selected_variant_id}", selected_variant_id)
+
+    return {
+        "model": MODEL_NAME,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.2,
+        "top_p": 1.0,
+        "frequency_penalty": 0.0,
+        "presence_penalty": 0.0,
+        "max_tokens": 900,
+    }
+
+
+def parse_fit_scan_response(response: dict[str, Any]) -> dict[str, Any]:
+    payload = _extract_json_payload(response)
+    _validate_fit_scan_payload(payload)
+    return payload
 
 
 def _extract_json_payload(response: dict[str, Any]) -> dict[str, Any]:
@@ -0,0 +1,17 @@
+import hmac
+
+from fastapi import Request
+
+from app.core.config import get_settings
+from app.core.errors import NotFoundError
+
+
+def require_admin(request: Request) -> None:
+    secret = get_settings().ADMIN_API_SECRET
+    provided = request.headers.get("x-admin-secret")
+    if not secret or not provided or not hmac.compare_digest(provided, secret):
+        raise NotFoundError(
+            error_code="NOT_FOUND",
+            message="Not found",
+            status_code=404,
+        )
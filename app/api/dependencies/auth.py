@@ -1,16 +1,29 @@
+import dataclasses
 import uuid
+from datetime import datetime, timezone
+from typing import Any
 
 import jwt
 from fastapi import Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.errors import DomainError
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.models.user import User
+from app.services.principal_cache import Principal, load_principal
+from app.services.quota_service import PlanClaims
 
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+def _invalid_token() -> DomainError:
+    return DomainError(
+        error_code="AUTH_INVALID",
+        message="Invalid authentication token",
+        status_code=401,
+    )
+
+
+def _token_claims(request: Request) -> tuple[uuid.UUID, dict[str, Any]]:
     auth_header = request.headers.get("authorization")
     if not auth_header or not auth_header.lower().startswith("bearer "):
         raise DomainError(
@@ -30,34 +43,46 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
             issuer="grantpilot",
         )
     except Exception:
-        raise DomainError(
-            error_code="AUTH_INVALID",
-            message="Invalid authentication token",
-            status_code=401,
-        )
+        raise _invalid_token()
 
     user_id = payload.get("sub")
     if not user_id:
-        raise DomainError(
-            error_code="AUTH_INVALID",
-            message="Invalid authentication token",
-            status_code=401,
-        )
+        raise _invalid_token()
 
     try:
-        user_uuid = uuid.UUID(str(user_id))
+        return uuid.UUID(str(user_id)), payload
     except ValueError:
-        raise DomainError(
-            error_code="AUTH_INVALID",
-            message="Invalid authentication token",
-            status_code=401,
-        )
+        raise _invalid_token()
+
+
+def _plan_claims(payload: dict[str, Any]) -> PlanClaims | None:
+    """Plan claims from an access token; None for tokens issued without them."""
+    plan_name, version = payload.get("plan"), payload.get("plan_version")
+    if not isinstance(plan_name, str) or not isinstance(version, int):
+        return None
+    period_end = payload.get("plan_period_end")
+    return PlanClaims(
+        plan_name=plan_name,
+        period_end=datetime.fromtimestamp(period_end, timezone.utc) if period_end else None,
+        version=version,
+    )
+
+
+async def get_current_principal(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """The authenticated user's id, email and plan claims; usually served without the DB."""
+    user_id, payload = _token_claims(request)
+    principal = await db.run_sync(load_principal, user_id)
+    if principal is None:
+        raise _invalid_token()
+    return dataclasses.replace(principal, token_plan=_plan_claims(payload))
 
-    user = db.get(User, user_uuid)
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> User:
+    """The authenticated user as a loaded ORM object, for routes that need its columns."""
+    user_id, _ = _token_claims(request)
+    user = await db.get(User, user_id)
     if not user:
-        raise DomainError(
-            error_code="AUTH_INVALID",
-            message="Invalid authentication token",
-            status_code=401,
-        )
+        raise _invalid_token()
     return user
@@ -1,17 +1,17 @@
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies.auth import get_current_user
-from app.db.session import get_db
+from app.api.dependencies.auth import get_current_principal
+from app.db.session import get_async_db
 from app.services.quota_service import enforce_quota
 
 
 def require_quota(event_type: str):
-    def _guard(
-        db: Session = Depends(get_db),
-        current_user=Depends(get_current_user),
+    async def _guard(
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_principal),
     ):
-        enforce_quota(db, current_user.id, event_type)
+        await db.run_sync(enforce_quota, current_user.id, event_type)
         return current_user
 
     return _guard
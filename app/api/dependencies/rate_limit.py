@@ -0,0 +1,58 @@
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.errors import DomainError
+from app.core.metrics import metrics
+from app.core.rate_limit import (
+    MemorySlidingWindowLimiter,
+    PostgresSlidingWindowLimiter,
+    RateLimitBackend,
+)
+from app.db import session as db_session
+from app.services.quota_service import PLAN_RATE_LIMITS, get_plan_name
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimitBackend:
+    """The process-wide limiter for auth and plan limits (RATE_LIMIT_BACKEND)."""
+    if get_settings().RATE_LIMIT_BACKEND.lower() == "memory":
+        return MemorySlidingWindowLimiter()
+    if db_session.engine is None:
+        raise RuntimeError("DATABASE_URL is not set")
+    return PostgresSlidingWindowLimiter(db_session.engine, async_engine=db_session.async_engine)
+
+
+async def enforce_plan_rate_limit(db: AsyncSession, current_user, event_type: str) -> None:
+    """Count one event_type request against the caller's plan rate limit; 429 past it."""
+    # A fresh plan claim in the access token avoids the plan lookup.
+    plan_name = current_user.fresh_plan_name() or await db.run_sync(
+        get_plan_name, current_user.id
+    )
+    rule = PLAN_RATE_LIMITS.get((plan_name, event_type))
+    if rule is None:
+        return
+    decision = await get_rate_limiter().hit_async(
+        f"plan:{event_type}:{current_user.id}",
+        limit=rule.limit,
+        window_seconds=rule.window_seconds,
+    )
+    if not decision.allowed:
+        metrics.inc(
+            "plan_rate_limited_total",
+            help_text="Requests rejected by plan rate limits",
+            resource=event_type,
+            plan=plan_name,
+        )
+        raise DomainError(
+            error_code="RATE_LIMITED",
+            message="Too many requests for this action.",
+            status_code=429,
+            details={
+                "resource": event_type,
+                "retry_after_seconds": decision.retry_after_seconds,
+            },
+            headers={"Retry-After": str(decision.retry_after_seconds)},
+        )
+
@@ -0,0 +1,53 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies.admin import require_admin
+from app.core.errors import DomainError
+from app.core.metrics import metrics
+from app.db.session import get_async_db
+from app.schemas.usage_analytics import UsageDailyResponse
+from app.services.usage_rollup import get_rollup_watermark, usage_timeseries
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+MAX_USAGE_RANGE_DAYS = 366
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render_prometheus())
+
+
+@router.get("/usage/daily", response_model=UsageDailyResponse)
+async def read_usage_daily(
+    start: date | None = None,
+    end: date | None = None,
+    action_type: str | None = None,
+    plan: str | None = None,
+    user_id: uuid.UUID | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= MAX_USAGE_RANGE_DAYS:
+        raise DomainError(
+            error_code="VALIDATION_ERROR",
+            message=f"start must be on or before end, at most {MAX_USAGE_RANGE_DAYS} days apart",
+            status_code=422,
+        )
+    points = await db.run_sync(
+        usage_timeseries,
+        start=start,
+        end=end,
+        action_type=action_type,
+        plan_name=plan,
+        user_id=user_id,
+    )
+    processed_until = await db.run_sync(get_rollup_watermark)
+    return UsageDailyResponse(
+        start=start, end=end, processed_until=processed_until, points=points
+    )
@@ -4,25 +4,45 @@ from datetime import datetime, timedelta, timezone
 from typing import Any
 from urllib.parse import urlencode
 
-import httpx
+import jwt
 from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, RedirectResponse
 from pydantic import BaseModel
-from sqlalchemy import select, update
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.dependencies.rate_limit import get_rate_limiter
 from app.core.config import get_settings
-from app.core.rate_limit import RateLimiter
-from app.core.security import create_access_token, generate_opaque_token, hash_token
-from app.db.session import get_db
+from app.core.security import (
+    OAUTH_STATE_TTL_SECONDS,
+    create_access_token,
+    create_oauth_state,
+    decode_oauth_state,
+    generate_opaque_token,
+    hash_token,
+)
+from app.db.session import get_async_db
+from app.integrations.google_id_token import (
+    IdTokenError,
+    get_google_jwks,
+    verify_google_id_token,
+)
+from app.integrations.http_clients import UPSTREAM_GOOGLE, get_http_client
 from app.models.auth_magic_link_token import AuthMagicLinkToken
 from app.models.auth_refresh_token import AuthRefreshToken
-from app.models.user import User
+from app.services.auth_service import (
+    Login,
+    consume_magic_link,
+    login_user,
+    rotate_refresh_token,
+)
+from app.services.email_outbox import enqueue_email, wake_email_dispatcher
+from app.services.principal_cache import invalidate_principal
+from app.services.quota_service import PlanClaims
 
 logger = logging.getLogger("auth")
 router = APIRouter(prefix="/api/auth", tags=["auth"])
-rate_limiter = RateLimiter()
-oauth_state_store: dict[str, datetime] = {}
 AUTH_POST_LOGIN_REDIRECT_URL = "https://grantpilot.ngoinfo.org/auth/callback"
 SMOKE_TEST_EMAIL = "smoke-test@grantpilot.local"
 
@@ -70,13 +90,17 @@ def _rate_limit_enabled() -> bool:
     return get_settings().AUTH_RATE_LIMIT_ENABLED
 
 
-def _enforce_rate_limit(request: Request, key: str, limit: int, window_seconds: int) -> bool:
+async def _enforce_rate_limit(
+    request: Request, key: str, limit: int, window_seconds: int
+) -> bool:
     if not _rate_limit_enabled():
         return True
-    allowed = rate_limiter.allow(key, limit, window_seconds)
-    if not allowed:
+    decision = await get_rate_limiter().hit_async(
+        f"auth:{key}", limit=limit, window_seconds=window_seconds
+    )
+    if not decision.allowed:
         logger.info("auth_rate_limited")
-    return allowed
+    return decision.allowed
 
 
 def _log_test_mode_event(request: Request, outcome: str) -> None:
@@ -100,48 +124,53 @@ def _log_auth_failure(
     )
 
 
-def _issue_refresh_token(db: Session, user_id: uuid.UUID) -> tuple[str, uuid.UUID]:
-    now = datetime.now(timezone.utc)
-    settings = get_settings()
-    expires_at = now + timedelta(days=settings.AUTH_REFRESH_TOKEN_TTL_DAYS)
-    raw_token = generate_opaque_token()
-    token_hash = hash_token(raw_token)
-    token_id = uuid.uuid4()
-    token_record = AuthRefreshToken(
-        id=token_id,
-        user_id=user_id,
-        token_hash=token_hash,
-        expires_at=expires_at,
+def _issue_access_token(user_id: uuid.UUID, email: str, plan: PlanClaims) -> tuple[str, int]:
+    return create_access_token(
+        str(user_id),
+        email,
+        plan.plan_name,
+        plan_period_end=plan.period_end,
+        plan_version=plan.version,
     )
-    db.add(token_record)
-    return raw_token, token_id
 
 
-def _revoke_active_refresh_tokens(db: Session, user_id: uuid.UUID) -> None:
-    now = datetime.now(timezone.utc)
-    db.execute(
-        update(AuthRefreshToken)
-        .where(
-            AuthRefreshToken.user_id == user_id,
-            AuthRefreshToken.revoked_at.is_(None),
-        )
-        .values(revoked_at=now)
-    )
+def _login_content(login: Login, access_token: str, expires_in: int) -> dict[str, Any]:
+    return {
+        "access_token": access_token,
+        "refresh_token": login.refresh_token,
+        "token_type": "Bearer",
+        "expires_in": expires_in,
+        "user": {
+            "id": str(login.user_id),
+            "email": login.email,
+            "full_name": login.full_name,
+            "plan": login.plan.plan_name,
+        },
+    }
 
 
-def _store_oauth_state(state: str) -> None:
-    oauth_state_store[state] = datetime.now(timezone.utc) + timedelta(minutes=10)
+def _is_safe_next_path(value: str) -> bool:
+    return value.startswith("/") and not value.startswith("//") and "\\" not in value
 
 
-def _consume_oauth_state(state: str) -> bool:
-    expires_at = oauth_state_store.pop(state, None)
-    return bool(expires_at and expires_at > datetime.now(timezone.utc))
+async def _consume_oauth_state(state: str) -> dict[str, Any] | None:
+    """Verify a signed state and claim its nonce; None if invalid, expired or replayed."""
+    try:
+        claims = decode_oauth_state(state)
+    except jwt.InvalidTokenError:
+        return None
+    # A limit of one per state lifetime makes the shared limiter a bounded
+    # seen-nonce store: the second use of a nonce is refused until it expires.
+    claimed = await get_rate_limiter().hit_async(
+        f"oauth_nonce:{claims['nonce']}", limit=1, window_seconds=OAUTH_STATE_TTL_SECONDS
+    )
+    return claims if claimed.allowed else None
 
 
 @router.get("/google/start")
-def google_oauth_start(request: Request) -> JSONResponse:
+async def google_oauth_start(request: Request) -> JSONResponse:
     ip = _get_client_ip(request)
-    if not _enforce_rate_limit(request, f"google_start_ip:{ip}", 60, 3600):
+    if not await _enforce_rate_limit(request, f"google_start_ip:{ip}", 60, 3600):
         return error_response(request, 429, "RATE_LIMITED", "Too many requests")
 
     settings = get_settings()
@@ -150,8 +179,10 @@ def google_oauth_start(request: Request) -> JSONResponse:
             request, 500, "OAUTH_CONFIG_ERROR", "OAuth configuration error"
         )
 
-    state = generate_opaque_token(24)
-    _store_oauth_state(state)
+    next_path = request.query_params.get("next")
+    if next_path is not None and not _is_safe_next_path(next_path):
+        return error_response(request, 422, "VALIDATION_ERROR", "Invalid next path")
+    state = create_oauth_state(next_path)
     scopes = (
         request.query_params.get("scopes")
         or get_settings().GOOGLE_OAUTH_SCOPES
@@ -173,7 +204,7 @@ def google_oauth_start(request: Request) -> JSONResponse:
 
 
 @router.get("/google/callback")
-def google_oauth_callback(request: Request, db: Session = Depends(get_db)):
+async def google_oauth_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     code = request.query_params.get("code")
     state = request.query_params.get("state")
     redirect = request.query_params.get("redirect") == "1"
@@ -181,14 +212,18 @@ def google_oauth_callback(request: Request, db: Session = Depends(get_db)):
     if not code:
         _log_auth_failure(request, "oauth_code_missing")
         return error_response(request, 400, "OAUTH_CODE_MISSING", "Missing OAuth code")
-    if not state or not _consume_oauth_state(state):
+    state_claims = await _consume_oauth_state(state) if state else None
+    if state_claims is None:
         _log_auth_failure(request, "oauth_state_invalid")
         return error_response(request, 400, "OAUTH_STATE_INVALID", "Invalid OAuth state")
+    next_path = state_claims.get("next")
 
     settings = get_settings()
+    # Outbound HTTP clients are synchronous; their calls run in the threadpool.
     try:
-        token_resp = httpx.post(
-            "https://oauth2.googleapis.com/token",
+        token_resp = await run_in_threadpool(
+            get_http_client(UPSTREAM_GOOGLE).post,
+            settings.GOOGLE_OAUTH_TOKEN_URL,
             data={
                 "code": code,
                 "client_id": settings.GOOGLE_OAUTH_CLIENT_ID,
@@ -196,7 +231,6 @@ def google_oauth_callback(request: Request, db: Session = Depends(get_db)):
                 "redirect_uri": settings.GOOGLE_OAUTH_REDIRECT_URI,
                 "grant_type": "authorization_code",
             },
-            timeout=10.0,
         )
     except Exception:
         _log_auth_failure(request, "oauth_internal_error")
@@ -210,28 +244,30 @@ def google_oauth_callback(request: Request, db: Session = Depends(get_db)):
             request, 401, "OAUTH_EXCHANGE_FAILED", "OAuth exchange failed"
         )
 
-    access_token = token_resp.json().get("access_token")
-    if not access_token:
+    id_token = token_resp.json().get("id_token")
+    if not id_token:
         _log_auth_failure(request, "oauth_exchange_failed")
         return error_response(
             request, 401, "OAUTH_EXCHANGE_FAILED", "OAuth exchange failed"
         )
-
-    userinfo_resp = httpx.get(
-        "https://openidconnect.googleapis.com/v1/userinfo",
-        headers={"Authorization": f"Bearer {access_token}"},
-        timeout=10.0,
-    )
-    if userinfo_resp.status_code != 200:
+    try:
+        claims = await run_in_threadpool(
+            verify_google_id_token,
+            id_token,
+            client_id=settings.GOOGLE_OAUTH_CLIENT_ID,
+            jwks=get_google_jwks(),
+        )
+    except IdTokenError as exc:
+        logger.warning("google_id_token_rejected error=%s", exc)
         _log_auth_failure(request, "oauth_exchange_failed")
         return error_response(
             request, 401, "OAUTH_EXCHANGE_FAILED", "OAuth exchange failed"
         )
-    userinfo = userinfo_resp.json()
-    email = (userinfo.get("email") or "").lower()
-    google_sub = userinfo.get("sub")
-    full_name = userinfo.get("name")
-    avatar_url = userinfo.get("picture")
+    # Users are matched by email, so only a Google-verified address is accepted.
+    email = (claims.get("email") or "").lower() if claims.get("email_verified") else ""
+    google_sub = claims["sub"]
+    full_name = claims.get("name")
+    avatar_url = claims.get("picture")
 
     if not email:
         _log_auth_failure(request, "oauth_exchange_failed")
@@ -239,60 +275,39 @@ def google_oauth_callback(request: Request, db: Session = Depends(get_db)):
             request, 401, "OAUTH_EXCHANGE_FAILED", "OAuth exchange failed"
         )
 
-    user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
-    now = datetime.now(timezone.utc)
-    if user is None:
-        user = User(
-            email=email,
-            full_name=full_name,
-            avatar_url=avatar_url,
-            google_sub=google_sub,
-            auth_provider="google",
-            last_login_at=now,
-        )
-        db.add(user)
-    else:
-        if not user.google_sub:
-            user.google_sub = google_sub
-        user.full_name = full_name or user.full_name
-        user.avatar_url = avatar_url or user.avatar_url
-        user.auth_provider = "google"
-        user.last_login_at = now
-
-    _revoke_active_refresh_tokens(db, user.id)
-    refresh_token, _ = _issue_refresh_token(db, user.id)
-    access_token, expires_in = create_access_token(str(user.id), user.email, "FREE")
-    db.commit()
+    login = await db.run_sync(
+        login_user,
+        email=email,
+        auth_provider="google",
+        full_name=full_name,
+        avatar_url=avatar_url,
+        google_sub=google_sub,
+    )
+    access_token, expires_in = _issue_access_token(login.user_id, login.email, login.plan)
+    await db.commit()
 
-    logger.info("auth_success provider=google user_id=%s", user.id)
+    logger.info("auth_success provider=google user_id=%s", login.user_id)
 
     if redirect:
-        params = urlencode(
-            {"access_token": access_token, "refresh_token": refresh_token, "expires_in": expires_in}
-        )
-        redirect_url = f"{AUTH_POST_LOGIN_REDIRECT_URL}?{params}"
-        return RedirectResponse(url=redirect_url)
-
-    return JSONResponse(
-        status_code=200,
-        content={
+        params = {
             "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "Bearer",
+            "refresh_token": login.refresh_token,
             "expires_in": expires_in,
-            "user": {
-                "id": str(user.id),
-                "email": user.email,
-                "full_name": user.full_name,
-                "plan": "FREE",
-            },
-        },
-    )
+        }
+        if next_path:
+            params["next"] = next_path
+        redirect_url = f"{AUTH_POST_LOGIN_REDIRECT_URL}?{urlencode(params)}"
+        return RedirectResponse(url=redirect_url)
+
+    content = _login_content(login, access_token, expires_in)
+    if next_path:
+        content["next"] = next_path
+    return JSONResponse(status_code=200, content=content)
 
 
 @router.post("/magic-link/request")
-def magic_link_request(
-    payload: MagicLinkRequest, request: Request, db: Session = Depends(get_db)
+async def magic_link_request(
+    payload: MagicLinkRequest, request: Request, db: AsyncSession = Depends(get_async_db)
 ) -> JSONResponse:
     if not _is_valid_email(payload.email):
         _log_auth_failure(request, "magic_link_invalid_email")
@@ -300,9 +315,9 @@ def magic_link_request(
     email = payload.email.lower()
     ip = _get_client_ip(request)
 
-    if not _enforce_rate_limit(request, f"magic_email:{email}", 5, 3600):
+    if not await _enforce_rate_limit(request, f"magic_email:{email}", 5, 3600):
         return error_response(request, 429, "RATE_LIMITED", "Too many requests")
-    if not _enforce_rate_limit(request, f"magic_ip:{ip}", 20, 3600):
+    if not await _enforce_rate_limit(request, f"magic_ip:{ip}", 20, 3600):
         return error_response(request, 429, "RATE_LIMITED", "Too many requests")
 
     settings = get_settings()
@@ -324,153 +339,106 @@ def magic_link_request(
         expires_at=expires_at,
     )
     db.add(token_record)
-    db.commit()
-
-    try:
-        email_resp = httpx.post(
-            "https://api.resend.com/emails",
-            headers={"Authorization": f"Bearer {settings.EMAIL_API_KEY}"},
-            json={
-                "from": f"{settings.EMAIL_FROM_NAME} <{settings.EMAIL_FROM_ADDRESS}>",
-                "to": [email],
-                "subject": "Your GrantPilot login link",
-                "text": f"Your login token: {raw_token}",
-            },
-            timeout=10.0,
-        )
-    except Exception:
-        _log_auth_failure(request, "magic_link_provider_error")
-        return error_response(
-            request, 500, "EMAIL_PROVIDER_ERROR", "Email provider error"
-        )
-    if email_resp.status_code >= 400:
-        _log_auth_failure(request, "magic_link_provider_error")
-        return error_response(
-            request, 500, "EMAIL_PROVIDER_ERROR", "Email provider error"
-        )
+    await db.run_sync(
+        enqueue_email,
+        to_address=email,
+        subject="Your GrantPilot login link",
+        body_text=f"Your login token: {raw_token}",
+        expires_at=expires_at,
+    )
+    await db.commit()
+    wake_email_dispatcher()
 
     logger.info("magic_link_requested")
     return JSONResponse(status_code=200, content={"status": "sent"})
 
 
 @router.post("/magic-link/consume")
-def magic_link_consume(
-    payload: MagicLinkConsumeRequest, request: Request, db: Session = Depends(get_db)
+async def magic_link_consume(
+    payload: MagicLinkConsumeRequest, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     ip = _get_client_ip(request)
-    if not _enforce_rate_limit(request, f"magic_consume_ip:{ip}", 30, 3600):
+    if not await _enforce_rate_limit(request, f"magic_consume_ip:{ip}", 30, 3600):
         return error_response(request, 429, "RATE_LIMITED", "Too many requests")
 
-    token_hash = hash_token(payload.token)
-    token_record = db.execute(
-        select(AuthMagicLinkToken).where(AuthMagicLinkToken.token_hash == token_hash)
-    ).scalar_one_or_none()
-
-    if token_record is None:
-        _log_auth_failure(request, "magic_link_token_invalid")
-        return error_response(
-            request, 400, "MAGIC_TOKEN_INVALID", "Invalid magic link token"
-        )
-    if token_record.consumed_at is not None:
-        _log_auth_failure(request, "magic_link_token_used")
-        return error_response(
-            request, 409, "MAGIC_TOKEN_ALREADY_USED", "Magic link already used"
-        )
-    if token_record.expires_at <= datetime.now(timezone.utc):
+    email = await db.run_sync(consume_magic_link, payload.token)
+    if email is None:
+        token_record = (
+            await db.execute(
+                select(AuthMagicLinkToken).where(
+                    AuthMagicLinkToken.token_hash == hash_token(payload.token)
+                )
+            )
+        ).scalar_one_or_none()
+        if token_record is None:
+            _log_auth_failure(request, "magic_link_token_invalid")
+            return error_response(
+                request, 400, "MAGIC_TOKEN_INVALID", "Invalid magic link token"
+            )
+        if token_record.consumed_at is not None:
+            _log_auth_failure(request, "magic_link_token_used")
+            return error_response(
+                request, 409, "MAGIC_TOKEN_ALREADY_USED", "Magic link already used"
+            )
         _log_auth_failure(request, "magic_link_token_expired")
         return error_response(
             request, 400, "MAGIC_TOKEN_EXPIRED", "Magic link token expired"
         )
 
-    token_record.consumed_at = datetime.now(timezone.utc)
-    email = token_record.email
-    user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
-    now = datetime.now(timezone.utc)
-    if user is None:
-        user = User(
-            email=email,
-            auth_provider="email",
-            last_login_at=now,
-        )
-        db.add(user)
-    else:
-        user.auth_provider = "email"
-        user.last_login_at = now
-
-    _revoke_active_refresh_tokens(db, user.id)
-    refresh_token, _ = _issue_refresh_token(db, user.id)
-    access_token, expires_in = create_access_token(str(user.id), user.email, "FREE")
-    db.commit()
+    login = await db.run_sync(login_user, email=email, auth_provider="email")
+    access_token, expires_in = _issue_access_token(login.user_id, login.email, login.plan)
+    await db.commit()
 
-    logger.info("auth_success provider=magic_link user_id=%s", user.id)
+    logger.info("auth_success provider=magic_link user_id=%s", login.user_id)
 
-    return JSONResponse(
-        status_code=200,
-        content={
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "Bearer",
-            "expires_in": expires_in,
-            "user": {
-                "id": str(user.id),
-                "email": user.email,
-                "full_name": user.full_name,
-                "plan": "FREE",
-            },
-        },
-    )
+    return JSONResponse(status_code=200, content=_login_content(login, access_token, expires_in))
 
 
 @router.post("/refresh")
-def refresh_tokens(
-    payload: RefreshRequest, request: Request, db: Session = Depends(get_db)
+async def refresh_tokens(
+    payload: RefreshRequest, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
-    token_hash = hash_token(payload.refresh_token)
-    token_record = db.execute(
-        select(AuthRefreshToken).where(AuthRefreshToken.token_hash == token_hash)
-    ).scalar_one_or_none()
+    rotation = await db.run_sync(rotate_refresh_token, payload.refresh_token)
 
+    # Limited per user once the token resolves, per IP otherwise; a 429 undoes the
+    # rotation so the presented token stays valid.
     ip = _get_client_ip(request)
-    if token_record is not None:
-        if not _enforce_rate_limit(
-            request, f"refresh_user:{token_record.user_id}", 120, 3600
-        ):
-            return error_response(request, 429, "RATE_LIMITED", "Too many requests")
+    if rotation is not None:
+        rate_limit_key = f"refresh_user:{rotation.user_id}"
     else:
-        if not _enforce_rate_limit(request, f"refresh_ip:{ip}", 120, 3600):
-            return error_response(request, 429, "RATE_LIMITED", "Too many requests")
+        rate_limit_key = f"refresh_ip:{ip}"
+    if not await _enforce_rate_limit(request, rate_limit_key, 120, 3600):
+        await db.rollback()
+        return error_response(request, 429, "RATE_LIMITED", "Too many requests")
 
-    if token_record is None:
+    if rotation is None:
         _log_auth_failure(request, "refresh_token_invalid", detail="not_found")
         return error_response(
             request, 401, "REFRESH_TOKEN_INVALID", "Invalid refresh token"
         )
-    if token_record.revoked_at is not None:
-        _log_auth_failure(request, "refresh_token_revoked", user_id=token_record.user_id)
+    if rotation.revoked_at is not None:
+        _log_auth_failure(request, "refresh_token_revoked", user_id=rotation.user_id)
         return error_response(
             request, 401, "REFRESH_TOKEN_REVOKED", "Refresh token revoked"
         )
-    if token_record.expires_at <= datetime.now(timezone.utc):
-        _log_auth_failure(request, "refresh_token_expired", user_id=token_record.user_id)
+    if rotation.refresh_token is None:
+        _log_auth_failure(request, "refresh_token_expired", user_id=rotation.user_id)
         return error_response(
             request, 401, "REFRESH_TOKEN_EXPIRED", "Refresh token expired"
         )
 
-    user = db.execute(select(User).where(User.id == token_record.user_id)).scalar_one()
-    _revoke_active_refresh_tokens(db, user.id)
-    new_refresh_token, new_token_id = _issue_refresh_token(db, user.id)
-    token_record.revoked_at = datetime.now(timezone.utc)
-    token_record.replaced_by_token_id = new_token_id
-    access_token, expires_in = create_access_token(str(user.id), user.email, "FREE")
-    db.commit()
+    access_token, expires_in = _issue_access_token(
+        rotation.user_id, rotation.email, rotation.plan
+    )
+    await db.commit()
 
-    logger.info("auth_refreshed user_id=%s", user.id)
+    logger.info("auth_refreshed user_id=%s", rotation.user_id)
 
     return JSONResponse(
         status_code=200,
         content={
             "access_token": access_token,
-            "refresh_token": new_refresh_token,
+            "refresh_token": rotation.refresh_token,
             "token_type": "Bearer",
             "expires_in": expires_in,
         },
@@ -478,10 +446,14 @@ def refresh_tokens(
 
 
 @router.post("/logout")
-def logout(payload: LogoutRequest, request: Request, db: Session = Depends(get_db)):
+async def logout(
+    payload: LogoutRequest, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     token_hash = hash_token(payload.refresh_token)
-    token_record = db.execute(
-        select(AuthRefreshToken).where(AuthRefreshToken.token_hash == token_hash)
+    token_record = (
+        await db.execute(
+            select(AuthRefreshToken).where(AuthRefreshToken.token_hash == token_hash)
+        )
     ).scalar_one_or_none()
 
     if token_record is None or token_record.revoked_at is not None:
@@ -496,13 +468,14 @@ def logout(payload: LogoutRequest, request: Request, db: Session = Depends(get_d
         )
 
     token_record.revoked_at = datetime.now(timezone.utc)
-    db.commit()
+    invalidate_principal(db.sync_session, token_record.user_id)
+    await db.commit()
     logger.info("auth_logout user_id=%s", token_record.user_id)
     return JSONResponse(status_code=200, content={"status": "logged_out"})
 
 
 @router.post("/test-mode/mint")
-def test_mode_mint(request: Request, db: Session = Depends(get_db)):
+async def test_mode_mint(request: Request, db: AsyncSession = Depends(get_async_db)):
     """TODO: Remove test-mode mint endpoint post-launch."""
     settings = get_settings()
     if not settings.TEST_MODE:
@@ -515,45 +488,13 @@ def test_mode_mint(request: Request, db: Session = Depends(get_db)):
         return error_response(request, 404, "TEST_MODE_DISABLED", "Not found")
 
     ip = _get_client_ip(request)
-    if not _enforce_rate_limit(request, f"test_mode_ip:{ip}", 3, 3600):
+    if not await _enforce_rate_limit(request, f"test_mode_ip:{ip}", 3, 3600):
         _log_test_mode_event(request, "rate_limited")
         return error_response(request, 429, "RATE_LIMITED", "Too many requests")
 
-    user = db.execute(select(User).where(User.email == SMOKE_TEST_EMAIL)).scalar_one_or_none()
-    now = datetime.now(timezone.utc)
-    if user is None:
-        user = User(
-            email=SMOKE_TEST_EMAIL,
-            auth_provider="email",
-            last_login_at=now,
-        )
-        db.add(user)
-    else:
-        user.last_login_at = now
-
-    db.flush()
-    if user.id is None:
-        _log_test_mode_event(request, "user_id_missing")
-        return error_response(request, 500, "TEST_MODE_ERROR", "Test mode mint failed")
-
-    _revoke_active_refresh_tokens(db, user.id)
-    refresh_token, _ = _issue_refresh_token(db, user.id)
-    access_token, expires_in = create_access_token(str(user.id), user.email, "FREE")
-    db.commit()
+    login = await db.run_sync(login_user, email=SMOKE_TEST_EMAIL, auth_provider=None)
+    access_token, expires_in = _issue_access_token(login.user_id, login.email, login.plan)
+    await db.commit()
 
     _log_test_mode_event(request, "success")
-    return JSONResponse(
-        status_code=200,
-        content={
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "Bearer",
-            "expires_in": expires_in,
-            "user": {
-                "id": str(user.id),
-                "email": user.email,
-                "full_name": user.full_name,
-                "plan": "FREE",
-            },
-        },
-    )
+    return JSONResponse(status_code=200, content=_login_content(login, access_token, expires_in))
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies.auth import get_current_user
-from app.db.session import get_db
+from app.api.dependencies.auth import get_current_principal
+from app.db.session import get_async_db
 from app.schemas.entitlements import EntitlementsResponse
 from app.services.quota_service import get_entitlements
 
@@ -10,8 +10,8 @@ router = APIRouter(prefix="/api", tags=["entitlements"])
 
 
 @router.get("/me/entitlements", response_model=EntitlementsResponse)
-def get_entitlements(
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+async def read_entitlements(
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
-    return get_entitlements(db, current_user.id)
+    return await db.run_sync(get_entitlements, current_user.id)
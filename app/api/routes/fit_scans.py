@@ -1,41 +1,48 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies.auth import get_current_user
-from app.db.session import get_db
+from app.api.dependencies.auth import get_current_principal
+from app.api.dependencies.rate_limit import enforce_plan_rate_limit
+from app.db.session import get_async_db
 from app.schemas.fit_scans import (
     FitScanCreateRequest,
     FitScanResponse,
     FitScanResponseEnvelope,
 )
 from app.services.fit_scan_service import FitScanService
+from app.services.quota_service import EVENT_FIT_SCAN
 
 router = APIRouter(prefix="/api", tags=["fit-scans"])
 
 
 @router.post("/fit-scans", response_model=FitScanResponseEnvelope)
-def create_fit_scan(
+async def create_fit_scan(
     payload: FitScanCreateRequest,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
     service = FitScanService(db)
-    fit_scan = service.run_fit_scan(
-        user=current_user, funding_opportunity_id=payload.funding_opportunity_id
+    fit_scan = await service.run_fit_scan(
+        user=current_user,
+        funding_opportunity_id=payload.funding_opportunity_id,
+        idempotency_key=idempotency_key,
+        # Replays of a stored scan do not spend plan rate-limit budget.
+        admit=lambda: enforce_plan_rate_limit(db, current_user, EVENT_FIT_SCAN),
     )
     return FitScanResponseEnvelope(fit_scan=_to_response(fit_scan))
 
 
 @router.get("/fit-scans/{fit_scan_id}", response_model=FitScanResponseEnvelope)
-def get_fit_scan(
+async def get_fit_scan(
     fit_scan_id: UUID,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
     service = FitScanService(db)
-    fit_scan = service.get_fit_scan(user=current_user, fit_scan_id=fit_scan_id)
+    fit_scan = await service.get_fit_scan(user=current_user, fit_scan_id=fit_scan_id)
     return FitScanResponseEnvelope(fit_scan=_to_response(fit_scan))
 
 
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies.auth import get_current_user
-from app.db.session import get_db
+from app.api.dependencies.auth import get_current_principal
+from app.db.session import get_async_db
+from app.db.unit_of_work import async_unit_of_work
 from app.schemas.ngo_profile import (
     NGOProfileCompletenessResponse,
     NGOProfileCreate,
@@ -20,13 +21,14 @@ router = APIRouter(prefix="/ngo-profile", tags=["ngo-profile"])
 
 
 @router.post("", response_model=NGOProfileRead)
-def create_ngo_profile(
+async def create_ngo_profile(
     payload: NGOProfileCreate,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
-    profile = create_profile(db, current_user.id, payload)
+    async with async_unit_of_work(db):
+        profile = await db.run_sync(create_profile, current_user.id, payload)
     return NGOProfileRead(
         id=str(profile.id),
         user_id=str(profile.user_id),
@@ -58,12 +60,12 @@ def create_ngo_profile(
 
 
 @router.get("", response_model=NGOProfileRead)
-def read_ngo_profile(
+async def read_ngo_profile(
     request: Request,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
-    profile = get_profile(db, current_user.id)
+    profile = await db.run_sync(get_profile, current_user.id)
     return NGOProfileRead(
         id=str(profile.id),
         user_id=str(profile.user_id),
@@ -95,13 +97,14 @@ def read_ngo_profile(
 
 
 @router.put("", response_model=NGOProfileRead)
-def update_ngo_profile(
+async def update_ngo_profile(
     payload: NGOProfileUpdate,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
-    profile = update_profile(db, current_user.id, payload)
+    async with async_unit_of_work(db):
+        profile = await db.run_sync(update_profile, current_user.id, payload)
     return NGOProfileRead(
         id=str(profile.id),
         user_id=str(profile.user_id),
@@ -133,12 +136,12 @@ def update_ngo_profile(
 
 
 @router.get("/completeness", response_model=NGOProfileCompletenessResponse)
-def read_profile_completeness(
+async def read_profile_completeness(
     request: Request,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_principal),
 ):
-    status, score, missing_fields = get_completeness(db, current_user.id)
+    status, score, missing_fields = await db.run_sync(get_completeness, current_user.id)
     return NGOProfileCompletenessResponse(
         profile_status=status,
         completeness_score=score,
@@ -26,19 +26,37 @@ class Settings(BaseSettings):
     AUTH_MAGIC_LINK_TTL_MIN: int
     AUTH_ALLOWED_REDIRECT_URLS: str
     AUTH_RATE_LIMIT_ENABLED: bool
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    AUTH_TOKEN_RETENTION_DAYS: int = 7
+    AUTH_TOKEN_SWEEPER_ENABLED: bool = False
+    AUTH_TOKEN_SWEEP_INTERVAL_SECONDS: int = 3600
+    RATE_LIMIT_BACKEND: str = "postgres"
 
     GOOGLE_OAUTH_CLIENT_ID: str
     GOOGLE_OAUTH_CLIENT_SECRET: str
     GOOGLE_OAUTH_REDIRECT_URI: str
     GOOGLE_OAUTH_SCOPES: str | None = None
+    GOOGLE_OAUTH_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+    GOOGLE_JWKS_CACHE_PATH: str = ".cache/google_jwks.json"
 
     EMAIL_PROVIDER: str
     EMAIL_FROM_NAME: str
     EMAIL_FROM_ADDRESS: str
     EMAIL_API_KEY: str
+    EMAIL_API_BASE_URL: str = "https://api.resend.com"
+    EMAIL_OUTBOX_DISPATCHER_ENABLED: bool = True
+    EMAIL_OUTBOX_POLL_SECONDS: float = 1.0
 
     OPENAI_API_KEY: str
     PROMPT_VERSION: str
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_MAX_CONCURRENCY_PER_USER: int = 1
+    OPENAI_QUEUE_TIMEOUT_SECONDS: int = 30
+    OPENAI_CASSETTE_MODE: str = "off"
+    OPENAI_CASSETTE_DIR: str = ".cassettes/openai"
+    QUOTA_RESERVATION_TTL_SECONDS: int = 300
+    ENTITLEMENTS_CACHE_TTL_SECONDS: int = 5
 
     STRIPE_MODE: str
     STRIPE_SECRET_KEY: str
@@ -51,10 +69,14 @@ class Settings(BaseSettings):
     TEST_MODE: bool = False
     TEST_MODE_SECRET: str | None = None
 
+    ADMIN_API_SECRET: str | None = None
+
 
 _VALID_APP_ENVS = {"dev", "staging", "prod"}
 _VALID_LOG_LEVELS = {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}
 _VALID_STRIPE_MODES = {"test", "live"}
+_VALID_CASSETTE_MODES = {"off", "record", "replay"}
+_VALID_RATE_LIMIT_BACKENDS = {"memory", "postgres"}
 
 
 def _split_csv(value: str) -> list[str]:
@@ -150,13 +172,47 @@ def validate_config() -> Settings:
     if settings.AUTH_MAGIC_LINK_TTL_MIN <= 0:
         errors.append("CONFIG_ERROR AUTH_MAGIC_LINK_TTL_MIN: must be > 0")
 
+    if settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS < 0:
+        errors.append("CONFIG_ERROR AUTH_PRINCIPAL_CACHE_TTL_SECONDS: must be >= 0")
+    if settings.AUTH_TOKEN_RETENTION_DAYS < 0:
+        errors.append("CONFIG_ERROR AUTH_TOKEN_RETENTION_DAYS: must be >= 0")
+    if settings.AUTH_TOKEN_SWEEP_INTERVAL_SECONDS <= 0:
+        errors.append("CONFIG_ERROR AUTH_TOKEN_SWEEP_INTERVAL_SECONDS: must be > 0")
+    if settings.RATE_LIMIT_BACKEND.lower() not in _VALID_RATE_LIMIT_BACKENDS:
+        errors.append("CONFIG_ERROR RATE_LIMIT_BACKEND: must be memory or postgres")
+
+    if settings.OPENAI_MAX_CONCURRENCY <= 0:
+        errors.append("CONFIG_ERROR OPENAI_MAX_CONCURRENCY: must be > 0")
+    if settings.OPENAI_MAX_CONCURRENCY_PER_USER <= 0:
+        errors.append("CONFIG_ERROR OPENAI_MAX_CONCURRENCY_PER_USER: must be > 0")
+    if settings.OPENAI_QUEUE_TIMEOUT_SECONDS <= 0:
+        errors.append("CONFIG_ERROR OPENAI_QUEUE_TIMEOUT_SECONDS: must be > 0")
+    if settings.QUOTA_RESERVATION_TTL_SECONDS <= settings.OPENAI_QUEUE_TIMEOUT_SECONDS:
+        errors.append(
+            "CONFIG_ERROR QUOTA_RESERVATION_TTL_SECONDS: must exceed OPENAI_QUEUE_TIMEOUT_SECONDS"
+        )
+    if settings.ENTITLEMENTS_CACHE_TTL_SECONDS < 0:
+        errors.append("CONFIG_ERROR ENTITLEMENTS_CACHE_TTL_SECONDS: must be >= 0")
+    if settings.OPENAI_CASSETTE_MODE.lower() not in _VALID_CASSETTE_MODES:
+        errors.append("CONFIG_ERROR OPENAI_CASSETTE_MODE: must be off, record, or replay")
+    elif settings.OPENAI_CASSETTE_MODE.lower() != "off" and settings.APP_ENV == "prod":
+        errors.append("CONFIG_ERROR OPENAI_CASSETTE_MODE: must be off in prod")
+
     if settings.EMAIL_PROVIDER.lower() != "resend":
         errors.append("CONFIG_ERROR EMAIL_PROVIDER: must be resend for MVP")
     if "@" not in settings.EMAIL_FROM_ADDRESS:
         errors.append("CONFIG_ERROR EMAIL_FROM_ADDRESS: must be a valid email address")
+    if not _is_valid_url(settings.EMAIL_API_BASE_URL):
+        errors.append("CONFIG_ERROR EMAIL_API_BASE_URL: must be a valid http(s) URL")
+    if settings.EMAIL_OUTBOX_POLL_SECONDS <= 0:
+        errors.append("CONFIG_ERROR EMAIL_OUTBOX_POLL_SECONDS: must be > 0")
 
     if not _is_valid_url(settings.GOOGLE_OAUTH_REDIRECT_URI):
         errors.append("CONFIG_ERROR GOOGLE_OAUTH_REDIRECT_URI: must be a valid http(s) URL")
+    if not _is_valid_url(settings.GOOGLE_OAUTH_TOKEN_URL):
+        errors.append("CONFIG_ERROR GOOGLE_OAUTH_TOKEN_URL: must be a valid http(s) URL")
+    if not _is_valid_url(settings.GOOGLE_JWKS_URL):
+        errors.append("CONFIG_ERROR GOOGLE_JWKS_URL: must be a valid http(s) URL")
 
     if settings.STRIPE_MODE.lower() not in _VALID_STRIPE_MODES:
         errors.append("CONFIG_ERROR STRIPE_MODE: must be test or live")
@@ -180,6 +236,10 @@ def validate_config() -> Settings:
             )
             sys.exit(1)
 
+    if settings.ADMIN_API_SECRET is not None and len(settings.ADMIN_API_SECRET.strip()) < 32:
+        _log_errors(["CONFIG_ERROR ADMIN_API_SECRET: must be at least 32 chars when set"])
+        sys.exit(1)
+
     return settings
 
 
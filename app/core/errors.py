@@ -7,6 +7,7 @@ class DomainError(Exception):
     message: str
     status_code: int
     details: dict | None = None
+    headers: dict[str, str] | None = None
 
 
 class NotFoundError(DomainError):
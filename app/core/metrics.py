@@ -0,0 +1,166 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+@dataclass
+class _HistogramState:
+    buckets: tuple[float, ...]
+    bucket_counts: list[int]
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+
+
+@dataclass
+class _Metric:
+    name: str
+    kind: str
+    help_text: str
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    values: dict[LabelKey, float | _HistogramState] = field(default_factory=dict)
+
+
+class MetricsRegistry:
+    """Minimal in-process metrics registry rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _metric(
+        self, name: str, kind: str, help_text: str, buckets: Iterable[float] | None = None
+    ) -> _Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = _Metric(
+                name=name,
+                kind=kind,
+                help_text=help_text,
+                buckets=tuple(buckets) if buckets else DEFAULT_BUCKETS,
+            )
+            self._metrics[name] = metric
+        return metric
+
+    def inc(self, name: str, value: float = 1.0, *, help_text: str = "", **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            metric = self._metric(name, "counter", help_text)
+            metric.values[key] = float(metric.values.get(key, 0.0)) + value
+
+    def set_gauge(self, name: str, value: float, *, help_text: str = "", **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            metric = self._metric(name, "gauge", help_text)
+            metric.values[key] = float(value)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        *,
+        help_text: str = "",
+        buckets: Iterable[float] | None = None,
+        **labels: object,
+    ) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            metric = self._metric(name, "histogram", help_text, buckets)
+            state = metric.values.get(key)
+            if not isinstance(state, _HistogramState):
+                state = _HistogramState(
+                    buckets=metric.buckets, bucket_counts=[0] * len(metric.buckets)
+                )
+                metric.values[key] = state
+            state.count += 1
+            state.total += value
+            state.maximum = max(state.maximum, value)
+            for index, bound in enumerate(state.buckets):
+                if value <= bound:
+                    state.bucket_counts[index] += 1
+
+    def snapshot(self) -> dict[str, dict[str, object]]:
+        with self._lock:
+            result: dict[str, dict[str, object]] = {}
+            for metric in self._metrics.values():
+                series = {}
+                for key, value in metric.values.items():
+                    label_str = ",".join(f"{name}={val}" for name, val in key)
+                    if isinstance(value, _HistogramState):
+                        series[label_str] = {
+                            "count": value.count,
+                            "sum": value.total,
+                            "max": value.maximum,
+                        }
+                    else:
+                        series[label_str] = value
+                result[metric.name] = {"type": metric.kind, "series": series}
+            return result
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for metric in sorted(self._metrics.values(), key=lambda item: item.name):
+                if metric.help_text:
+                    lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                for key, value in sorted(metric.values.items()):
+                    if isinstance(value, _HistogramState):
+                        for bound, count in zip(value.buckets, value.bucket_counts):
+                            bucket_key = key + (("le", _format_value(bound)),)
+                            lines.append(
+                                f"{metric.name}_bucket{_format_labels(bucket_key)} {count}"
+                            )
+                        inf_key = key + (("le", "+Inf"),)
+                        lines.append(
+                            f"{metric.name}_bucket{_format_labels(inf_key)} {value.count}"
+                        )
+                        lines.append(
+                            f"{metric.name}_sum{_format_labels(key)} {_format_value(value.total)}"
+                        )
+                        lines.append(f"{metric.name}_count{_format_labels(key)} {value.count}")
+                    else:
+                        lines.append(f"{metric.name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    rendered = ",".join(f'{name}="{value}"' for name, value in key)
+    return "{" + rendered + "}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+metrics = MetricsRegistry()
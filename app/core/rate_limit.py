@@ -1,19 +1,296 @@
+"""Sliding-window-counter rate limits with interchangeable backends.
+
+Each key keeps two counters (this window and the previous one), and hits in the
+trailing window are estimated as previous * (1 - elapsed_fraction) + current.
+Memory per key is constant whatever the limit. `MemorySlidingWindowLimiter`
+keeps the counters in this process (tests, single-worker runs);
+`PostgresSlidingWindowLimiter` shares them between workers. Async routes call
+`hit_async`, which does not block the event loop.
+"""
+import itertools
+import math
+import threading
 import time
-from collections import defaultdict, deque
-from typing import Deque, Dict
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Protocol
+
+from sqlalchemy import BigInteger, Float, Integer, bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after_seconds: int = 0
+
+
+def sliding_window_retry_after(
+    *,
+    previous_count: int,
+    current_count: int,
+    elapsed_fraction: float,
+    limit: int,
+    window_seconds: int,
+) -> int:
+    """Seconds until one more hit fits under `limit`, for a sliding-window counter.
+
+    The counter estimates hits in the trailing window as
+    previous_count * (1 - elapsed_fraction) + current_count.
+    """
+    remaining_in_window = (1 - elapsed_fraction) * window_seconds
+    if current_count + 1 > limit:
+        # Wait for the next window, where today's hits become the decaying previous count.
+        fraction = 1 - (limit - 1) / current_count if current_count else 0
+        wait = remaining_in_window + max(fraction, 0) * window_seconds
+    else:
+        fraction = 1 - (limit - 1 - current_count) / previous_count if previous_count else 0
+        wait = max(fraction - elapsed_fraction, 0) * window_seconds
+    # Round before ceil so float noise (2400.0000001) does not add a second.
+    return max(math.ceil(round(wait, 6)), 1)
+
+
+def _roll_forward(
+    stored_index: int, current_count: int, previous_count: int, window_index: int
+) -> tuple[int, int]:
+    """(current, previous) counts as seen from window_index."""
+    if stored_index == window_index:
+        return current_count, previous_count
+    if stored_index == window_index - 1:
+        return 0, current_count
+    return 0, 0
+
 
+def _denied(
+    current_count: int,
+    previous_count: int,
+    elapsed_fraction: float,
+    limit: int,
+    window_seconds: int,
+) -> RateLimitDecision:
+    return RateLimitDecision(
+        allowed=False,
+        retry_after_seconds=sliding_window_retry_after(
+            previous_count=previous_count,
+            current_count=current_count,
+            elapsed_fraction=elapsed_fraction,
+            limit=limit,
+            window_seconds=window_seconds,
+        ),
+    )
+
+
+class RateLimitBackend(Protocol):
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> RateLimitDecision:
+        """Count one hit for key unless it would exceed limit per window_seconds."""
+
+    async def hit_async(
+        self, key: str, *, limit: int, window_seconds: int
+    ) -> RateLimitDecision:
+        """`hit` for async callers."""
+
+
+class _Window:
+    __slots__ = ("window_index", "current_count", "previous_count", "expires_at")
+
+    def __init__(self, window_index: int) -> None:
+        self.window_index = window_index
+        self.current_count = 0
+        self.previous_count = 0
+        self.expires_at = 0.0
+
+
+class _Stripe:
+    __slots__ = ("lock", "windows")
 
-class RateLimiter:
     def __init__(self) -> None:
-        self._events: Dict[str, Deque[float]] = defaultdict(deque)
-
-    def allow(self, key: str, limit: int, window_seconds: int) -> bool:
-        now = time.time()
-        window_start = now - window_seconds
-        events = self._events[key]
-        while events and events[0] < window_start:
-            events.popleft()
-        if len(events) >= limit:
-            return False
-        events.append(now)
-        return True
+        self.lock = threading.Lock()
+        self.windows: OrderedDict[str, _Window] = OrderedDict()
+
+
+class MemorySlidingWindowLimiter:
+    """Per-process sliding-window counters, bounded to about `max_keys` keys.
+
+    Keys are spread over independently locked stripes so concurrent hits on
+    different keys do not contend. Each stripe is kept in least-recently-hit
+    order: keys whose windows have expired are dropped from the front as hits
+    arrive, and the least recently hit key is evicted once a stripe is full.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_keys: int = 100_000,
+        stripes: int = 64,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._stripes = tuple(_Stripe() for _ in range(stripes))
+        self._keys_per_stripe = max(max_keys // stripes, 1)
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return sum(len(stripe.windows) for stripe in self._stripes)
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> RateLimitDecision:
+        now = self._clock()
+        window_index = int(now // window_seconds)
+        elapsed_fraction = (now - window_index * window_seconds) / window_seconds
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        with stripe.lock:
+            windows = stripe.windows
+            window = windows.get(key)
+            if window is None:
+                window = windows[key] = _Window(window_index)
+            else:
+                windows.move_to_end(key)
+            current_count, previous_count = _roll_forward(
+                window.window_index, window.current_count, window.previous_count, window_index
+            )
+            window.window_index = window_index
+            window.current_count = current_count
+            window.previous_count = previous_count
+            allowed = previous_count * (1 - elapsed_fraction) + current_count + 1 <= limit
+            if allowed:
+                window.current_count += 1
+                window.expires_at = (window_index + 2) * window_seconds
+            self._evict(windows, now)
+        if allowed:
+            return RateLimitDecision(allowed=True)
+        return _denied(current_count, previous_count, elapsed_fraction, limit, window_seconds)
+
+    async def hit_async(
+        self, key: str, *, limit: int, window_seconds: int
+    ) -> RateLimitDecision:
+        # Only a stripe lock is taken, never across I/O.
+        return self.hit(key, limit=limit, window_seconds=window_seconds)
+
+    def _evict(self, windows: OrderedDict[str, _Window], now: float) -> None:
+        while len(windows) > 1:
+            oldest = next(iter(windows.values()))
+            if len(windows) <= self._keys_per_stripe and oldest.expires_at > now:
+                return
+            windows.popitem(last=False)
+
+
+# Roll the two windows forward to :window_index, then count the hit only if the
+# sliding estimate stays within :limit. No row comes back when the hit is denied.
+_HIT_SQL = text(
+    """
+    INSERT INTO rate_limit_windows AS w
+        (key, window_index, current_count, previous_count, expires_at)
+    VALUES (:key, :window_index, 1, 0, to_timestamp((:window_index + 2) * :window_seconds))
+    ON CONFLICT (key) DO UPDATE SET
+        window_index = :window_index,
+        previous_count = CASE
+            WHEN w.window_index = :window_index THEN w.previous_count
+            WHEN w.window_index = :window_index - 1 THEN w.current_count
+            ELSE 0
+        END,
+        current_count = CASE
+            WHEN w.window_index = :window_index THEN w.current_count ELSE 0
+        END + 1,
+        expires_at = excluded.expires_at
+    WHERE CASE
+            WHEN w.window_index = :window_index THEN w.previous_count
+            WHEN w.window_index = :window_index - 1 THEN w.current_count
+            ELSE 0
+        END * (1 - :elapsed_fraction)
+        + CASE WHEN w.window_index = :window_index THEN w.current_count ELSE 0 END
+        + 1 <= :limit
+    RETURNING w.current_count
+    """
+).bindparams(
+    # Typed so asyncpg, which prepares the statement, sees one type per parameter.
+    bindparam("window_index", type_=BigInteger),
+    bindparam("window_seconds", type_=Integer),
+    bindparam("elapsed_fraction", type_=Float),
+    bindparam("limit", type_=Integer),
+)
+_STATE_SQL = text(
+    "SELECT window_index, current_count, previous_count FROM rate_limit_windows WHERE key = :key"
+)
+_PURGE_SQL = text(
+    """
+    DELETE FROM rate_limit_windows WHERE key IN (
+        SELECT key FROM rate_limit_windows WHERE expires_at < now() LIMIT :batch
+    )
+    """
+)
+
+
+class PostgresSlidingWindowLimiter:
+    """Sliding-window counters in the UNLOGGED rate_limit_windows table.
+
+    One row per key, so every worker shares the same limits. Hits run on their
+    own autocommit connection: the row lock is never held for the caller's
+    transaction. `hit_async` needs `async_engine`. Expired rows are purged every
+    `purge_every` hits.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        async_engine: AsyncEngine | None = None,
+        purge_every: int = 1000,
+        purge_batch: int = 1000,
+    ):
+        self._engine = engine
+        self._async_engine = async_engine
+        self._purge_every = purge_every
+        self._purge_batch = purge_batch
+        self._hits = itertools.count(1)
+
+    def hit(self, key: str, *, limit: int, window_seconds: int) -> RateLimitDecision:
+        params = _hit_params(key, limit, window_seconds)
+        with self._engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            counted = connection.execute(_HIT_SQL, params).first()
+            if next(self._hits) % self._purge_every == 0:
+                connection.execute(_PURGE_SQL, {"batch": self._purge_batch})
+            if counted is not None:
+                return RateLimitDecision(allowed=True)
+            state = connection.execute(_STATE_SQL, {"key": key}).one()
+        return _denied_from_state(state, params)
+
+    async def hit_async(
+        self, key: str, *, limit: int, window_seconds: int
+    ) -> RateLimitDecision:
+        if self._async_engine is None:
+            raise RuntimeError("PostgresSlidingWindowLimiter has no async_engine")
+        params = _hit_params(key, limit, window_seconds)
+        async with self._async_engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            counted = (await connection.execute(_HIT_SQL, params)).first()
+            if next(self._hits) % self._purge_every == 0:
+                await connection.execute(_PURGE_SQL, {"batch": self._purge_batch})
+            if counted is not None:
+                return RateLimitDecision(allowed=True)
+            state = (await connection.execute(_STATE_SQL, {"key": key})).one()
+        return _denied_from_state(state, params)
+
+
+def _hit_params(key: str, limit: int, window_seconds: int) -> dict[str, object]:
+    now = time.time()
+    window_index = int(now // window_seconds)
+    return {
+        "key": key,
+        "window_index": window_index,
+        "window_seconds": window_seconds,
+        "elapsed_fraction": (now - window_index * window_seconds) / window_seconds,
+        "limit": limit,
+    }
+
+
+def _denied_from_state(state, params: dict[str, object]) -> RateLimitDecision:
+    current_count, previous_count = _roll_forward(
+        state.window_index, state.current_count, state.previous_count, params["window_index"]
+    )
+    return _denied(
+        current_count,
+        previous_count,
+        params["elapsed_fraction"],
+        params["limit"],
+        params["window_seconds"],
+    )
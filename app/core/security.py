@@ -2,6 +2,7 @@ import hmac
 import secrets
 import time
 import uuid
+from datetime import datetime
 from hashlib import sha256
 from typing import Any
 
@@ -12,6 +13,8 @@ from app.core.config import get_settings
 
 JWT_ISSUER = "grantpilot"
 JWT_AUDIENCE = "grantpilot-web"
+OAUTH_STATE_AUDIENCE = "grantpilot-oauth-state"
+OAUTH_STATE_TTL_SECONDS = 600
 
 
 def generate_opaque_token(length: int = 48) -> str:
@@ -24,7 +27,14 @@ def hash_token(token: str) -> str:
     return digest
 
 
-def create_access_token(user_id: str, email: str, plan: str) -> tuple[str, int]:
+def create_access_token(
+    user_id: str,
+    email: str,
+    plan: str,
+    *,
+    plan_period_end: datetime | None = None,
+    plan_version: int = 0,
+) -> tuple[str, int]:
     settings = get_settings()
     now = int(time.time())
     ttl_seconds = settings.AUTH_ACCESS_TOKEN_TTL_MIN * 60
@@ -34,6 +44,8 @@ def create_access_token(user_id: str, email: str, plan: str) -> tuple[str, int]:
         "sub": user_id,
         "email": email,
         "plan": plan,
+        "plan_period_end": int(plan_period_end.timestamp()) if plan_period_end else None,
+        "plan_version": plan_version,
         "iat": now,
         "nbf": now,
         "exp": now + ttl_seconds,
@@ -41,3 +53,30 @@ def create_access_token(user_id: str, email: str, plan: str) -> tuple[str, int]:
     }
     token = jwt.encode(payload, settings.AUTH_JWT_SIGNING_KEY, algorithm="HS256")
     return token, ttl_seconds
+
+
+def create_oauth_state(next_path: str | None = None) -> str:
+    """Signed, expiring OAuth state carrying a nonce and the post-login deep link."""
+    now = int(time.time())
+    payload: dict[str, Any] = {
+        "iss": JWT_ISSUER,
+        "aud": OAUTH_STATE_AUDIENCE,
+        "iat": now,
+        "exp": now + OAUTH_STATE_TTL_SECONDS,
+        "nonce": generate_opaque_token(16),
+    }
+    if next_path:
+        payload["next"] = next_path
+    return jwt.encode(payload, get_settings().AUTH_JWT_SIGNING_KEY, algorithm="HS256")
+
+
+def decode_oauth_state(state: str) -> dict[str, Any]:
+    """Claims of a state from create_oauth_state; raises jwt.InvalidTokenError."""
+    return jwt.decode(
+        state,
+        get_settings().AUTH_JWT_SIGNING_KEY,
+        algorithms=["HS256"],
+        audience=OAUTH_STATE_AUDIENCE,
+        issuer=JWT_ISSUER,
+        options={"require": ["exp", "nonce"]},
+    )
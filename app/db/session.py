@@ -1,17 +1,49 @@
 import os
-from typing import Generator, Optional
+from typing import AsyncGenerator, Optional
 
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
+
+def async_database_url(url: str) -> URL:
+    """DATABASE_URL with the asyncpg driver, for the engine that serves requests."""
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    # asyncpg takes libpq's sslmode values under the name ssl.
+    sslmode = async_url.query.get("sslmode")
+    if sslmode is not None:
+        async_url = async_url.difference_update_query(["sslmode"]).update_query_dict(
+            {"ssl": sslmode}
+        )
+    return async_url
+
+
+# Alembic, scripts and background threads use the sync psycopg2 engine; routes
+# use the asyncpg engine so a request waiting on the database holds no thread.
 engine = create_engine(DATABASE_URL, pool_pre_ping=True) if DATABASE_URL else None
 SessionLocal = (
     sessionmaker(bind=engine, autoflush=False, autocommit=False) if engine else None
 )
 
+async_engine = (
+    create_async_engine(async_database_url(DATABASE_URL), pool_pre_ping=True)
+    if DATABASE_URL
+    else None
+)
+# Objects stay loaded after commit: an expired attribute cannot be lazy-loaded
+# outside run_sync, and routes read what they just wrote to build the response.
+AsyncSessionLocal = (
+    async_sessionmaker(
+        bind=async_engine, autoflush=False, autocommit=False, expire_on_commit=False
+    )
+    if async_engine
+    else None
+)
+
 
 def check_db_connection() -> Optional[str]:
     if not DATABASE_URL or engine is None:
@@ -24,11 +56,8 @@ def check_db_connection() -> Optional[str]:
         return f"DB connection failed: {exc}"
 
 
-def get_db() -> Generator[Session, None, None]:
-    if SessionLocal is None:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
         raise RuntimeError("DATABASE_URL is not set")
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,31 @@
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """Commit the session once when the block succeeds, roll back if it raises.
+
+    Services add and flush but never commit; the route or use case that owns the
+    request wraps its writes in exactly one unit of work.
+    """
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+@asynccontextmanager
+async def async_unit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """`unit_of_work` for the request's AsyncSession."""
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
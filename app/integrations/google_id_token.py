@@ -0,0 +1,180 @@
+"""Local verification of Google OpenID Connect id_tokens.
+
+Google signs id_tokens with rotating RSA keys published as a JWKS. The key set
+is cached in memory and in a JSON file (so a restarted worker does not refetch
+it), and refetched when it is older than the response's Cache-Control max-age
+or a token names a `kid` the cache does not have. Refetches on a `kid` miss are
+throttled so that forged tokens cannot turn into one JWKS request each. When a
+refetch fails the previous keys stay in use. One thread fetches at a time,
+outside the cache lock; logins whose `kid` is cached do not wait for it.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+import httpx
+import jwt
+
+from app.core.config import get_settings
+from app.integrations.http_clients import UPSTREAM_GOOGLE, get_http_client
+
+logger = logging.getLogger("auth")
+
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+DEFAULT_JWKS_TTL_SECONDS = 3600
+KID_MISS_REFETCH_INTERVAL_SECONDS = 60
+ID_TOKEN_LEEWAY_SECONDS = 30
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class IdTokenError(Exception):
+    pass
+
+
+class JwksCache:
+    """Signing keys from a JWKS endpoint, cached in memory and optionally on disk."""
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        cache_path: str | Path | None = None,
+        client: httpx.Client | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._url = url
+        self._cache_path = Path(cache_path) if cache_path else None
+        self._client = client
+        self._clock = clock
+        # _lock guards the cached state and is never held across the network;
+        # _fetch_lock lets one thread at a time fetch the key set.
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._last_fetch_attempt = float("-inf")
+        self._disk_checked = False
+
+    def get_key(self, kid: str | None) -> jwt.PyJWK:
+        if not kid:
+            raise IdTokenError("id_token has no kid")
+        with self._lock:
+            if not self._disk_checked:
+                self._disk_checked = True
+                self._load_from_disk()
+            key = self._keys.get(kid)
+            due = self._refresh_due(kid, self._clock())
+        # A login whose kid is cached keeps using it while another thread fetches;
+        # only a kid miss waits for the fetch in flight.
+        if due and self._fetch_lock.acquire(blocking=key is None):
+            try:
+                with self._lock:
+                    now = self._clock()
+                    due = self._refresh_due(kid, now)
+                    if due:
+                        self._last_fetch_attempt = now
+                if due:
+                    self._refresh(now)
+            finally:
+                self._fetch_lock.release()
+            with self._lock:
+                key = self._keys.get(kid)
+        if key is None:
+            raise IdTokenError(f"Unknown id_token signing key {kid}")
+        return key
+
+    def _refresh_due(self, kid: str, now: float) -> bool:
+        if now >= self._expires_at:
+            return True
+        return kid not in self._keys and (
+            now - self._last_fetch_attempt >= KID_MISS_REFETCH_INTERVAL_SECONDS
+        )
+
+    def _load_from_disk(self) -> None:
+        if self._cache_path is None or not self._cache_path.exists():
+            return
+        try:
+            cached = json.loads(self._cache_path.read_text(encoding="utf-8"))
+            self._keys = _parse_keys(cached["jwks"])
+            self._expires_at = float(cached["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError, jwt.PyJWTError):
+            logger.warning("google_jwks_cache_unreadable path=%s", self._cache_path)
+
+    def _refresh(self, now: float) -> None:
+        client = self._client or get_http_client(UPSTREAM_GOOGLE)
+        try:
+            response = client.get(self._url)
+            response.raise_for_status()
+            jwks = response.json()
+            keys = _parse_keys(jwks)
+        except (httpx.HTTPError, ValueError, KeyError, TypeError, jwt.PyJWTError) as exc:
+            with self._lock:
+                if not self._keys:
+                    raise IdTokenError(f"Could not fetch Google signing keys: {exc}") from exc
+                logger.warning("google_jwks_refresh_failed error=%s", exc)
+                # Keep the stale keys, but do not retry on every login.
+                self._expires_at = now + KID_MISS_REFETCH_INTERVAL_SECONDS
+            return
+
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        ttl = int(match.group(1)) if match else DEFAULT_JWKS_TTL_SECONDS
+        with self._lock:
+            self._keys = keys
+            self._expires_at = now + ttl
+        self._save_to_disk(jwks, now + ttl)
+
+    def _save_to_disk(self, jwks: dict[str, Any], expires_at: float) -> None:
+        if self._cache_path is None:
+            return
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._cache_path.with_suffix(".json.tmp")
+            tmp_path.write_text(
+                json.dumps({"expires_at": expires_at, "jwks": jwks}), encoding="utf-8"
+            )
+            tmp_path.replace(self._cache_path)
+        except OSError as exc:
+            logger.warning("google_jwks_cache_write_failed error=%s", exc)
+
+
+def _parse_keys(jwks: dict[str, Any]) -> dict[str, jwt.PyJWK]:
+    return {key["kid"]: jwt.PyJWK(key) for key in jwks["keys"] if key.get("kid")}
+
+
+@lru_cache(maxsize=1)
+def get_google_jwks() -> JwksCache:
+    settings = get_settings()
+    return JwksCache(settings.GOOGLE_JWKS_URL, cache_path=settings.GOOGLE_JWKS_CACHE_PATH)
+
+
+def verify_google_id_token(id_token: str, *, client_id: str, jwks: JwksCache) -> dict[str, Any]:
+    """Verify signature, issuer, audience and expiry; return the token's claims."""
+    try:
+        header = jwt.get_unverified_header(id_token)
+    except jwt.PyJWTError as exc:
+        raise IdTokenError("Malformed id_token") from exc
+    if header.get("alg") != "RS256":
+        raise IdTokenError(f"Unexpected id_token algorithm {header.get('alg')}")
+    key = jwks.get_key(header.get("kid"))
+    try:
+        claims = jwt.decode(
+            id_token,
+            key.key,
+            algorithms=["RS256"],
+            audience=client_id,
+            leeway=ID_TOKEN_LEEWAY_SECONDS,
+            options={"require": ["iss", "sub", "aud", "exp", "iat"]},
+        )
+    except jwt.PyJWTError as exc:
+        raise IdTokenError(f"Invalid id_token: {exc}") from exc
+    if claims["iss"] not in GOOGLE_ISSUERS:
+        raise IdTokenError(f"Unexpected id_token issuer {claims['iss']}")
+    return claims
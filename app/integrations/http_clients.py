@@ -0,0 +1,121 @@
+"""Long-lived outbound HTTP clients, one per upstream.
+
+Each upstream gets its own keep-alive pool, timeouts and connection limits, so
+repeated calls (OAuth token exchange, email batches, OpenAI) reuse warm TLS
+connections instead of handshaking per request. HTTP/2 is negotiated through
+`h2` (installed by httpx[http2]); without it clients stay on HTTP/1.1. Clients
+are created on first use and closed from the app lifespan (or by scripts) with
+close_http_clients().
+
+Every response records `outbound_http_seconds{upstream,status}` (time until the
+body is read).
+"""
+from __future__ import annotations
+
+import importlib.util
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import httpx
+
+from app.core.metrics import metrics
+
+UPSTREAM_GOOGLE = "google"
+UPSTREAM_RESEND = "resend"
+UPSTREAM_OPENAI = "openai"
+
+_STARTED_AT = "grantpilot_started_at"
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    timeout: httpx.Timeout
+    limits: httpx.Limits
+
+
+UPSTREAMS: dict[str, UpstreamConfig] = {
+    UPSTREAM_GOOGLE: UpstreamConfig(
+        timeout=httpx.Timeout(10.0, connect=3.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    ),
+    UPSTREAM_RESEND: UpstreamConfig(
+        timeout=httpx.Timeout(10.0, connect=3.0),
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+    ),
+    # Concurrency is already bounded by the LLM admission scheduler.
+    UPSTREAM_OPENAI: UpstreamConfig(
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    ),
+}
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _record_start(request: httpx.Request) -> None:
+    request.extensions[_STARTED_AT] = time.perf_counter()
+
+
+def _latency_hook(upstream: str):
+    def _record_latency(response: httpx.Response) -> None:
+        response.read()
+        started = response.request.extensions.get(_STARTED_AT)
+        if started is None:
+            return
+        metrics.observe(
+            "outbound_http_seconds",
+            time.perf_counter() - started,
+            help_text="Outbound HTTP request latency by upstream",
+            upstream=upstream,
+            status=response.status_code,
+        )
+
+    return _record_latency
+
+
+class HttpClientRegistry:
+    def __init__(self, upstreams: dict[str, UpstreamConfig] | None = None) -> None:
+        self._upstreams = upstreams or UPSTREAMS
+        self._lock = threading.Lock()
+        self._clients: dict[str, httpx.Client] = {}
+
+    def get(self, upstream: str) -> httpx.Client:
+        client = self._clients.get(upstream)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(upstream)
+            if client is None:
+                config = self._upstreams[upstream]
+                client = httpx.Client(
+                    timeout=config.timeout,
+                    limits=config.limits,
+                    http2=HTTP2_AVAILABLE,
+                    event_hooks={
+                        "request": [_record_start],
+                        "response": [_latency_hook(upstream)],
+                    },
+                )
+                self._clients[upstream] = client
+            return client
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+
+@lru_cache(maxsize=1)
+def get_http_clients() -> HttpClientRegistry:
+    return HttpClientRegistry()
+
+
+def get_http_client(upstream: str) -> httpx.Client:
+    return get_http_clients().get(upstream)
+
+
+def close_http_clients() -> None:
+    get_http_clients().close()
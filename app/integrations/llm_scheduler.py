@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator
+
+from app.core.config import get_settings
+from app.core.errors import DomainError
+from app.core.metrics import metrics
+
+# Relative share of LLM slots each plan receives when all queues are busy.
+PLAN_WEIGHTS: dict[str, int] = {
+    "IMPACT": 4,
+    "GROWTH": 2,
+    "FREE": 1,
+}
+DEFAULT_PLAN = "FREE"
+
+
+@dataclass
+class _Ticket:
+    plan_name: str
+    user_key: str | None
+    enqueued_at: float
+    event: threading.Event = field(default_factory=threading.Event)
+    granted: bool = False
+
+
+class LLMAdmissionScheduler:
+    """Weighted fair admission control for outbound LLM calls.
+
+    Requests queue per plan; free slots are granted by stride scheduling so
+    that each plan receives capacity proportional to its weight while it has
+    waiters. A global cap bounds concurrent provider calls and a per-user cap
+    stops a single account from occupying every slot.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int,
+        max_in_flight_per_user: int,
+        queue_timeout_seconds: float,
+        weights: dict[str, int] | None = None,
+    ) -> None:
+        self._max_in_flight = max_in_flight
+        self._max_in_flight_per_user = max_in_flight_per_user
+        self._queue_timeout_seconds = queue_timeout_seconds
+        self._weights = dict(weights or PLAN_WEIGHTS)
+        self._lock = threading.Lock()
+        self._queues: dict[str, deque[_Ticket]] = {plan: deque() for plan in self._weights}
+        self._pass: dict[str, float] = {plan: 0.0 for plan in self._weights}
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._in_flight_by_user: dict[str, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def queue_depth(self, plan_name: str) -> int:
+        return len(self._queues.get(plan_name, ()))
+
+    @contextmanager
+    def admit(self, plan_name: str | None, user_id: object | None = None) -> Iterator[None]:
+        ticket = self._acquire(plan_name, user_id)
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def _acquire(self, plan_name: str | None, user_id: object | None) -> _Ticket:
+        plan = plan_name if plan_name in self._weights else DEFAULT_PLAN
+        ticket = _Ticket(
+            plan_name=plan,
+            user_key=str(user_id) if user_id is not None else None,
+            enqueued_at=time.monotonic(),
+        )
+        with self._lock:
+            queue = self._queues[plan]
+            if not queue:
+                # A plan returning from idle must not spend credit it "saved" while idle.
+                self._pass[plan] = max(self._pass[plan], self._virtual_time)
+            queue.append(ticket)
+            self._dispatch()
+            self._publish_depth(plan)
+
+        if ticket.event.wait(self._queue_timeout_seconds):
+            return ticket
+
+        with self._lock:
+            if not ticket.granted:
+                self._queues[plan].remove(ticket)
+                self._publish_depth(plan)
+                metrics.inc(
+                    "llm_admission_timeouts_total",
+                    help_text="LLM requests rejected after waiting for a slot",
+                    plan=plan,
+                )
+                raise DomainError(
+                    error_code="LLM_BUSY",
+                    message="AI capacity is temporarily exhausted. Please retry shortly.",
+                    status_code=503,
+                )
+        return ticket
+
+    def _release(self, ticket: _Ticket) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if ticket.user_key is not None:
+                remaining = self._in_flight_by_user.get(ticket.user_key, 1) - 1
+                if remaining > 0:
+                    self._in_flight_by_user[ticket.user_key] = remaining
+                else:
+                    self._in_flight_by_user.pop(ticket.user_key, None)
+            self._dispatch()
+            self._publish_in_flight()
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self._max_in_flight:
+            choice: tuple[str, _Ticket] | None = None
+            for plan, queue in self._queues.items():
+                candidate = self._first_eligible(queue)
+                if candidate is None:
+                    continue
+                if choice is None or self._pass[plan] < self._pass[choice[0]]:
+                    choice = (plan, candidate)
+            if choice is None:
+                break
+            plan, ticket = choice
+            self._queues[plan].remove(ticket)
+            self._virtual_time = self._pass[plan]
+            self._pass[plan] += 1.0 / self._weights[plan]
+            self._in_flight += 1
+            if ticket.user_key is not None:
+                self._in_flight_by_user[ticket.user_key] = (
+                    self._in_flight_by_user.get(ticket.user_key, 0) + 1
+                )
+            ticket.granted = True
+            ticket.event.set()
+            metrics.observe(
+                "llm_queue_wait_seconds",
+                time.monotonic() - ticket.enqueued_at,
+                help_text="Time spent waiting for an LLM slot",
+                plan=plan,
+            )
+            self._publish_depth(plan)
+        self._publish_in_flight()
+
+    def _first_eligible(self, queue: deque[_Ticket]) -> _Ticket | None:
+        for ticket in queue:
+            if ticket.user_key is None:
+                return ticket
+            if self._in_flight_by_user.get(ticket.user_key, 0) < self._max_in_flight_per_user:
+                return ticket
+        return None
+
+    def _publish_depth(self, plan: str) -> None:
+        metrics.set_gauge(
+            "llm_queue_depth",
+            len(self._queues[plan]),
+            help_text="LLM requests waiting for a slot",
+            plan=plan,
+        )
+
+    def _publish_in_flight(self) -> None:
+        metrics.set_gauge(
+            "llm_in_flight",
+            self._in_flight,
+            help_text="LLM requests currently admitted",
+        )
+
+
+@lru_cache(maxsize=1)
+def get_llm_scheduler() -> LLMAdmissionScheduler:
+    settings = get_settings()
+    return LLMAdmissionScheduler(
+        max_in_flight=settings.OPENAI_MAX_CONCURRENCY,
+        max_in_flight_per_user=settings.OPENAI_MAX_CONCURRENCY_PER_USER,
+        queue_timeout_seconds=settings.OPENAI_QUEUE_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+CASSETTE_MODE_OFF = "off"
+CASSETTE_MODE_RECORD = "record"
+CASSETTE_MODE_REPLAY = "replay"
+CASSETTE_MODES = {CASSETTE_MODE_OFF, CASSETTE_MODE_RECORD, CASSETTE_MODE_REPLAY}
+
+
+class CassetteMissError(RuntimeError):
+    pass
+
+
+def cassette_key(payload: dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Directory of recorded chat-completion exchanges keyed by request hash."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self._directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{key}.json"
+
+    def load(self, key: str) -> dict[str, Any]:
+        path = self._path(key)
+        if not path.exists():
+            raise CassetteMissError(f"No cassette entry for request {key} in {self._directory}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(
+        self,
+        key: str,
+        *,
+        request: dict[str, Any],
+        response: dict[str, Any],
+        latency_ms: float,
+    ) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "key": key,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "latency_ms": latency_ms,
+            "usage": response.get("usage") or {},
+            "request": request,
+            "response": response,
+        }
+        tmp_path = self._path(key).with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self._path(key))
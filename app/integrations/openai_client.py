@@ -1,18 +1,47 @@
 from __future__ import annotations
 
+import time
 from typing import Any
 
 import httpx
 
 from app.core.config import get_settings
+from app.integrations.http_clients import UPSTREAM_OPENAI, get_http_client
+from app.integrations.llm_scheduler import LLMAdmissionScheduler, get_llm_scheduler
+from app.integrations.openai_cassette import (
+    CASSETTE_MODE_OFF,
+    CASSETTE_MODE_RECORD,
+    CASSETTE_MODE_REPLAY,
+    Cassette,
+    cassette_key,
+)
 
 
 class OpenAIClient:
-    def __init__(self, api_key: str | None = None, base_url: str = "https://api.openai.com/v1"):
-        settings = get_settings()
-        self._api_key = api_key or settings.OPENAI_API_KEY
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str = "https://api.openai.com/v1",
+        scheduler: LLMAdmissionScheduler | None = None,
+        cassette_mode: str | None = None,
+        cassette_dir: str | None = None,
+        replay_latency: bool = True,
+        client: httpx.Client | None = None,
+    ):
+        if api_key is None or cassette_mode is None or cassette_dir is None:
+            settings = get_settings()
+            api_key = api_key if api_key is not None else settings.OPENAI_API_KEY
+            cassette_mode = cassette_mode or settings.OPENAI_CASSETTE_MODE
+            cassette_dir = cassette_dir or settings.OPENAI_CASSETTE_DIR
+        self._api_key = api_key
         self._base_url = base_url.rstrip("/")
-        self._client = httpx.Client(timeout=30.0)
+        self._client = client or get_http_client(UPSTREAM_OPENAI)
+        self._scheduler = scheduler
+        self._cassette_mode = cassette_mode.lower()
+        self._cassette = (
+            Cassette(cassette_dir) if self._cassette_mode != CASSETTE_MODE_OFF else None
+        )
+        self._replay_latency = replay_latency
 
     def create_chat_completion(
         self,
@@ -25,6 +54,8 @@ class OpenAIClient:
         frequency_penalty: float,
         presence_penalty: float,
         max_tokens: int,
+        plan_name: str | None = None,
+        user_id: object | None = None,
     ) -> dict[str, Any]:
         payload = {
             "model": model,
@@ -36,11 +67,29 @@ class OpenAIClient:
             "presence_penalty": presence_penalty,
             "max_tokens": max_tokens,
         }
-        resp = self._client.post(
-            f"{self._base_url}/chat/completions",
-            headers={"Authorization": f"Bearer {self._api_key}"},
-            json=payload,
-        )
+        if self._cassette_mode == CASSETTE_MODE_REPLAY:
+            return self._replay(payload)
+
+        scheduler = self._scheduler or get_llm_scheduler()
+        with scheduler.admit(plan_name, user_id):
+            started = time.perf_counter()
+            resp = self._client.post(
+                f"{self._base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                json=payload,
+            )
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
         if resp.status_code >= 400:
             raise RuntimeError(f"OpenAI request failed: {resp.status_code} {resp.text}")
-        return resp.json()
+        response = resp.json()
+        if self._cassette_mode == CASSETTE_MODE_RECORD:
+            self._cassette.save(
+                cassette_key(payload), request=payload, response=response, latency_ms=latency_ms
+            )
+        return response
+
+    def _replay(self, payload: dict[str, Any]) -> dict[str, Any]:
+        entry = self._cassette.load(cassette_key(payload))
+        if self._replay_latency:
+            time.sleep(float(entry.get("latency_ms") or 0) / 1000)
+        return entry["response"]
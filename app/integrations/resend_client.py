@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+
+from app.core.config import get_settings
+from app.integrations.http_clients import UPSTREAM_RESEND, get_http_client
+
+# Resend accepts at most this many messages per /emails/batch call.
+MAX_BATCH_SIZE = 100
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+class EmailDeliveryError(Exception):
+    def __init__(self, message: str, *, retryable: bool) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class ResendClient:
+    """Batch sender for the Resend API (or a local stand-in at EMAIL_API_BASE_URL)."""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        from_header: str | None = None,
+        client: httpx.Client | None = None,
+    ) -> None:
+        if api_key is None or base_url is None or from_header is None:
+            settings = get_settings()
+            api_key = api_key if api_key is not None else settings.EMAIL_API_KEY
+            base_url = base_url or settings.EMAIL_API_BASE_URL
+            from_header = (
+                from_header or f"{settings.EMAIL_FROM_NAME} <{settings.EMAIL_FROM_ADDRESS}>"
+            )
+        self._api_key = api_key
+        self._base_url = base_url.rstrip("/")
+        self._from_header = from_header
+        self._client = client or get_http_client(UPSTREAM_RESEND)
+
+    def send_batch(self, messages: list[dict[str, Any]], *, idempotency_key: str) -> list[str]:
+        """Send up to MAX_BATCH_SIZE messages; returns provider ids in input order.
+
+        Each message has `to`, `subject` and `text`. Raises EmailDeliveryError,
+        with `retryable` set for timeouts, throttling and provider errors.
+        """
+        payload = [
+            {
+                "from": self._from_header,
+                "to": [message["to"]],
+                "subject": message["subject"],
+                "text": message["text"],
+            }
+            for message in messages
+        ]
+        try:
+            response = self._client.post(
+                f"{self._base_url}/emails/batch",
+                headers={
+                    "Authorization": f"Bearer {self._api_key}",
+                    "Idempotency-Key": idempotency_key,
+                },
+                json=payload,
+            )
+        except httpx.HTTPError as exc:
+            raise EmailDeliveryError(f"{type(exc).__name__}: {exc}", retryable=True) from exc
+        if response.status_code >= 400:
+            raise EmailDeliveryError(
+                f"HTTP {response.status_code}: {response.text[:500]}",
+                retryable=response.status_code >= 500
+                or response.status_code in _RETRYABLE_STATUS,
+            )
+        data = response.json().get("data") or []
+        return [item.get("id") for item in data]
@@ -1,23 +1,56 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
+from app.api.routes.admin import router as admin_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.entitlements import router as entitlements_router
 from app.api.routes.fit_scans import router as fit_scans_router
 from app.api.routes.health import router as health_router
 from app.api.routes.ngo_profile import router as ngo_profile_router
-from app.core.config import validate_config
+from app.core.config import get_settings, validate_config
 from app.core.errors import DomainError
+from app.db.session import SessionLocal, async_engine
+from app.integrations.http_clients import close_http_clients
+from app.integrations.resend_client import ResendClient
+from app.services.auth_service import start_token_sweeper, stop_token_sweeper
+from app.services.email_outbox import start_email_dispatcher, stop_email_dispatcher
 
 validate_config()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    settings = get_settings()
+    if settings.EMAIL_OUTBOX_DISPATCHER_ENABLED and SessionLocal is not None:
+        start_email_dispatcher(
+            SessionLocal, ResendClient(), poll_seconds=settings.EMAIL_OUTBOX_POLL_SECONDS
+        )
+    if settings.AUTH_TOKEN_SWEEPER_ENABLED and SessionLocal is not None:
+        start_token_sweeper(
+            SessionLocal,
+            interval_seconds=settings.AUTH_TOKEN_SWEEP_INTERVAL_SECONDS,
+            retention_days=settings.AUTH_TOKEN_RETENTION_DAYS,
+        )
+    try:
+        yield
+    finally:
+        stop_token_sweeper()
+        stop_email_dispatcher()
+        close_http_clients()
+        if async_engine is not None:
+            await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(entitlements_router)
 app.include_router(fit_scans_router)
 app.include_router(ngo_profile_router)
+app.include_router(admin_router)
 
 
 @app.exception_handler(RequestValidationError)
@@ -47,4 +80,4 @@ def domain_error_handler(request: Request, exc: DomainError):
     status_code = exc.status_code
     if exc.error_code == "QUOTA_EXCEEDED":
         status_code = 429
-    return JSONResponse(status_code=status_code, content=payload)
+    return JSONResponse(status_code=status_code, content=payload, headers=exc.headers)
@@ -1,19 +1,37 @@
 from app.models.auth_magic_link_token import AuthMagicLinkToken
 from app.models.auth_refresh_token import AuthRefreshToken
+from app.models.email_outbox import EmailOutbox
 from app.models.fit_scan import FitScan
 from app.models.funding_opportunity import FundingOpportunity
 from app.models.ngo_profile import NGOProfile
+from app.models.rate_limit_window import RateLimitWindow
+from app.models.usage_archived_total import UsageArchivedTotal
+from app.models.usage_counter import UsageCounter
+from app.models.usage_daily import UsageDaily
+from app.models.usage_daily_by_plan import UsageDailyByPlan
+from app.models.usage_idempotency_key import UsageIdempotencyKey
 from app.models.usage_ledger import UsageLedger
+from app.models.usage_reservation import UsageReservation
+from app.models.usage_rollup_watermark import UsageRollupWatermark
 from app.models.user import User
 from app.models.user_plan import UserPlan
 
 __all__ = [
     "AuthMagicLinkToken",
     "AuthRefreshToken",
+    "EmailOutbox",
     "FitScan",
     "FundingOpportunity",
     "NGOProfile",
+    "RateLimitWindow",
+    "UsageArchivedTotal",
+    "UsageCounter",
+    "UsageDaily",
+    "UsageDailyByPlan",
+    "UsageIdempotencyKey",
     "UsageLedger",
+    "UsageReservation",
+    "UsageRollupWatermark",
     "User",
     "UserPlan",
 ]
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import DateTime, ForeignKey, Index, Text, func
+from sqlalchemy import DateTime, ForeignKey, Index, Text, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -12,6 +12,16 @@ class AuthRefreshToken(Base):
     __table_args__ = (
         Index("ix_auth_refresh_tokens_user_id", "user_id"),
         Index("ix_auth_refresh_tokens_expires_at", "expires_at"),
+        Index(
+            "ix_auth_refresh_tokens_user_active",
+            "user_id",
+            postgresql_where=text("revoked_at IS NULL"),
+        ),
+        Index(
+            "ix_auth_refresh_tokens_revoked_at",
+            "revoked_at",
+            postgresql_where=text("revoked_at IS NOT NULL"),
+        ),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -32,6 +42,10 @@ class AuthRefreshToken(Base):
     )
     replaced_by_token_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True),
-        ForeignKey("auth_refresh_tokens.id"),
+        ForeignKey(
+            "auth_refresh_tokens.id",
+            name="fk_auth_refresh_tokens_replaced_by_token_id",
+            ondelete="SET NULL",
+        ),
         nullable=True,
     )
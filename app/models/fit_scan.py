@@ -9,6 +9,8 @@ from app.db.base import Base
 
 class FitScan(Base):
     __tablename__ = "fit_scans"
+    # Server defaults come back via RETURNING; an AsyncSession cannot lazy-load them.
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
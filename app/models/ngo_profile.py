@@ -9,6 +9,8 @@ from app.db.base import Base
 
 class NGOProfile(Base):
     __tablename__ = "ngo_profiles"
+    # Server defaults come back via RETURNING; an AsyncSession cannot lazy-load them.
+    __mapper_args__ = {"eager_defaults": True}
     __table_args__ = (UniqueConstraint("user_id", name="uq_ngo_profiles_user_id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
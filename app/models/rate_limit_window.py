@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, DateTime, Index, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class RateLimitWindow(Base):
+    """Sliding-window rate-limit counters shared by all workers.
+
+    UNLOGGED: counters are not crash-safe (they reset after a Postgres crash),
+    which is acceptable for rate limits and avoids WAL traffic on every hit.
+    """
+
+    __tablename__ = "rate_limit_windows"
+    __table_args__ = (
+        Index("idx_rate_limit_windows_expires", "expires_at"),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    key: Mapped[str] = mapped_column(Text, primary_key=True)
+    window_index: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    current_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    previous_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,24 @@
+import uuid
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UsageArchivedTotal(Base):
+    """Per-user event counts from usage_ledger partitions that were archived."""
+
+    __tablename__ = "usage_archived_totals"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    action_type: Mapped[str] = mapped_column(Text, primary_key=True)
+    archived_count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+# FREE-plan quotas are lifetime; their counters live under a fixed period key.
+LIFETIME_PERIOD_START = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class UsageCounter(Base):
+    """Materialized per-period usage totals maintained alongside usage_ledger."""
+
+    __tablename__ = "usage_counters"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    action_type: Mapped[str] = mapped_column(Text, primary_key=True)
+    period_start: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    used: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    reserved: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
@@ -0,0 +1,17 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UsageDailyByPlan(Base):
+    """Daily usage_ledger counts per plan and action type (UTC days)."""
+
+    __tablename__ = "usage_daily_by_plan"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    plan_name: Mapped[str] = mapped_column(Text, primary_key=True)
+    action_type: Mapped[str] = mapped_column(Text, primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
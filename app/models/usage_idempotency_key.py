@@ -0,0 +1,20 @@
+import uuid
+
+from sqlalchemy import DateTime, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UsageIdempotencyKey(Base):
+    """Global uniqueness for usage_ledger.idempotency_key, pointing at the ledger row."""
+
+    __tablename__ = "usage_idempotency_keys"
+
+    idempotency_key: Mapped[str] = mapped_column(Text, primary_key=True)
+    ledger_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    ledger_created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
@@ -1,7 +1,7 @@
 import enum
 import uuid
 
-from sqlalchemy import DateTime, ForeignKey, Text, text
+from sqlalchemy import DateTime, ForeignKey, Index, Text, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -18,7 +18,19 @@ class UsageActionType(str, enum.Enum):
 
 
 class UsageLedger(Base):
+    """Append-only usage events, range-partitioned by month on created_at.
+
+    Partitions are created by usage_ledger_ensure_partitions() (see
+    app/services/ledger_partitions.py); idempotency keys live in
+    usage_idempotency_keys because a partitioned table cannot carry a global
+    unique index on a column outside the partition key.
+    """
+
     __tablename__ = "usage_ledger"
+    __table_args__ = (
+        Index("idx_usage_ledger_user_created", "user_id", text("created_at DESC")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -39,7 +51,7 @@ class UsageLedger(Base):
     occurred_at: Mapped[DateTime] = mapped_column(
         "created_at",
         DateTime(timezone=True),
-        nullable=False,
+        primary_key=True,
         server_default=text("now()"),
     )
     idempotency_key: Mapped[str] = mapped_column(Text, nullable=False)
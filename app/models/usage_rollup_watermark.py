@@ -0,0 +1,16 @@
+from sqlalchemy import DateTime, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UsageRollupWatermark(Base):
+    """Ledger created_at up to which a rollup has been applied (exclusive)."""
+
+    __tablename__ = "usage_rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(Text, primary_key=True)
+    processed_until: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("now()")
+    )
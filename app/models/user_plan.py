@@ -1,6 +1,15 @@
 import uuid
 
-from sqlalchemy import CheckConstraint, DateTime, ForeignKey, Text, text
+from sqlalchemy import (
+    CheckConstraint,
+    DateTime,
+    FetchedValue,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -14,6 +23,7 @@ class UserPlan(Base):
             "plan_name IN ('FREE', 'GROWTH', 'IMPACT')",
             name="ck_user_plans_plan_name",
         ),
+        Index("idx_user_plans_current_period_end", "current_period_end"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -37,6 +47,13 @@ class UserPlan(Base):
     current_period_end: Mapped[DateTime | None] = mapped_column(
         DateTime(timezone=True), nullable=True
     )
+    # Bumped by a trigger when plan_name or current_period_end changes.
+    plan_version: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        server_default=text("1"),
+        server_onupdate=FetchedValue(),
+    )
     created_at: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("now()")
     )
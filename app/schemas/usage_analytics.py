@@ -0,0 +1,17 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class UsageDailyPoint(BaseModel):
+    day: date
+    plan_name: str | None
+    action_type: str
+    count: int
+
+
+class UsageDailyResponse(BaseModel):
+    start: date
+    end: date
+    processed_until: datetime | None
+    points: list[UsageDailyPoint]
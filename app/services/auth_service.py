@@ -0,0 +1,390 @@
+"""Set-based user and refresh-token writes for the auth routes.
+
+A login is one statement: upsert the user by email, revoke their active refresh
+tokens, insert the new one and read the plan claims for the access token, chained
+through data-modifying CTEs. A refresh is one statement as well: the presented
+token is locked, and if it is still valid the user's tokens are revoked (the
+presented one pointing at its replacement) and the new token inserted. Callers
+own the transaction, except for sweep_expired_tokens, which commits per batch.
+
+Expired, revoked and used tokens are kept for a retention window (for audit)
+and then deleted in batches by the token sweeper: a script, or a thread in the
+API process when AUTH_TOKEN_SWEEPER_ENABLED is set.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import and_, case, delete, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.security import generate_opaque_token, hash_token
+from app.db.unit_of_work import unit_of_work
+from app.models.auth_magic_link_token import AuthMagicLinkToken
+from app.models.auth_refresh_token import AuthRefreshToken
+from app.models.user import User
+from app.models.user_plan import UserPlan
+from app.services.quota_service import PlanClaims, plan_claims_columns, plan_claims_from_row
+
+logger = logging.getLogger("auth")
+
+DEFAULT_SWEEP_BATCH_SIZE = 5000
+
+users = User.__table__
+auth_refresh_tokens = AuthRefreshToken.__table__
+auth_magic_link_tokens = AuthMagicLinkToken.__table__
+
+
+@dataclass(frozen=True)
+class IssuedRefreshToken:
+    id: uuid.UUID
+    raw_token: str
+    token_hash: str
+    expires_at: datetime
+
+
+@dataclass(frozen=True)
+class Login:
+    user_id: uuid.UUID
+    email: str
+    full_name: str | None
+    plan: PlanClaims
+    refresh_token: str
+
+
+@dataclass(frozen=True)
+class RefreshRotation:
+    user_id: uuid.UUID
+    email: str
+    revoked_at: datetime | None
+    expires_at: datetime
+    plan: PlanClaims
+    # Set only when the presented token was valid and has been replaced.
+    refresh_token: str | None
+
+
+@dataclass(frozen=True)
+class TokenSweepResult:
+    refresh_tokens: int = 0
+    magic_links: int = 0
+
+
+def _new_refresh_token(now: datetime) -> IssuedRefreshToken:
+    raw_token = generate_opaque_token()
+    return IssuedRefreshToken(
+        id=uuid.uuid4(),
+        raw_token=raw_token,
+        token_hash=hash_token(raw_token),
+        expires_at=now + timedelta(days=get_settings().AUTH_REFRESH_TOKEN_TTL_DAYS),
+    )
+
+
+def _insert_refresh_token(token: IssuedRefreshToken, user_id, *where):
+    return (
+        insert(auth_refresh_tokens)
+        .from_select(
+            ["id", "user_id", "token_hash", "expires_at"],
+            select(
+                literal(token.id, PG_UUID(as_uuid=True)),
+                user_id,
+                literal(token.token_hash),
+                literal(token.expires_at),
+            ).where(*where),
+        )
+        .returning(auth_refresh_tokens.c.id)
+    )
+
+
+def login_user(
+    db: Session,
+    *,
+    email: str,
+    auth_provider: str | None,
+    full_name: str | None = None,
+    avatar_url: str | None = None,
+    google_sub: str | None = None,
+    now: datetime | None = None,
+) -> Login:
+    """Create or update the user and start a new session, revoking any other.
+
+    Existing users keep their name, avatar and google_sub when none is given;
+    auth_provider=None leaves the stored provider unchanged.
+    """
+    now = now or datetime.now(timezone.utc)
+    token = _new_refresh_token(now)
+    insert_user = pg_insert(users).values(
+        id=uuid.uuid4(),
+        email=email,
+        full_name=full_name,
+        avatar_url=avatar_url,
+        google_sub=google_sub,
+        auth_provider=auth_provider or "email",
+        last_login_at=now,
+    )
+    excluded = insert_user.excluded
+    updates = {
+        "full_name": func.coalesce(excluded.full_name, users.c.full_name),
+        "avatar_url": func.coalesce(excluded.avatar_url, users.c.avatar_url),
+        "google_sub": func.coalesce(users.c.google_sub, excluded.google_sub),
+        "last_login_at": excluded.last_login_at,
+        "updated_at": func.now(),
+    }
+    if auth_provider is not None:
+        updates["auth_provider"] = excluded.auth_provider
+    user = (
+        insert_user.on_conflict_do_update(index_elements=[users.c.email], set_=updates)
+        .returning(users.c.id, users.c.email, users.c.full_name)
+        .cte("login_user")
+    )
+    user_id = select(user.c.id).scalar_subquery()
+    revoked = (
+        update(auth_refresh_tokens)
+        .where(auth_refresh_tokens.c.user_id == user_id, auth_refresh_tokens.c.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .returning(auth_refresh_tokens.c.id)
+        .cte("revoked")
+    )
+    issued = _insert_refresh_token(token, user.c.id).cte("issued")
+    row = db.execute(
+        select(user.c.id, user.c.email, user.c.full_name, *plan_claims_columns())
+        .select_from(user.outerjoin(UserPlan, UserPlan.user_id == user.c.id))
+        .add_cte(revoked, issued)
+    ).one()
+    return Login(
+        user_id=row.id,
+        email=row.email,
+        full_name=row.full_name,
+        plan=plan_claims_from_row(row),
+        refresh_token=token.raw_token,
+    )
+
+
+def rotate_refresh_token(
+    db: Session, raw_token: str, *, now: datetime | None = None
+) -> RefreshRotation | None:
+    """Swap a valid refresh token for a new one; None if the token is unknown.
+
+    A revoked or expired token is returned with refresh_token=None and nothing
+    is written. Concurrent refreshes with the same token serialise on its row
+    lock, so only one of them rotates.
+    """
+    now = now or datetime.now(timezone.utc)
+    token = _new_refresh_token(now)
+    presented = (
+        select(
+            auth_refresh_tokens.c.id,
+            auth_refresh_tokens.c.user_id,
+            auth_refresh_tokens.c.revoked_at,
+            auth_refresh_tokens.c.expires_at,
+        )
+        .where(auth_refresh_tokens.c.token_hash == hash_token(raw_token))
+        .with_for_update()
+        .cte("presented")
+    )
+    valid = and_(presented.c.revoked_at.is_(None), presented.c.expires_at > now)
+    revoked = (
+        update(auth_refresh_tokens)
+        .where(
+            auth_refresh_tokens.c.user_id == presented.c.user_id,
+            auth_refresh_tokens.c.revoked_at.is_(None),
+            valid,
+        )
+        .values(
+            revoked_at=now,
+            replaced_by_token_id=case(
+                (auth_refresh_tokens.c.id == presented.c.id, token.id),
+                else_=auth_refresh_tokens.c.replaced_by_token_id,
+            ),
+        )
+        .returning(auth_refresh_tokens.c.id)
+        .cte("revoked")
+    )
+    issued = _insert_refresh_token(token, presented.c.user_id, valid).cte("issued")
+    row = db.execute(
+        select(
+            presented.c.user_id,
+            presented.c.revoked_at,
+            presented.c.expires_at,
+            users.c.email,
+            *plan_claims_columns(),
+            select(issued.c.id).exists().label("rotated"),
+        )
+        .select_from(
+            presented.join(users, users.c.id == presented.c.user_id).outerjoin(
+                UserPlan, UserPlan.user_id == presented.c.user_id
+            )
+        )
+        .add_cte(revoked)
+    ).first()
+    if row is None:
+        return None
+    return RefreshRotation(
+        user_id=row.user_id,
+        email=row.email,
+        revoked_at=row.revoked_at,
+        expires_at=row.expires_at,
+        plan=plan_claims_from_row(row),
+        refresh_token=token.raw_token if row.rotated else None,
+    )
+
+
+def consume_magic_link(db: Session, raw_token: str, *, now: datetime | None = None) -> str | None:
+    """Mark an unused, unexpired magic link consumed and return its email, else None."""
+    now = now or datetime.now(timezone.utc)
+    return db.execute(
+        update(auth_magic_link_tokens)
+        .where(
+            auth_magic_link_tokens.c.token_hash == hash_token(raw_token),
+            auth_magic_link_tokens.c.consumed_at.is_(None),
+            auth_magic_link_tokens.c.expires_at > now,
+        )
+        .values(consumed_at=now)
+        .returning(auth_magic_link_tokens.c.email)
+    ).scalar_one_or_none()
+
+
+def _delete_batch(db: Session, table, condition, order_by, batch_size: int) -> int:
+    doomed = (
+        select(table.c.id)
+        .where(condition)
+        .order_by(order_by)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return db.execute(delete(table).where(table.c.id.in_(doomed.scalar_subquery()))).rowcount
+
+
+def delete_expired_tokens(
+    db: Session,
+    *,
+    retention_days: int,
+    batch_size: int = DEFAULT_SWEEP_BATCH_SIZE,
+    now: datetime | None = None,
+) -> TokenSweepResult:
+    """Delete up to batch_size tokens of each kind that ended before the retention window.
+
+    Refresh tokens go once expired or revoked that long ago; magic links once
+    expired (a used link expires within AUTH_MAGIC_LINK_TTL_MIN anyway). Each
+    pass walks its timestamp index. Call until fewer than batch_size come back.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    expired_refresh = _delete_batch(
+        db,
+        auth_refresh_tokens,
+        auth_refresh_tokens.c.expires_at < cutoff,
+        auth_refresh_tokens.c.expires_at,
+        batch_size,
+    )
+    revoked_refresh = _delete_batch(
+        db,
+        auth_refresh_tokens,
+        auth_refresh_tokens.c.revoked_at < cutoff,
+        auth_refresh_tokens.c.revoked_at,
+        batch_size,
+    )
+    magic_links = _delete_batch(
+        db,
+        auth_magic_link_tokens,
+        auth_magic_link_tokens.c.expires_at < cutoff,
+        auth_magic_link_tokens.c.expires_at,
+        batch_size,
+    )
+    return TokenSweepResult(
+        refresh_tokens=expired_refresh + revoked_refresh, magic_links=magic_links
+    )
+
+
+def sweep_expired_tokens(
+    db: Session, *, retention_days: int, batch_size: int = DEFAULT_SWEEP_BATCH_SIZE
+) -> TokenSweepResult:
+    """Run delete_expired_tokens until nothing is left, committing each batch."""
+    refresh_tokens = magic_links = 0
+    while True:
+        with unit_of_work(db):
+            result = delete_expired_tokens(db, retention_days=retention_days, batch_size=batch_size)
+        refresh_tokens += result.refresh_tokens
+        magic_links += result.magic_links
+        if result.refresh_tokens < batch_size and result.magic_links < batch_size:
+            break
+    metrics.inc(
+        "auth_tokens_swept_total",
+        value=refresh_tokens,
+        help_text="Expired auth tokens deleted",
+        kind="refresh",
+    )
+    metrics.inc(
+        "auth_tokens_swept_total",
+        value=magic_links,
+        help_text="Expired auth tokens deleted",
+        kind="magic_link",
+    )
+    return TokenSweepResult(refresh_tokens=refresh_tokens, magic_links=magic_links)
+
+
+class TokenSweeper:
+    """Background thread running sweep_expired_tokens every interval_seconds."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        interval_seconds: float,
+        retention_days: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._interval_seconds = interval_seconds
+        self._retention_days = retention_days
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="token-sweeper", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._interval_seconds):
+            db = self._session_factory()
+            try:
+                result = sweep_expired_tokens(db, retention_days=self._retention_days)
+                logger.info(
+                    "auth_tokens_swept refresh_tokens=%s magic_links=%s",
+                    result.refresh_tokens,
+                    result.magic_links,
+                )
+            except Exception:
+                logger.exception("auth_token_sweep_error")
+            finally:
+                db.close()
+
+
+_sweeper: TokenSweeper | None = None
+
+
+def start_token_sweeper(
+    session_factory: Callable[[], Session], *, interval_seconds: float, retention_days: int
+) -> TokenSweeper:
+    global _sweeper
+    _sweeper = TokenSweeper(
+        session_factory, interval_seconds=interval_seconds, retention_days=retention_days
+    )
+    _sweeper.start()
+    return _sweeper
+
+
+def stop_token_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.stop()
+        _sweeper = None
@@ -0,0 +1,333 @@
+"""Transactional email outbox and its background dispatcher.
+
+Writers call enqueue_email inside their own transaction, so an email exists if
+and only if the state that triggered it was committed. The dispatcher claims
+due rows with FOR UPDATE SKIP LOCKED (any number of workers can run it), leases
+them by pushing next_attempt_at forward, commits, and only then calls the
+provider, so no row lock is held across the HTTP request. Delivery is at least
+once: a worker that dies mid-send leaves its rows to be retried when the lease
+runs out.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import bindparam, case, null, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.db.unit_of_work import unit_of_work
+from app.integrations.resend_client import MAX_BATCH_SIZE, EmailDeliveryError, ResendClient
+from app.models.email_outbox import EmailOutbox
+
+logger = logging.getLogger("email_outbox")
+
+STATUS_PENDING = "PENDING"
+STATUS_SENT = "SENT"
+STATUS_FAILED = "FAILED"
+STATUS_EXPIRED = "EXPIRED"
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 1800
+DEFAULT_LEASE_SECONDS = 60
+
+email_outbox = EmailOutbox.__table__
+
+_SENT_HELP = "Outbox emails accepted by the provider"
+_RETRIED_HELP = "Outbox emails scheduled for another attempt"
+_FAILED_HELP = "Outbox emails given up on"
+
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    id: uuid.UUID
+    to_address: str
+    subject: str
+    body_text: str
+    attempts: int
+
+
+@dataclass(frozen=True)
+class DispatchResult:
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    expired: int = 0
+
+
+def enqueue_email(
+    db: Session,
+    *,
+    to_address: str,
+    subject: str,
+    body_text: str,
+    expires_at: datetime | None = None,
+) -> EmailOutbox:
+    message = EmailOutbox(
+        to_address=to_address, subject=subject, body_text=body_text, expires_at=expires_at
+    )
+    db.add(message)
+    return message
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number `attempts` (1-based): exponential, capped, +/-20% jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def expire_stale_emails(db: Session, *, now: datetime) -> int:
+    """Drop unsent messages past their expires_at (and their bodies)."""
+    return db.execute(
+        update(email_outbox)
+        .where(
+            email_outbox.c.status == STATUS_PENDING,
+            email_outbox.c.expires_at <= now,
+        )
+        .values(status=STATUS_EXPIRED, body_text=None)
+    ).rowcount
+
+
+def claim_due_emails(
+    db: Session,
+    *,
+    batch_size: int,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    now: datetime,
+) -> list[OutboxMessage]:
+    """Lease up to batch_size due messages and count the attempt."""
+    due = (
+        select(email_outbox.c.id)
+        .where(
+            email_outbox.c.status == STATUS_PENDING,
+            email_outbox.c.next_attempt_at <= now,
+            or_(email_outbox.c.expires_at.is_(None), email_outbox.c.expires_at > now),
+        )
+        .order_by(email_outbox.c.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        update(email_outbox)
+        .where(email_outbox.c.id.in_(due.scalar_subquery()))
+        .values(
+            attempts=email_outbox.c.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(
+            email_outbox.c.id,
+            email_outbox.c.to_address,
+            email_outbox.c.subject,
+            email_outbox.c.body_text,
+            email_outbox.c.attempts,
+        )
+    )
+    return [OutboxMessage(*row) for row in rows]
+
+
+def mark_sent(
+    db: Session,
+    messages: list[OutboxMessage],
+    provider_ids: list[str | None],
+    *,
+    now: datetime,
+) -> None:
+    provider_ids = list(provider_ids) + [None] * (len(messages) - len(provider_ids))
+    db.execute(
+        update(email_outbox)
+        .where(email_outbox.c.id == bindparam("message_id"))
+        .values(
+            status=STATUS_SENT,
+            provider_message_id=bindparam("provider_id"),
+            body_text=None,
+            last_error=None,
+            sent_at=now,
+        ),
+        [
+            {"message_id": message.id, "provider_id": provider_id}
+            for message, provider_id in zip(messages, provider_ids)
+        ],
+    )
+
+
+def mark_unsent(
+    db: Session,
+    messages: list[OutboxMessage],
+    error: str,
+    *,
+    retryable: bool,
+    now: datetime,
+) -> tuple[int, int]:
+    """Schedule a retry, or fail messages that are out of attempts. Returns (retried, failed)."""
+    params = []
+    for message in messages:
+        give_up = not retryable or message.attempts >= MAX_ATTEMPTS
+        params.append(
+            {
+                "message_id": message.id,
+                "new_status": STATUS_FAILED if give_up else STATUS_PENDING,
+                "retry_at": now + timedelta(seconds=backoff_seconds(message.attempts)),
+            }
+        )
+    db.execute(
+        update(email_outbox)
+        .where(email_outbox.c.id == bindparam("message_id"))
+        .values(
+            status=bindparam("new_status"),
+            next_attempt_at=bindparam("retry_at"),
+            # A message that gives up is never sent; drop its login token now.
+            body_text=case(
+                (bindparam("new_status") == STATUS_FAILED, null()),
+                else_=email_outbox.c.body_text,
+            ),
+            last_error=error[:1000],
+        ),
+        params,
+    )
+    failed = sum(1 for item in params if item["new_status"] == STATUS_FAILED)
+    return len(params) - failed, failed
+
+
+def _batch_idempotency_key(messages: list[OutboxMessage]) -> str:
+    ids = ",".join(sorted(str(message.id) for message in messages))
+    return hashlib.sha256(ids.encode("utf-8")).hexdigest()
+
+
+def _deliver(
+    db: Session, sender: ResendClient, messages: list[OutboxMessage]
+) -> tuple[int, int, int]:
+    """Send claimed messages and record the outcome. Returns (sent, retried, failed)."""
+    try:
+        provider_ids = sender.send_batch(
+            [
+                {"to": message.to_address, "subject": message.subject, "text": message.body_text}
+                for message in messages
+            ],
+            idempotency_key=_batch_idempotency_key(messages),
+        )
+    except EmailDeliveryError as exc:
+        if not exc.retryable and len(messages) > 1:
+            # The provider rejects a whole batch for one bad message; isolate it.
+            outcomes = [_deliver(db, sender, [message]) for message in messages]
+            return tuple(sum(counts) for counts in zip(*outcomes))
+        logger.warning(
+            "email_batch_failed size=%s retryable=%s error=%s", len(messages), exc.retryable, exc
+        )
+        with unit_of_work(db):
+            retried, failed = mark_unsent(
+                db, messages, str(exc), retryable=exc.retryable, now=datetime.now(timezone.utc)
+            )
+        return 0, retried, failed
+
+    with unit_of_work(db):
+        mark_sent(db, messages, provider_ids, now=datetime.now(timezone.utc))
+    return len(messages), 0, 0
+
+
+def dispatch_due_emails(
+    db: Session,
+    sender: ResendClient,
+    *,
+    batch_size: int = MAX_BATCH_SIZE,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+) -> DispatchResult:
+    """Send one batch of due messages.
+
+    Unlike most services this commits: the claim is committed before the
+    provider call and each outcome in its own transaction.
+    """
+    now = datetime.now(timezone.utc)
+    with unit_of_work(db):
+        expired = expire_stale_emails(db, now=now)
+        messages = claim_due_emails(
+            db, batch_size=min(batch_size, MAX_BATCH_SIZE), lease_seconds=lease_seconds, now=now
+        )
+    if not messages:
+        return DispatchResult(expired=expired)
+
+    sent, retried, failed = _deliver(db, sender, messages)
+    metrics.inc("email_outbox_sent_total", value=sent, help_text=_SENT_HELP)
+    metrics.inc("email_outbox_retried_total", value=retried, help_text=_RETRIED_HELP)
+    metrics.inc("email_outbox_failed_total", value=failed, help_text=_FAILED_HELP)
+    return DispatchResult(
+        claimed=len(messages), sent=sent, retried=retried, failed=failed, expired=expired
+    )
+
+
+class EmailDispatcher:
+    """Background thread draining the outbox; wake() skips the poll delay."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        sender: ResendClient,
+        *,
+        poll_seconds: float,
+        batch_size: int = MAX_BATCH_SIZE,
+    ) -> None:
+        self._session_factory = session_factory
+        self._sender = sender
+        self._poll_seconds = poll_seconds
+        self._batch_size = batch_size
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="email-dispatcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.clear()
+            result = DispatchResult()
+            db = self._session_factory()
+            try:
+                result = dispatch_due_emails(db, self._sender, batch_size=self._batch_size)
+            except Exception:
+                logger.exception("email_dispatch_error")
+            finally:
+                db.close()
+            if result.claimed < self._batch_size:
+                self._wake.wait(self._poll_seconds)
+
+
+_dispatcher: EmailDispatcher | None = None
+
+
+def start_email_dispatcher(
+    session_factory: Callable[[], Session], sender: ResendClient, *, poll_seconds: float
+) -> EmailDispatcher:
+    global _dispatcher
+    _dispatcher = EmailDispatcher(session_factory, sender, poll_seconds=poll_seconds)
+    _dispatcher.start()
+    return _dispatcher
+
+
+def stop_email_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop()
+        _dispatcher = None
+
+
+def wake_email_dispatcher() -> None:
+    """Ask this process's dispatcher (if running) to send now rather than at the next poll."""
+    if _dispatcher is not None:
+        _dispatcher.wake()
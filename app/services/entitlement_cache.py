@@ -0,0 +1,141 @@
+"""Two-tier cache for per-user usage state (plan, period bounds, usage counts).
+
+The request tier lives in ``Session.info`` and dies with the request's session.
+The process tier is a short-TTL map shared by all requests in this worker; other
+workers converge within the TTL. Writers call ``invalidate_usage_state``; keys
+written in a transaction are dropped again once it commits or rolls back so no
+reader can re-populate the process tier with pre-commit (or rolled back) data.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.models.user_plan import UserPlan
+
+_REQUEST_KEY = "entitlement_state"
+_DIRTY_KEY = "entitlement_dirty"
+_ALL_USERS = "*"
+_HITS_HELP = "Usage state reads served from cache"
+
+
+class EntitlementCache:
+    def __init__(self, *, ttl_seconds: float, max_entries: int = 10_000) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[uuid.UUID, tuple[float, Any]] = OrderedDict()
+
+    def get(self, user_id: uuid.UUID) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            return state
+
+    def put(self, user_id: uuid.UUID, state: Any) -> None:
+        if self._ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self._ttl_seconds, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache(maxsize=1)
+def get_entitlement_cache() -> EntitlementCache:
+    return EntitlementCache(ttl_seconds=get_settings().ENTITLEMENTS_CACHE_TTL_SECONDS)
+
+
+def cached_usage_state(
+    db: Session, user_id: uuid.UUID, loader: Callable[[Session, uuid.UUID], Any]
+) -> Any:
+    request_tier = db.info.setdefault(_REQUEST_KEY, {})
+    state = request_tier.get(user_id)
+    if state is not None:
+        metrics.inc("entitlement_cache_hits_total", help_text=_HITS_HELP, tier="request")
+        return state
+
+    cache = get_entitlement_cache()
+    state = cache.get(user_id)
+    if state is not None:
+        metrics.inc("entitlement_cache_hits_total", help_text=_HITS_HELP, tier="process")
+    else:
+        metrics.inc(
+            "entitlement_cache_misses_total",
+            help_text="Usage state reads that went to the database",
+        )
+        state = loader(db, user_id)
+        dirty = db.info.get(_DIRTY_KEY, ())
+        if user_id not in dirty and _ALL_USERS not in dirty:
+            cache.put(user_id, state)
+    request_tier[user_id] = state
+    return state
+
+
+def invalidate_usage_state(db: Session, user_id: uuid.UUID | None = None) -> None:
+    """Drop cached state for one user (or everyone) after a write in ``db``."""
+    cache = get_entitlement_cache()
+    if user_id is None:
+        db.info.pop(_REQUEST_KEY, None)
+        cache.clear()
+        key: object = _ALL_USERS
+    else:
+        db.info.get(_REQUEST_KEY, {}).pop(user_id, None)
+        cache.invalidate(user_id)
+        key = user_id
+    db.info.setdefault(_DIRTY_KEY, set()).add(key)
+
+
+def _drop_dirty(session: Session) -> None:
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if not dirty:
+        return
+    cache = get_entitlement_cache()
+    if _ALL_USERS in dirty:
+        cache.clear()
+        return
+    for user_id in dirty:
+        cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    _drop_dirty(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_REQUEST_KEY, None)
+    _drop_dirty(session)
+
+
+@event.listens_for(UserPlan, "after_insert")
+@event.listens_for(UserPlan, "after_update")
+@event.listens_for(UserPlan, "after_delete")
+def _plan_changed(mapper, connection, target: UserPlan) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_usage_state(session, target.user_id)
@@ -1,20 +1,28 @@
 from __future__ import annotations
 
 import uuid
+from typing import Awaitable, Callable
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.ai.fit_scan_executor import FitScanExecutor, PROMPT_LIBRARY_VERSION
+from app.core.config import get_settings
 from app.core.errors import ConflictError, DomainError, ForbiddenError, NotFoundError
+from app.db.unit_of_work import async_unit_of_work
 from app.models.fit_scan import FitScan
 from app.models.funding_opportunity import FundingOpportunity
 from app.models.ngo_profile import NGOProfile
-from app.models.user_plan import UserPlan
 from app.models.usage_ledger import UsageActionType
 from app.services.fit_scan_prompt_inputs import build_fit_scan_prompt_inputs
-from app.services.profile_service import get_completeness, get_profile
-from app.services.quota_service import enforce_quota, record_usage
+from app.services.profile_service import get_profile
+from app.services.quota_service import (
+    QuotaReservation,
+    commit_reservation,
+    get_plan_name,
+    release_reservation,
+    reserve,
+)
 
 RECOMMENDATION_MAP = {
     "STRONG": "RECOMMENDED",
@@ -22,6 +30,9 @@ RECOMMENDATION_MAP = {
     "WEAK": "NOT_RECOMMENDED",
 }
 
+# Fit scan ids for client-keyed requests are uuid5(namespace, "<user_id>:<key>").
+FIT_SCAN_ID_NAMESPACE = uuid.UUID("55a9ae1b-bbc0-47bd-b009-c78d0d6d1fca")
+
 MISSING_PROFILE_FIELDS = [
     "organization_name",
     "country_of_registration",
@@ -34,12 +45,42 @@ MISSING_PROFILE_FIELDS = [
 
 
 class FitScanService:
-    def __init__(self, db_session: Session) -> None:
+    """Fit scans on the request's AsyncSession.
+
+    Quota and profile services run on its connection through `run_sync`; the
+    LLM client is synchronous, so its call runs in the threadpool.
+    """
+
+    def __init__(self, db_session: AsyncSession) -> None:
         self.db = db_session
         self.executor = FitScanExecutor()
 
-    def run_fit_scan(self, *, user, funding_opportunity_id: uuid.UUID) -> FitScan:
-        opportunity = self.db.get(FundingOpportunity, funding_opportunity_id)
+    async def run_fit_scan(
+        self,
+        *,
+        user,
+        funding_opportunity_id: uuid.UUID,
+        idempotency_key: str | None = None,
+        admit: Callable[[], Awaitable[None]] | None = None,
+    ) -> FitScan:
+        """Run and store a fit scan, or replay the one stored under idempotency_key.
+
+        `admit` (e.g. the plan rate limit) is awaited only for requests that are
+        not replays, before any other work.
+        """
+        # Plain ids: ORM instances expire when the reservation commits.
+        user_id = user.id
+        if idempotency_key:
+            fit_scan_id = uuid.uuid5(FIT_SCAN_ID_NAMESPACE, f"{user_id}:{idempotency_key}")
+            existing = await self.db.get(FitScan, fit_scan_id)
+            if existing is not None:
+                return self._replayed(existing, funding_opportunity_id)
+        else:
+            fit_scan_id = uuid.uuid4()
+        if admit is not None:
+            await admit()
+
+        opportunity = await self.db.get(FundingOpportunity, funding_opportunity_id)
         if not opportunity or not opportunity.is_active or opportunity.is_archived:
             raise NotFoundError(
                 error_code="OPPORTUNITY_NOT_FOUND",
@@ -47,67 +88,88 @@ class FitScanService:
                 status_code=404,
             )
 
-        profile = self._load_profile_or_raise(user.id)
-        status, _, missing_fields = get_completeness(self.db, user.id)
-        if status != "COMPLETE":
+        profile = await self._load_profile_or_raise(user_id)
+        if profile.profile_status != "COMPLETE":
             raise ConflictError(
                 error_code="PROFILE_INCOMPLETE",
                 message="Profile is incomplete",
                 status_code=409,
-                details={"missing_fields": missing_fields},
+                details={"missing_fields": profile.missing_fields},
             )
 
-        enforce_quota(self.db, user.id, UsageActionType.FIT_SCAN.value)
-
+        # A fresh plan claim in the access token avoids the plan lookup.
+        plan_at_time_of_scan = user.fresh_plan_name() or await self.db.run_sync(
+            get_plan_name, user_id
+        )
         prompt_inputs = build_fit_scan_prompt_inputs(profile, opportunity)
-        result_json = self.executor.execute(prompt_inputs)
 
-        fit_summary = result_json["fit_summary"]
-        model_rating = fit_summary["overall_fit_rating"]
-        subscores = fit_summary["subscores"]
-        overall_recommendation = RECOMMENDATION_MAP.get(model_rating)
-        if overall_recommendation is None:
-            raise DomainError(
-                error_code="FIT_SCAN_FAILED",
-                message="Invalid model rating in Fit Scan output",
-                status_code=500,
+        # Hold the quota unit before paying for the LLM call; concurrent requests
+        # from the same user cannot all pass a check made before any is recorded.
+        # The hold must be committed on its own so other requests can see it.
+        async with async_unit_of_work(self.db):
+            reservation = await self.db.run_sync(
+                reserve,
+                user_id,
+                UsageActionType.FIT_SCAN.value,
+                ttl_seconds=get_settings().QUOTA_RESERVATION_TTL_SECONDS,
             )
 
-        plan_at_time_of_scan = _get_plan_name(self.db, user.id)
-        record_usage(
-            self.db,
-            user.id,
-            UsageActionType.FIT_SCAN.value,
-            idempotency_key=str(uuid.uuid4()),
-        )
+        try:
+            result_json = await run_in_threadpool(
+                self.executor.execute,
+                prompt_inputs,
+                plan_name=plan_at_time_of_scan,
+                user_id=user_id,
+            )
 
-        fit_scan = FitScan(
-            user_id=user.id,
-            funding_opportunity_id=opportunity.id,
-            plan_at_time_of_scan=plan_at_time_of_scan,
-            prompt_version=PROMPT_LIBRARY_VERSION,
-            model_rating=model_rating,
-            overall_recommendation=overall_recommendation,
-            subscores=subscores,
-            result_json=result_json,
-        )
-        self.db.add(fit_scan)
+            fit_summary = result_json["fit_summary"]
+            model_rating = fit_summary["overall_fit_rating"]
+            subscores = fit_summary["subscores"]
+            overall_recommendation = RECOMMENDATION_MAP.get(model_rating)
+            if overall_recommendation is None:
+                raise DomainError(
+                    error_code="FIT_SCAN_FAILED",
+                    message="Invalid model rating in Fit Scan output",
+                    status_code=500,
+                )
+        except Exception:
+            await self._release(reservation)
+            raise
 
         try:
-            self.db.commit()
+            async with async_unit_of_work(self.db):
+                recorded = await self.db.run_sync(
+                    commit_reservation, reservation, idempotency_key=f"fit_scan:{fit_scan_id}"
+                )
+                fit_scan = FitScan(
+                    id=fit_scan_id,
+                    user_id=user_id,
+                    funding_opportunity_id=funding_opportunity_id,
+                    plan_at_time_of_scan=plan_at_time_of_scan,
+                    prompt_version=PROMPT_LIBRARY_VERSION,
+                    model_rating=model_rating,
+                    overall_recommendation=overall_recommendation,
+                    subscores=subscores,
+                    result_json=result_json,
+                )
+                if recorded:
+                    self.db.add(fit_scan)
         except Exception as exc:  # pragma: no cover - DB-level failure
-            self.db.rollback()
+            await self._release(reservation)
             raise DomainError(
                 error_code="FIT_SCAN_FAILED",
                 message="Failed to persist Fit Scan",
                 status_code=500,
             ) from exc
 
-        self.db.refresh(fit_scan)
+        if not recorded:
+            # A concurrent request with the same key stored its scan first.
+            replayed = await self.db.get(FitScan, fit_scan_id)
+            return self._replayed(replayed, funding_opportunity_id)
         return fit_scan
 
-    def get_fit_scan(self, *, user, fit_scan_id: uuid.UUID) -> FitScan:
-        fit_scan = self.db.get(FitScan, fit_scan_id)
+    async def get_fit_scan(self, *, user, fit_scan_id: uuid.UUID) -> FitScan:
+        fit_scan = await self.db.get(FitScan, fit_scan_id)
         if not fit_scan:
             raise NotFoundError(
                 error_code="FIT_SCAN_NOT_FOUND",
@@ -122,9 +184,23 @@ class FitScanService:
             )
         return fit_scan
 
-    def _load_profile_or_raise(self, user_id: uuid.UUID) -> NGOProfile:
+    @staticmethod
+    def _replayed(fit_scan: FitScan, funding_opportunity_id: uuid.UUID) -> FitScan:
+        if fit_scan.funding_opportunity_id != funding_opportunity_id:
+            raise ConflictError(
+                error_code="IDEMPOTENCY_KEY_REUSED",
+                message="Idempotency-Key was already used for a different request",
+                status_code=409,
+            )
+        return fit_scan
+
+    async def _release(self, reservation: QuotaReservation) -> None:
+        async with async_unit_of_work(self.db):
+            await self.db.run_sync(release_reservation, reservation)
+
+    async def _load_profile_or_raise(self, user_id: uuid.UUID) -> NGOProfile:
         try:
-            return get_profile(self.db, user_id)
+            return await self.db.run_sync(get_profile, user_id)
         except NotFoundError as exc:
             raise ConflictError(
                 error_code="PROFILE_INCOMPLETE",
@@ -133,7 +209,3 @@ class FitScanService:
                 details={"missing_fields": MISSING_PROFILE_FIELDS},
             ) from exc
 
-
-def _get_plan_name(db: Session, user_id: uuid.UUID) -> str:
-    plan = db.execute(select(UserPlan).where(UserPlan.user_id == user_id)).scalar_one_or_none()
-    return plan.plan_name if plan else "FREE"
@@ -0,0 +1,151 @@
+"""Maintenance for the monthly usage_ledger partitions.
+
+Partitions are named usage_ledger_pYYYY_MM and cover one UTC calendar month.
+Archival folds a partition's per-user counts into usage_archived_totals (so
+lifetime FREE quotas survive the rows leaving the database), detaches it,
+exports it to a gzipped CSV file and finally drops it.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+PARTITION_NAME = re.compile(r"^usage_ledger_p(\d{4})_(\d{2})$")
+MIN_RETAIN_MONTHS = 2
+
+
+@dataclass(frozen=True)
+class LedgerPartition:
+    name: str
+    month_start: date
+    attached: bool
+
+    @property
+    def month_end(self) -> date:
+        return _add_months(self.month_start, 1)
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _parse(name: str, attached: bool) -> LedgerPartition | None:
+    match = PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return LedgerPartition(
+        name=name,
+        month_start=date(int(match.group(1)), int(match.group(2)), 1),
+        attached=attached,
+    )
+
+
+def ensure_partitions(db: Session, *, months_ahead: int = 3) -> int:
+    """Create partitions from the current month through months_ahead; returns how many."""
+    return db.execute(
+        text(
+            "SELECT usage_ledger_ensure_partitions("
+            "now(), now() + make_interval(months => :months_ahead))"
+        ),
+        {"months_ahead": months_ahead},
+    ).scalar_one()
+
+
+def ensure_partitions_between(db: Session, start_at: datetime, end_at: datetime) -> int:
+    """Create any missing partitions for the months spanning start_at..end_at."""
+    return db.execute(
+        text("SELECT usage_ledger_ensure_partitions(:start_at, :end_at)"),
+        {"start_at": start_at, "end_at": end_at},
+    ).scalar_one()
+
+
+def list_partitions(db: Session) -> list[LedgerPartition]:
+    """Attached monthly partitions plus detached ones an interrupted archive left behind."""
+    rows = db.execute(
+        text(
+            """
+            SELECT c.relname AS name, i.inhrelid IS NOT NULL AS attached
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = current_schema()
+            LEFT JOIN pg_inherits i
+                ON i.inhrelid = c.oid AND i.inhparent = 'usage_ledger'::regclass
+            WHERE c.relkind = 'r' AND c.relname LIKE 'usage\\_ledger\\_p%'
+            """
+        )
+    ).all()
+    partitions = [_parse(row.name, row.attached) for row in rows]
+    return sorted((p for p in partitions if p is not None), key=lambda p: p.month_start)
+
+
+def archivable_partitions(
+    db: Session, *, retain_months: int, today: date | None = None
+) -> list[LedgerPartition]:
+    if retain_months < MIN_RETAIN_MONTHS:
+        raise ValueError(f"retain_months must be >= {MIN_RETAIN_MONTHS}")
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = _add_months(today.replace(day=1), -retain_months)
+    return [p for p in list_partitions(db) if p.month_end <= cutoff]
+
+
+def detach_partition(db: Session, partition: LedgerPartition) -> None:
+    """Fold counts into usage_archived_totals, forget idempotency keys and detach.
+
+    All three happen in the caller's transaction so totals are never counted
+    twice or lost.
+    """
+    if not partition.attached:
+        return
+    db.execute(
+        text(
+            f"""
+            INSERT INTO usage_archived_totals (user_id, action_type, archived_count)
+            SELECT user_id, action_type, count(*) FROM {partition.name} GROUP BY 1, 2
+            ON CONFLICT (user_id, action_type) DO UPDATE
+            SET archived_count = usage_archived_totals.archived_count
+                + excluded.archived_count,
+                updated_at = now()
+            """
+        )
+    )
+    db.execute(
+        text(
+            "DELETE FROM usage_idempotency_keys "
+            "WHERE ledger_created_at >= :start AND ledger_created_at < :end"
+        ),
+        {
+            "start": datetime.combine(partition.month_start, datetime.min.time(), timezone.utc),
+            "end": datetime.combine(partition.month_end, datetime.min.time(), timezone.utc),
+        },
+    )
+    db.execute(text(f"ALTER TABLE usage_ledger DETACH PARTITION {partition.name}"))
+
+
+def export_partition(db: Session, partition: LedgerPartition, out_dir: Path) -> Path:
+    """Stream a detached partition to <out_dir>/<name>.csv.gz with COPY."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{partition.name}.csv.gz"
+    tmp_path = path.with_suffix(".gz.tmp")
+    cursor = db.connection().connection.cursor()
+    try:
+        with gzip.open(tmp_path, "wb") as handle:
+            cursor.copy_expert(
+                f"COPY {partition.name} TO STDOUT WITH (FORMAT csv, HEADER true)", handle
+            )
+            handle.flush()
+            os.fsync(handle.fileno())
+    finally:
+        cursor.close()
+    tmp_path.replace(path)
+    return path
+
+
+def drop_partition(db: Session, partition: LedgerPartition) -> None:
+    db.execute(text(f"DROP TABLE {partition.name}"))
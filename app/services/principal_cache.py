@@ -0,0 +1,108 @@
+"""Per-process cache of authenticated principals, keyed by the access token's sub.
+
+A cached principal means the user existed within the last TTL, so authenticated
+requests skip the users lookup. It also holds the user's current plan_version,
+so plan claims in access tokens can be checked for staleness without the DB.
+Logout, user deletion and plan changes drop the entry in this process, and
+again once the writing transaction ends so a concurrent reader cannot re-cache
+pre-commit data; other workers converge within the TTL.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.models.user import User
+from app.models.user_plan import UserPlan
+from app.services.entitlement_cache import EntitlementCache
+from app.services.quota_service import PlanClaims
+
+_DIRTY_KEY = "principal_dirty"
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: uuid.UUID
+    email: str
+    # Current user_plans.plan_version (0 without a plan row); cached with the user.
+    plan_version: int
+    # Plan claims from the request's access token, when it carries them.
+    token_plan: PlanClaims | None = None
+
+    def fresh_plan_name(self) -> str | None:
+        """The token's plan if it still matches the user's plan, else None."""
+        if self.token_plan is None or not self.token_plan.is_fresh(self.plan_version):
+            return None
+        return self.token_plan.plan_name
+
+
+@lru_cache(maxsize=1)
+def get_principal_cache() -> EntitlementCache:
+    return EntitlementCache(ttl_seconds=get_settings().AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def load_principal(db: Session, user_id: uuid.UUID) -> Principal | None:
+    """The principal for user_id, or None if the user no longer exists."""
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is not None:
+        metrics.inc("principal_cache_hits_total", help_text="Authenticated users served from cache")
+        return principal
+    metrics.inc(
+        "principal_cache_misses_total",
+        help_text="Authenticated users loaded from the database",
+    )
+    row = db.execute(
+        select(User.id, User.email, func.coalesce(UserPlan.plan_version, 0))
+        .outerjoin(UserPlan, UserPlan.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    principal = Principal(id=row[0], email=row[1], plan_version=row[2])
+    if user_id not in db.info.get(_DIRTY_KEY, ()):
+        cache.put(user_id, principal)
+    return principal
+
+
+def invalidate_principal(db: Session, user_id: uuid.UUID) -> None:
+    get_principal_cache().invalidate(user_id)
+    db.info.setdefault(_DIRTY_KEY, set()).add(user_id)
+
+
+def _drop_dirty(session: Session) -> None:
+    cache = get_principal_cache()
+    for user_id in session.info.pop(_DIRTY_KEY, ()):
+        cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    _drop_dirty(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    _drop_dirty(session)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_principal(session, target.id)
+
+
+@event.listens_for(UserPlan, "after_insert")
+@event.listens_for(UserPlan, "after_update")
+@event.listens_for(UserPlan, "after_delete")
+def _plan_changed(mapper, connection, target: UserPlan) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_principal(session, target.user_id)
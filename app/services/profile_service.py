@@ -129,8 +129,7 @@ def create_profile(db: Session, user_id: uuid.UUID, payload: NGOProfileCreate) -
         profile.last_completed_at = None
 
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
+    db.flush()
     return profile
 
 
@@ -179,8 +178,7 @@ def update_profile(db: Session, user_id: uuid.UUID, payload: NGOProfileUpdate) -
     if status == "DRAFT":
         profile.last_completed_at = None
 
-    db.commit()
-    db.refresh(profile)
+    db.flush()
     return profile
 
 
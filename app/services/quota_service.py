@@ -1,14 +1,46 @@
 from __future__ import annotations
 
+import csv
+import io
+import json
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-
-from sqlalchemy import func, select
+from typing import Any, Iterable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    MetaData,
+    Table,
+    Text,
+    and_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    null,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable, DropTable
 
 from app.core.errors import ForbiddenError, InvalidActionTypeError
+from app.services.entitlement_cache import cached_usage_state, invalidate_usage_state
+from app.services.ledger_partitions import ensure_partitions_between
+from app.models.usage_archived_total import UsageArchivedTotal
+from app.models.usage_counter import LIFETIME_PERIOD_START, UsageCounter
+from app.models.usage_idempotency_key import UsageIdempotencyKey
 from app.models.usage_ledger import UsageActionType, UsageLedger
+from app.models.usage_reservation import UsageReservation
 from app.models.user_plan import UserPlan
 
 PLAN_FREE = "FREE"
@@ -18,6 +50,26 @@ PLAN_IMPACT = "IMPACT"
 EVENT_FIT_SCAN = "FIT_SCAN"
 EVENT_PROPOSAL = "PROPOSAL"
 
+# Reservation statements chain DML through CTEs, which needs Core tables rather
+# than ORM-enabled DML.
+usage_counters = UsageCounter.__table__
+usage_reservations = UsageReservation.__table__
+usage_ledger = UsageLedger.__table__
+usage_idempotency_keys = UsageIdempotencyKey.__table__
+
+# Per-transaction target for COPY in record_usage_batch.
+usage_ledger_staging = Table(
+    "usage_ledger_staging",
+    MetaData(),
+    Column("user_id", PG_UUID(as_uuid=True), nullable=False),
+    Column("action_type", Text, nullable=False),
+    Column("idempotency_key", Text, nullable=False),
+    Column("metadata", JSONB, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
 
 @dataclass(frozen=True)
 class PlanQuota:
@@ -33,66 +85,213 @@ PLAN_QUOTAS: dict[str, PlanQuota] = {
 }
 
 
+@dataclass(frozen=True)
+class PlanRateLimit:
+    limit: int
+    window_seconds: int
+
+
+# FREE is capped by its lifetime quota instead; see PRICING_AND_ENTITLEMENTS.md.
+PLAN_RATE_LIMITS: dict[tuple[str, str], PlanRateLimit] = {
+    (PLAN_GROWTH, EVENT_FIT_SCAN): PlanRateLimit(limit=3, window_seconds=3600),
+    (PLAN_IMPACT, EVENT_FIT_SCAN): PlanRateLimit(limit=6, window_seconds=3600),
+    (PLAN_GROWTH, EVENT_PROPOSAL): PlanRateLimit(limit=1, window_seconds=600),
+    (PLAN_IMPACT, EVENT_PROPOSAL): PlanRateLimit(limit=1, window_seconds=600),
+}
+
+
+@dataclass(frozen=True)
+class PlanClaims:
+    """Plan state embedded in access tokens; version 0 means no user_plans row."""
+
+    plan_name: str
+    period_end: datetime | None
+    version: int
+
+    def is_fresh(self, current_version: int, now: datetime | None = None) -> bool:
+        if self.version != current_version:
+            return False
+        return self.period_end is None or self.period_end > (now or datetime.now(timezone.utc))
+
+
+@dataclass(frozen=True)
+class QuotaReservation:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    event_type: str
+    period_start: datetime
+
+
+@dataclass(frozen=True)
+class UsageEvent:
+    user_id: uuid.UUID
+    event_type: str
+    idempotency_key: str
+    occurred_at: datetime | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class UsageBatchResult:
+    inserted: int
+    duplicates: int
+
+
 def get_or_create_user_plan(db: Session, user_id: uuid.UUID) -> UserPlan:
     plan = db.execute(select(UserPlan).where(UserPlan.user_id == user_id)).scalar_one_or_none()
     if plan:
         return plan
     plan = UserPlan(user_id=user_id, plan_name=PLAN_FREE)
     db.add(plan)
-    db.commit()
-    db.refresh(plan)
+    db.flush()
     return plan
 
 
-def _ensure_paid_period(plan: UserPlan) -> None:
-    if plan.plan_name == PLAN_FREE:
-        return
-    if plan.current_period_start and plan.current_period_end:
-        return
-    activated_at = plan.plan_activated_at
-    if activated_at.tzinfo is None:
-        activated_at = activated_at.replace(tzinfo=timezone.utc)
-    else:
-        activated_at = activated_at.astimezone(timezone.utc)
-    plan.current_period_start = activated_at
-    plan.current_period_end = activated_at + timedelta(days=30)
-
-
-def _period_payload(plan: UserPlan) -> dict[str, str | None]:
-    if plan.plan_name == PLAN_FREE:
+def _period_payload(
+    plan_name: str, period_start: datetime | None, period_end: datetime | None
+) -> dict[str, str | None]:
+    if plan_name == PLAN_FREE:
         return {
             "type": "LIFETIME",
             "start_at": None,
             "end_at": None,
             "resets_at": None,
         }
-    _ensure_paid_period(plan)
-    start_at = plan.current_period_start
-    end_at = plan.current_period_end
     return {
         "type": "BILLING_CYCLE",
-        "start_at": start_at.isoformat() if start_at else None,
-        "end_at": end_at.isoformat() if end_at else None,
-        "resets_at": end_at.isoformat() if end_at else None,
+        "start_at": period_start.isoformat() if period_start else None,
+        "end_at": period_end.isoformat() if period_end else None,
+        "resets_at": period_end.isoformat() if period_end else None,
     }
 
 
-def _usage_count(
-    db: Session,
-    user_id: uuid.UUID,
-    event_type: str,
-    period_start: datetime | None,
-    period_end: datetime | None,
-) -> int:
-    query = select(func.count()).select_from(UsageLedger).where(
-        UsageLedger.user_id == user_id,
-        UsageLedger.event_type == event_type,
+def _plan_period_columns():
+    """SQL expressions for a user_plans row: (is_paid, period_start, period_end, counter_key).
+
+    Paid plans whose period was never initialised fall back to a 30-day window
+    from activation; FREE (or missing) plans count against the lifetime
+    counter key.
+    """
+    is_paid = and_(UserPlan.plan_name.is_not(None), UserPlan.plan_name != PLAN_FREE)
+    paid_start = func.coalesce(UserPlan.current_period_start, UserPlan.plan_activated_at)
+    paid_end = func.coalesce(
+        UserPlan.current_period_end, UserPlan.plan_activated_at + text("interval '30 days'")
+    )
+    counter_key = case(
+        (is_paid, paid_start),
+        else_=literal(LIFETIME_PERIOD_START, DateTime(timezone=True)),
+    )
+    return is_paid, paid_start, paid_end, counter_key
+
+
+def plan_claims_columns():
+    """plan_name, period_end and plan_version columns for a query outer-joined to user_plans.
+
+    A missing user_plans row reads as FREE, no period end and version 0.
+    """
+    is_paid, _, paid_end, _ = _plan_period_columns()
+    return (
+        func.coalesce(UserPlan.plan_name, PLAN_FREE).label("plan_name"),
+        case((is_paid, paid_end), else_=null()).label("period_end"),
+        func.coalesce(UserPlan.plan_version, 0).label("plan_version"),
+    )
+
+
+def plan_claims_from_row(row: Any) -> PlanClaims:
+    return PlanClaims(plan_name=row.plan_name, period_end=row.period_end, version=row.plan_version)
+
+
+PLAN_CLAIMS_QUERY = select(*plan_claims_columns()).where(
+    UserPlan.user_id == bindparam("user_id", type_=PG_UUID(as_uuid=True))
+)
+
+
+def get_plan_claims(db: Session, user_id: uuid.UUID) -> PlanClaims:
+    """The user's current plan, effective period end and plan_version, for token issuance."""
+    row = db.execute(PLAN_CLAIMS_QUERY, {"user_id": user_id}).first()
+    if row is None:
+        return PlanClaims(plan_name=PLAN_FREE, period_end=None, version=0)
+    return plan_claims_from_row(row)
+
+
+def _build_entitlements_query():
+    """One statement returning plan, effective period bounds and per-action usage.
+
+    Usage comes from usage_counters primary-key lookups, so the cost does not
+    grow with ledger history. Users without a user_plans row resolve to FREE and
+    the read path never has to write.
+    """
+    anchor = select(
+        bindparam("user_id", type_=PG_UUID(as_uuid=True)).label("user_id")
+    ).subquery("anchor")
+    is_paid, paid_start, paid_end, counter_key = _plan_period_columns()
+    return (
+        select(
+            func.coalesce(UserPlan.plan_name, PLAN_FREE).label("plan_name"),
+            case((is_paid, paid_start), else_=null()).label("period_start"),
+            case((is_paid, paid_end), else_=null()).label("period_end"),
+            func.coalesce(
+                func.sum(UsageCounter.used).filter(UsageCounter.action_type == EVENT_FIT_SCAN),
+                0,
+            ).label("fit_scans_used"),
+            func.coalesce(
+                func.sum(UsageCounter.used).filter(UsageCounter.action_type == EVENT_PROPOSAL),
+                0,
+            ).label("proposals_used"),
+        )
+        .select_from(anchor)
+        .outerjoin(UserPlan, UserPlan.user_id == anchor.c.user_id)
+        .outerjoin(
+            UsageCounter,
+            and_(
+                UsageCounter.user_id == anchor.c.user_id,
+                UsageCounter.action_type.in_([EVENT_FIT_SCAN, EVENT_PROPOSAL]),
+                UsageCounter.period_start == counter_key,
+            ),
+        )
+        .group_by(
+            UserPlan.plan_name,
+            UserPlan.current_period_start,
+            UserPlan.current_period_end,
+            UserPlan.plan_activated_at,
+        )
+    )
+
+
+ENTITLEMENTS_QUERY = _build_entitlements_query()
+
+
+def _query_usage_state(db: Session, user_id: uuid.UUID):
+    return db.execute(ENTITLEMENTS_QUERY, {"user_id": user_id}).one()
+
+
+def _load_usage_state(db: Session, user_id: uuid.UUID):
+    return cached_usage_state(db, user_id, _query_usage_state)
+
+
+def get_plan_name(db: Session, user_id: uuid.UUID) -> str:
+    return _load_usage_state(db, user_id).plan_name
+
+
+def _increment_counter(
+    db: Session, user_id: uuid.UUID, event_type: str, period_start: datetime
+) -> None:
+    statement = pg_insert(UsageCounter).values(
+        user_id=user_id,
+        action_type=event_type,
+        period_start=period_start,
+        used=1,
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                UsageCounter.user_id,
+                UsageCounter.action_type,
+                UsageCounter.period_start,
+            ],
+            set_={"used": UsageCounter.used + 1, "updated_at": func.now()},
+        )
     )
-    if period_start:
-        query = query.where(UsageLedger.occurred_at >= period_start)
-    if period_end:
-        query = query.where(UsageLedger.occurred_at < period_end)
-    return int(db.execute(query).scalar_one())
 
 
 def _build_quota_payload(allowed: int, used: int) -> dict[str, int]:
@@ -101,63 +300,119 @@ def _build_quota_payload(allowed: int, used: int) -> dict[str, int]:
 
 
 def get_entitlements(db: Session, user_id: uuid.UUID) -> dict[str, object]:
-    plan = get_or_create_user_plan(db, user_id)
-    quota = PLAN_QUOTAS[plan.plan_name]
-    _ensure_paid_period(plan)
-    if plan.plan_name != PLAN_FREE:
-        db.commit()
-
-    period_start = plan.current_period_start if plan.plan_name != PLAN_FREE else None
-    period_end = plan.current_period_end if plan.plan_name != PLAN_FREE else None
-
-    fit_used = _usage_count(db, user_id, EVENT_FIT_SCAN, period_start, period_end)
-    proposal_used = _usage_count(db, user_id, EVENT_PROPOSAL, period_start, period_end)
-
+    state = _load_usage_state(db, user_id)
+    quota = PLAN_QUOTAS[state.plan_name]
     return {
-        "plan": plan.plan_name,
-        "period": _period_payload(plan),
+        "plan": state.plan_name,
+        "period": _period_payload(state.plan_name, state.period_start, state.period_end),
         "quotas": {
-            "fit_scans": _build_quota_payload(quota.fit_scans, fit_used),
-            "proposals": _build_quota_payload(quota.proposals, proposal_used),
+            "fit_scans": _build_quota_payload(quota.fit_scans, state.fit_scans_used),
+            "proposals": _build_quota_payload(quota.proposals, state.proposals_used),
         },
     }
 
 
-def enforce_quota(db: Session, user_id: uuid.UUID, event_type: str) -> None:
-    plan = get_or_create_user_plan(db, user_id)
-    quota = PLAN_QUOTAS[plan.plan_name]
-    _ensure_paid_period(plan)
-    if plan.plan_name != PLAN_FREE:
-        db.commit()
+def _allowed_and_used(state, event_type: str) -> tuple[int, int]:
+    quota = PLAN_QUOTAS[state.plan_name]
+    if event_type == EVENT_FIT_SCAN:
+        return quota.fit_scans, state.fit_scans_used
+    return quota.proposals, state.proposals_used
+
 
-    period_start = plan.current_period_start if plan.plan_name != PLAN_FREE else None
-    period_end = plan.current_period_end if plan.plan_name != PLAN_FREE else None
+def _quota_exceeded(event_type: str, remaining: int, resets_at: datetime | None) -> ForbiddenError:
+    return ForbiddenError(
+        error_code="QUOTA_EXCEEDED",
+        message="Quota exhausted for this action.",
+        status_code=403,
+        details={
+            "resource": event_type,
+            "remaining": max(remaining, 0),
+            "resets_at": resets_at.isoformat() if resets_at else None,
+        },
+    )
 
-    allowed = quota.fit_scans if event_type == EVENT_FIT_SCAN else quota.proposals
-    used = _usage_count(db, user_id, event_type, period_start, period_end)
+
+def enforce_quota(db: Session, user_id: uuid.UUID, event_type: str) -> None:
+    state = _load_usage_state(db, user_id)
+    allowed, used = _allowed_and_used(state, event_type)
     remaining = allowed - used
     if remaining <= 0:
-        raise ForbiddenError(
-            error_code="QUOTA_EXCEEDED",
-            message="Quota exhausted for this action.",
-            status_code=403,
-            details={
-                "resource": event_type,
-                "remaining": max(remaining, 0),
-                "resets_at": period_end.isoformat() if period_end else None,
-            },
-        )
+        raise _quota_exceeded(event_type, remaining, state.period_end)
 
 
-def record_usage(
+def _insert_ledger_event(
     db: Session,
     user_id: uuid.UUID,
     event_type: str,
+    idempotency_key: str,
     *,
-    idempotency_key: str | None = None,
-) -> UsageLedger:
+    counter_period_start: datetime | None = None,
+) -> bool:
+    """Claim the key and insert the ledger row in one statement; False on a duplicate.
+
+    With counter_period_start the same statement also adds one to that counter,
+    so a duplicate changes nothing.
+    """
+    claimed = (
+        pg_insert(usage_idempotency_keys)
+        .values(
+            idempotency_key=idempotency_key,
+            ledger_id=func.gen_random_uuid(),
+            ledger_created_at=func.now(),
+        )
+        .on_conflict_do_nothing(index_elements=[usage_idempotency_keys.c.idempotency_key])
+        .returning(
+            usage_idempotency_keys.c.idempotency_key,
+            usage_idempotency_keys.c.ledger_id,
+            usage_idempotency_keys.c.ledger_created_at,
+        )
+        .cte("claimed")
+    )
+    inserted = (
+        insert(usage_ledger)
+        .from_select(
+            ["id", "user_id", "action_type", "idempotency_key", "created_at"],
+            select(
+                claimed.c.ledger_id,
+                literal(user_id, PG_UUID(as_uuid=True)),
+                literal(event_type, Text),
+                claimed.c.idempotency_key,
+                claimed.c.ledger_created_at,
+            ),
+        )
+        .returning(usage_ledger.c.id, usage_ledger.c.user_id, usage_ledger.c.action_type)
+        .cte("inserted")
+    )
+    statement = select(inserted.c.id)
+    if counter_period_start is not None:
+        counter = pg_insert(usage_counters).from_select(
+            ["user_id", "action_type", "period_start", "used"],
+            select(
+                inserted.c.user_id,
+                inserted.c.action_type,
+                literal(counter_period_start, DateTime(timezone=True)),
+                literal(1),
+            ),
+        )
+        counted = (
+            counter.on_conflict_do_update(
+                index_elements=[
+                    usage_counters.c.user_id,
+                    usage_counters.c.action_type,
+                    usage_counters.c.period_start,
+                ],
+                set_={"used": usage_counters.c.used + 1, "updated_at": func.now()},
+            )
+            .returning(usage_counters.c.used)
+            .cte("counted")
+        )
+        statement = statement.add_cte(counted)
+    return db.execute(statement).first() is not None
+
+
+def _validate_action_type(event_type: str) -> str:
     try:
-        validated_action = UsageActionType(event_type)
+        return UsageActionType(event_type).value
     except ValueError as exc:
         valid_values = ", ".join(action.value for action in UsageActionType)
         raise InvalidActionTypeError(
@@ -165,30 +420,475 @@ def record_usage(
             f"Valid values: {valid_values}."
         ) from exc
 
-    event_type = validated_action.value
-    if idempotency_key:
-        existing = db.execute(
-            select(UsageLedger).where(
-                UsageLedger.user_id == user_id,
-                UsageLedger.event_type == event_type,
-                UsageLedger.idempotency_key == idempotency_key,
+
+def record_usage(
+    db: Session,
+    user_id: uuid.UUID,
+    event_type: str,
+    *,
+    idempotency_key: str,
+) -> bool:
+    """Record one usage event; returns False if idempotency_key was already recorded.
+
+    Derive the key from the request (e.g. "proposal:<id>") so retries are no-ops.
+    """
+    event_type = _validate_action_type(event_type)
+    state = _load_usage_state(db, user_id)
+    recorded = _insert_ledger_event(
+        db,
+        user_id,
+        event_type,
+        idempotency_key,
+        counter_period_start=state.period_start or LIFETIME_PERIOD_START,
+    )
+    if recorded:
+        invalidate_usage_state(db, user_id)
+    return recorded
+
+
+def _build_batch_insert():
+    """Claim keys, insert ledger rows and bump counters for the staged events.
+
+    Staged rows are deduplicated on idempotency_key first (earliest wins); rows
+    whose key was already recorded are skipped by the key claim. Counters only
+    count events inside the user's current counter period, as the reconcile
+    does. Returns the number of ledger rows inserted.
+    """
+    staging = usage_ledger_staging.c
+    candidates = (
+        select(
+            func.gen_random_uuid().label("id"),
+            staging.user_id,
+            staging.action_type,
+            staging.idempotency_key,
+            staging.metadata,
+            staging.created_at,
+        )
+        .distinct(staging.idempotency_key)
+        .order_by(staging.idempotency_key, staging.created_at)
+        .cte("candidates")
+        .prefix_with("MATERIALIZED")
+    )
+    claimed = (
+        pg_insert(usage_idempotency_keys)
+        .from_select(
+            ["idempotency_key", "ledger_id", "ledger_created_at"],
+            select(candidates.c.idempotency_key, candidates.c.id, candidates.c.created_at),
+        )
+        .on_conflict_do_nothing(index_elements=[usage_idempotency_keys.c.idempotency_key])
+        .returning(usage_idempotency_keys.c.ledger_id)
+        .cte("claimed")
+    )
+    ledger_columns = ["id", "user_id", "action_type", "idempotency_key", "metadata", "created_at"]
+    inserted = (
+        insert(usage_ledger)
+        .from_select(
+            ledger_columns,
+            select(*(candidates.c[name] for name in ledger_columns)).join(
+                claimed, claimed.c.ledger_id == candidates.c.id
+            ),
+        )
+        .returning(usage_ledger.c.user_id, usage_ledger.c.action_type, usage_ledger.c.created_at)
+        .cte("inserted")
+    )
+
+    is_paid, paid_start, paid_end, counter_key = _plan_period_columns()
+    per_counter = (
+        select(
+            inserted.c.user_id,
+            inserted.c.action_type,
+            counter_key.label("period_start"),
+            func.count().label("used"),
+        )
+        .select_from(inserted)
+        .outerjoin(UserPlan, UserPlan.user_id == inserted.c.user_id)
+        .where(
+            or_(
+                ~is_paid,
+                and_(inserted.c.created_at >= paid_start, inserted.c.created_at < paid_end),
             )
-        ).scalar_one_or_none()
-        if existing:
-            return existing
+        )
+        .group_by(inserted.c.user_id, inserted.c.action_type, counter_key)
+    )
+    counters = pg_insert(usage_counters).from_select(
+        ["user_id", "action_type", "period_start", "used"], per_counter
+    )
+    counted = (
+        counters.on_conflict_do_update(
+            index_elements=[
+                usage_counters.c.user_id,
+                usage_counters.c.action_type,
+                usage_counters.c.period_start,
+            ],
+            set_={"used": usage_counters.c.used + counters.excluded.used, "updated_at": func.now()},
+        )
+        .returning(usage_counters.c.user_id)
+        .cte("counted")
+    )
+    return select(select(func.count()).select_from(inserted).scalar_subquery()).add_cte(counted)
+
+
+BATCH_INSERT = _build_batch_insert()
+
+
+def record_usage_batch(db: Session, events: Iterable[UsageEvent]) -> UsageBatchResult:
+    """Record many usage events in the caller's transaction via COPY.
+
+    Events are streamed into a temporary staging table and inserted with one
+    statement; duplicates (within the batch or already recorded) are skipped
+    and counted. Missing ledger partitions for the batch's months are created
+    first, so backfills must not reach into months that were already archived.
+    COPY goes through the psycopg2 cursor: call this on a sync-engine session
+    (scripts), not through `AsyncSession.run_sync`.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    now = datetime.now(timezone.utc)
+    staged = 0
+    earliest = latest = None
+    for usage_event in events:
+        occurred_at = usage_event.occurred_at or now
+        writer.writerow(
+            [
+                str(usage_event.user_id),
+                _validate_action_type(usage_event.event_type),
+                usage_event.idempotency_key,
+                json.dumps(usage_event.metadata),
+                occurred_at.isoformat(),
+            ]
+        )
+        earliest = occurred_at if earliest is None else min(earliest, occurred_at)
+        latest = occurred_at if latest is None else max(latest, occurred_at)
+        staged += 1
+    if not staged:
+        return UsageBatchResult(inserted=0, duplicates=0)
+
+    db.execute(CreateTable(usage_ledger_staging))
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY usage_ledger_staging "
+            "(user_id, action_type, idempotency_key, metadata, created_at) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+    ensure_partitions_between(db, earliest, latest)
+    inserted = db.execute(BATCH_INSERT).scalar_one()
+    db.execute(DropTable(usage_ledger_staging))
+    invalidate_usage_state(db)
+    return UsageBatchResult(inserted=inserted, duplicates=staged - inserted)
+
+
+def reconcile_usage_counters(db: Session, user_id: uuid.UUID | None = None) -> int:
+    """Rebuild usage_counters.used from usage_ledger; returns the number of counter rows.
+
+    Paid plans only need their current period; FREE plans get lifetime totals,
+    including usage_archived_totals for archived partitions. Outstanding
+    reservations are left untouched. Runs under a table lock so concurrent
+    record_usage upserts cannot interleave.
+    """
+    db.execute(text("LOCK TABLE usage_counters IN SHARE ROW EXCLUSIVE MODE"))
+    invalidate_usage_state(db, user_id)
+
+    clear = update(UsageCounter).values(used=0, updated_at=func.now())
+    if user_id is not None:
+        clear = clear.where(UsageCounter.user_id == user_id)
+    db.execute(clear)
+
+    is_paid, paid_start, paid_end, counter_key = _plan_period_columns()
+    aggregated = (
+        select(
+            UsageLedger.user_id,
+            UsageLedger.event_type,
+            counter_key.label("period_start"),
+            func.count().label("used"),
+        )
+        .select_from(UsageLedger)
+        .outerjoin(UserPlan, UserPlan.user_id == UsageLedger.user_id)
+        .where(
+            or_(
+                ~is_paid,
+                and_(UsageLedger.occurred_at >= paid_start, UsageLedger.occurred_at < paid_end),
+            )
+        )
+        .group_by(UsageLedger.user_id, UsageLedger.event_type, counter_key)
+    )
+    if user_id is not None:
+        aggregated = aggregated.where(UsageLedger.user_id == user_id)
 
-    plan = get_or_create_user_plan(db, user_id)
-    _ensure_paid_period(plan)
-    if plan.plan_name != PLAN_FREE:
-        db.commit()
+    statement = pg_insert(UsageCounter).from_select(
+        ["user_id", "action_type", "period_start", "used"], aggregated
+    )
+    result = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                UsageCounter.user_id,
+                UsageCounter.action_type,
+                UsageCounter.period_start,
+            ],
+            set_={"used": statement.excluded.used, "updated_at": func.now()},
+        )
+    )
+
+    # Archived ledger partitions only matter for lifetime (FREE) counters.
+    archived = (
+        select(
+            UsageArchivedTotal.user_id,
+            UsageArchivedTotal.action_type,
+            literal(LIFETIME_PERIOD_START, DateTime(timezone=True)),
+            UsageArchivedTotal.archived_count,
+        )
+        .select_from(UsageArchivedTotal)
+        .outerjoin(UserPlan, UserPlan.user_id == UsageArchivedTotal.user_id)
+        .where(~is_paid)
+    )
+    if user_id is not None:
+        archived = archived.where(UsageArchivedTotal.user_id == user_id)
+    statement = pg_insert(UsageCounter).from_select(
+        ["user_id", "action_type", "period_start", "used"], archived
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                UsageCounter.user_id,
+                UsageCounter.action_type,
+                UsageCounter.period_start,
+            ],
+            set_={"used": UsageCounter.used + statement.excluded.used, "updated_at": func.now()},
+        )
+    )
+    return result.rowcount
 
-    ledger = UsageLedger(
+
+def rollover_expired_periods(
+    db: Session, *, batch_size: int = 5000, now: datetime | None = None
+) -> int:
+    """Advance up to batch_size paid plans whose period ended (or was never set).
+
+    Periods move forward by whole period lengths so the new one contains now;
+    plans without bounds get the same 30-day window the read path assumes, and
+    so do empty or inverted periods (end at or before start), as the 30 days
+    ending at period_end. Usage counters are keyed by period_start, so the new
+    period starts at zero. Returns the number of plans updated; call until it
+    returns 0.
+    """
+    is_paid, paid_start, paid_end, _ = _plan_period_columns()
+    now = now or datetime.now(timezone.utc)
+    due = (
+        select(
+            UserPlan.id,
+            case(
+                (paid_end > paid_start, paid_start),
+                else_=paid_end - text("interval '30 days'"),
+            ).label("period_start"),
+            paid_end.label("period_end"),
+        )
+        .where(
+            is_paid,
+            or_(
+                UserPlan.current_period_start.is_(None),
+                UserPlan.current_period_end.is_(None),
+                UserPlan.current_period_end <= now,
+            ),
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .subquery("due")
+    )
+    length = due.c.period_end - due.c.period_start
+    periods_elapsed = case(
+        (
+            due.c.period_end <= now,
+            func.floor(
+                func.extract("epoch", literal(now, DateTime(timezone=True)) - due.c.period_end)
+                / func.nullif(func.extract("epoch", length), 0)
+            )
+            + 1,
+        ),
+        else_=0,
+    )
+    result = db.execute(
+        update(UserPlan)
+        .where(UserPlan.id == due.c.id)
+        .values(
+            current_period_start=due.c.period_start + length * periods_elapsed,
+            current_period_end=due.c.period_end + length * periods_elapsed,
+            updated_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        invalidate_usage_state(db)
+    return result.rowcount
+
+
+def _try_reserve(
+    db: Session,
+    user_id: uuid.UUID,
+    event_type: str,
+    period_start: datetime,
+    allowed: int,
+    ttl_seconds: int,
+) -> uuid.UUID | None:
+    """Take one unit of quota and record the hold in a single statement.
+
+    The counter upsert only fires while used + reserved < allowed; concurrent
+    callers serialize on the counter row, so at most `allowed` holds succeed.
+    """
+    counter = (
+        pg_insert(usage_counters)
+        .values(
+            user_id=user_id,
+            action_type=event_type,
+            period_start=period_start,
+            used=0,
+            reserved=1,
+        )
+        .on_conflict_do_update(
+            index_elements=[
+                usage_counters.c.user_id,
+                usage_counters.c.action_type,
+                usage_counters.c.period_start,
+            ],
+            set_={"reserved": usage_counters.c.reserved + 1, "updated_at": func.now()},
+            where=usage_counters.c.used + usage_counters.c.reserved < allowed,
+        )
+        .returning(usage_counters.c.user_id, usage_counters.c.action_type, usage_counters.c.period_start)
+        .cte("reserved_counter")
+    )
+    statement = (
+        insert(usage_reservations)
+        .from_select(
+            ["user_id", "action_type", "period_start", "expires_at"],
+            select(
+                counter.c.user_id,
+                counter.c.action_type,
+                counter.c.period_start,
+                func.now() + timedelta(seconds=ttl_seconds),
+            ),
+        )
+        .returning(usage_reservations.c.id)
+    )
+    return db.execute(statement).scalar_one_or_none()
+
+
+def reserve(
+    db: Session, user_id: uuid.UUID, event_type: str, *, ttl_seconds: int
+) -> QuotaReservation:
+    """Hold one unit of quota until commit_reservation or release_reservation.
+
+    The caller must commit before starting the metered work so the hold is
+    visible to concurrent requests. Holds older than ttl_seconds are swept by
+    expire_reservations.
+    """
+    state = _load_usage_state(db, user_id)
+    allowed, used = _allowed_and_used(state, event_type)
+    if used >= allowed:
+        raise _quota_exceeded(event_type, allowed - used, state.period_end)
+
+    period_start = state.period_start or LIFETIME_PERIOD_START
+    reservation_id = _try_reserve(db, user_id, event_type, period_start, allowed, ttl_seconds)
+    if reservation_id is None and expire_reservations(db, user_id=user_id):
+        reservation_id = _try_reserve(
+            db, user_id, event_type, period_start, allowed, ttl_seconds
+        )
+    if reservation_id is None:
+        raise _quota_exceeded(event_type, 0, state.period_end)
+    return QuotaReservation(
+        id=reservation_id,
         user_id=user_id,
         event_type=event_type,
-        occurred_at=datetime.now(timezone.utc),
-        period_start=plan.current_period_start if plan.plan_name != PLAN_FREE else None,
-        period_end=plan.current_period_end if plan.plan_name != PLAN_FREE else None,
-        idempotency_key=idempotency_key,
+        period_start=period_start,
+    )
+
+
+def _settle_reservation(db: Session, reservation: QuotaReservation, *, used_delta: int) -> bool:
+    released = (
+        delete(usage_reservations)
+        .where(usage_reservations.c.id == reservation.id)
+        .returning(usage_reservations.c.id)
+        .cte("released")
+    )
+    statement = (
+        update(usage_counters)
+        .where(
+            usage_counters.c.user_id == reservation.user_id,
+            usage_counters.c.action_type == reservation.event_type,
+            usage_counters.c.period_start == reservation.period_start,
+            select(released.c.id).exists(),
+        )
+        .values(
+            reserved=usage_counters.c.reserved - 1,
+            used=usage_counters.c.used + used_delta,
+            updated_at=func.now(),
+        )
+        .returning(usage_counters.c.used)
+    )
+    return db.execute(statement).first() is not None
+
+
+def commit_reservation(
+    db: Session,
+    reservation: QuotaReservation,
+    *,
+    idempotency_key: str,
+) -> bool:
+    """Convert a hold into recorded usage, in the caller's transaction.
+
+    If idempotency_key was already recorded the hold is released instead and
+    False is returned, so a retried request is never counted twice.
+    """
+    recorded = _insert_ledger_event(
+        db, reservation.user_id, reservation.event_type, idempotency_key
+    )
+    if not recorded:
+        release_reservation(db, reservation)
+        return False
+
+    if not _settle_reservation(db, reservation, used_delta=1):
+        # The hold was swept while the work ran; the work still happened, so count it.
+        _increment_counter(db, reservation.user_id, reservation.event_type, reservation.period_start)
+    invalidate_usage_state(db, reservation.user_id)
+    return True
+
+
+def release_reservation(db: Session, reservation: QuotaReservation) -> None:
+    """Return a hold to the pool after the metered work failed."""
+    _settle_reservation(db, reservation, used_delta=0)
+
+
+def expire_reservations(db: Session, *, user_id: uuid.UUID | None = None) -> int:
+    """Release holds past their expiry; returns how many were released."""
+    expired = delete(usage_reservations).where(usage_reservations.c.expires_at < func.now())
+    if user_id is not None:
+        expired = expired.where(usage_reservations.c.user_id == user_id)
+    expired = expired.returning(
+        usage_reservations.c.user_id, usage_reservations.c.action_type, usage_reservations.c.period_start
+    ).cte("expired")
+    grouped = (
+        select(
+            expired.c.user_id,
+            expired.c.action_type,
+            expired.c.period_start,
+            func.count().label("released"),
+        )
+        .group_by(expired.c.user_id, expired.c.action_type, expired.c.period_start)
+        .subquery("grouped")
+    )
+    statement = (
+        update(usage_counters)
+        .where(
+            usage_counters.c.user_id == grouped.c.user_id,
+            usage_counters.c.action_type == grouped.c.action_type,
+            usage_counters.c.period_start == grouped.c.period_start,
+        )
+        .values(
+            reserved=func.greatest(usage_counters.c.reserved - grouped.c.released, 0),
+            updated_at=func.now(),
+        )
+        .returning(grouped.c.released)
     )
-    db.add(ledger)
-    return ledger
+    return sum(row.released for row in db.execute(statement))
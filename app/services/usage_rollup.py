@@ -0,0 +1,211 @@
+"""Incremental daily rollups of usage_ledger for analytics.
+
+Ledger rows are folded into usage_daily and usage_daily_by_plan in created_at
+order up to a watermark. The watermark trails now() by a settle window because
+created_at is assigned before commit, so a row can become visible after rows
+with a later created_at. Backfills that insert older created_at values are not
+picked up incrementally; rebuild the affected days with rebuild_usage_rollups.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    bindparam,
+    cast,
+    delete,
+    func,
+    null,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.usage_counter import LIFETIME_PERIOD_START
+from app.models.usage_daily import UsageDaily
+from app.models.usage_daily_by_plan import UsageDailyByPlan
+from app.models.usage_ledger import UsageLedger
+from app.models.usage_rollup_watermark import UsageRollupWatermark
+from app.models.user_plan import UserPlan
+from app.services.quota_service import PLAN_FREE
+
+WATERMARK_NAME = "usage_daily"
+DEFAULT_SETTLE_SECONDS = 600
+
+usage_daily = UsageDaily.__table__
+usage_daily_by_plan = UsageDailyByPlan.__table__
+
+
+@dataclass(frozen=True)
+class UsageRollupResult:
+    processed_from: datetime
+    processed_until: datetime
+    ledger_rows: int
+
+
+def _build_apply_range():
+    """Add ledger rows with created_at in [start_at, end_at) to both rollups.
+
+    Plan attribution uses the user's plan when the rollup runs, which trails
+    the event by at most the rollup interval plus the settle window. Returns
+    the number of ledger rows folded in.
+    """
+    day = cast(func.timezone("UTC", UsageLedger.occurred_at), Date)
+    delta = (
+        select(
+            UsageLedger.user_id,
+            UsageLedger.event_type.label("action_type"),
+            day.label("day"),
+            func.coalesce(UserPlan.plan_name, PLAN_FREE).label("plan_name"),
+            func.count().label("n"),
+        )
+        .select_from(UsageLedger)
+        .outerjoin(UserPlan, UserPlan.user_id == UsageLedger.user_id)
+        .where(
+            UsageLedger.occurred_at >= bindparam("start_at", type_=DateTime(timezone=True)),
+            UsageLedger.occurred_at < bindparam("end_at", type_=DateTime(timezone=True)),
+        )
+        .group_by(UsageLedger.user_id, UsageLedger.event_type, day, UserPlan.plan_name)
+        .cte("delta")
+    )
+
+    per_user = pg_insert(usage_daily).from_select(
+        ["user_id", "action_type", "day", "count"],
+        select(delta.c.user_id, delta.c.action_type, delta.c.day, func.sum(delta.c.n)).group_by(
+            delta.c.user_id, delta.c.action_type, delta.c.day
+        ),
+    )
+    per_user = (
+        per_user.on_conflict_do_update(
+            index_elements=[usage_daily.c.user_id, usage_daily.c.action_type, usage_daily.c.day],
+            set_={"count": usage_daily.c.count + per_user.excluded.count},
+        )
+        .returning(usage_daily.c.day)
+        .cte("per_user")
+    )
+
+    per_plan = pg_insert(usage_daily_by_plan).from_select(
+        ["day", "plan_name", "action_type", "count"],
+        select(delta.c.day, delta.c.plan_name, delta.c.action_type, func.sum(delta.c.n)).group_by(
+            delta.c.day, delta.c.plan_name, delta.c.action_type
+        ),
+    )
+    per_plan = (
+        per_plan.on_conflict_do_update(
+            index_elements=[
+                usage_daily_by_plan.c.day,
+                usage_daily_by_plan.c.plan_name,
+                usage_daily_by_plan.c.action_type,
+            ],
+            set_={"count": usage_daily_by_plan.c.count + per_plan.excluded.count},
+        )
+        .returning(usage_daily_by_plan.c.day)
+        .cte("per_plan")
+    )
+    total = cast(func.coalesce(func.sum(delta.c.n), 0), BigInteger)
+    return select(total).add_cte(per_user, per_plan)
+
+
+APPLY_RANGE = _build_apply_range()
+
+
+def _lock_watermark(db: Session) -> datetime:
+    """Return the watermark, row-locked so concurrent rollups serialize."""
+    db.execute(
+        pg_insert(UsageRollupWatermark)
+        .values(name=WATERMARK_NAME, processed_until=LIFETIME_PERIOD_START)
+        .on_conflict_do_nothing(index_elements=[UsageRollupWatermark.name])
+    )
+    return db.execute(
+        select(UsageRollupWatermark.processed_until)
+        .where(UsageRollupWatermark.name == WATERMARK_NAME)
+        .with_for_update()
+    ).scalar_one()
+
+
+def _set_watermark(db: Session, processed_until: datetime) -> None:
+    db.execute(
+        update(UsageRollupWatermark)
+        .where(UsageRollupWatermark.name == WATERMARK_NAME)
+        .values(processed_until=processed_until, updated_at=func.now())
+    )
+
+
+def roll_up_usage(
+    db: Session, *, settle_seconds: int = DEFAULT_SETTLE_SECONDS, now: datetime | None = None
+) -> UsageRollupResult:
+    """Fold ledger rows created since the watermark (minus the settle window)."""
+    watermark = _lock_watermark(db)
+    until = (now or datetime.now(timezone.utc)) - timedelta(seconds=settle_seconds)
+    if until <= watermark:
+        return UsageRollupResult(processed_from=watermark, processed_until=watermark, ledger_rows=0)
+    rows = db.execute(APPLY_RANGE, {"start_at": watermark, "end_at": until}).scalar_one()
+    _set_watermark(db, until)
+    return UsageRollupResult(processed_from=watermark, processed_until=until, ledger_rows=rows)
+
+
+def rebuild_usage_rollups(db: Session, *, since: date) -> UsageRollupResult:
+    """Recompute both rollups from `since` (UTC day) up to the current watermark."""
+    watermark = _lock_watermark(db)
+    start_at = datetime.combine(since, time.min, timezone.utc)
+    db.execute(delete(UsageDaily).where(UsageDaily.day >= since))
+    db.execute(delete(UsageDailyByPlan).where(UsageDailyByPlan.day >= since))
+    rows = 0
+    if start_at < watermark:
+        rows = db.execute(APPLY_RANGE, {"start_at": start_at, "end_at": watermark}).scalar_one()
+    return UsageRollupResult(processed_from=start_at, processed_until=watermark, ledger_rows=rows)
+
+
+def get_rollup_watermark(db: Session) -> datetime | None:
+    return db.execute(
+        select(UsageRollupWatermark.processed_until).where(
+            UsageRollupWatermark.name == WATERMARK_NAME
+        )
+    ).scalar_one_or_none()
+
+
+def usage_timeseries(
+    db: Session,
+    *,
+    start: date,
+    end: date,
+    action_type: str | None = None,
+    plan_name: str | None = None,
+    user_id: uuid.UUID | None = None,
+) -> list[dict[str, object]]:
+    """Daily counts for start..end inclusive, per plan and action type.
+
+    With user_id the series comes from usage_daily for that user and carries no
+    plan breakdown.
+    """
+    if user_id is not None:
+        table = usage_daily
+        plan_column = null().label("plan_name")
+        statement = select(table.c.day, plan_column, table.c.action_type, table.c.count).where(
+            table.c.user_id == user_id
+        )
+    else:
+        table = usage_daily_by_plan
+        statement = select(table.c.day, table.c.plan_name, table.c.action_type, table.c.count)
+        if plan_name is not None:
+            statement = statement.where(table.c.plan_name == plan_name)
+    statement = statement.where(table.c.day >= start, table.c.day <= end).order_by(
+        table.c.day, "plan_name", table.c.action_type
+    )
+    if action_type is not None:
+        statement = statement.where(table.c.action_type == action_type)
+    return [
+        {
+            "day": row.day,
+            "plan_name": row.plan_name,
+            "action_type": row.action_type,
+            "count": row.count,
+        }
+        for row in db.execute(statement)
+    ]
@@ -0,0 +1,456 @@
+"""Load-test the auth endpoints against local stand-ins for Google and Resend.
+
+Usage:
+  python scripts/auth_load_benchmark.py run [--users 500] [--concurrency 16] \
+      [--refreshes 5] [--rate-limit-backend postgres|memory] [--trace-memory] [--out report.json]
+  python scripts/auth_load_benchmark.py cleanup
+
+Run against a local, migrated Postgres (`alembic upgrade head`), never production.
+run serves the API in-process (uvicorn on a free port) with EMAIL_API_BASE_URL,
+GOOGLE_OAUTH_TOKEN_URL and GOOGLE_JWKS_URL pointed at stand-in servers in the same
+process, then drives three phases with --concurrency client threads:
+
+  magic_link  request a link for a new `bench-auth-<n>@bench.invalid` user, wait for
+              the outbox to deliver it to the fake Resend, consume it
+  refresh     rotate each session's refresh token --refreshes times in a row
+  oauth       Google start + callback; the fake token endpoint returns an RS256
+              id_token for the code, verified against the fake JWKS
+
+Each request carries its own X-Forwarded-For address, so auth rate limits apply
+per simulated client as they would in production. The report gives, per
+endpoint: throughput, p50/p95/p99 latency, status codes, and SQL statements per
+request (rate-limiter statements counted separately). It also gives the
+rate-limiter's growth: keys and, with --trace-memory, bytes for the memory
+backend; rows and table size for postgres. Client, server and stand-ins share one
+process, so compare runs with each other rather than with production numbers.
+cleanup deletes bench-auth users, their tokens and outbox rows. Requires DATABASE_URL
+and the app's other required settings.
+"""
+import argparse
+import contextvars
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+BENCH_EMAIL_PATTERN = "bench-auth-%@bench.invalid"
+FAKE_KID = "bench-auth"
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _reply(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+
+class FakeGoogle(_StandIn):
+    """Token endpoint and JWKS. The authorization code is the user's email."""
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def do_GET(self) -> None:
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        self._reply(200, {"keys": [{**jwk, "kid": FAKE_KID, "alg": "RS256", "use": "sig"}]})
+
+    def do_POST(self) -> None:
+        form = parse_qs(self._body().decode("utf-8"))
+        email = form["code"][0]
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": form["client_id"][0],
+            "sub": f"bench-{email}",
+            "email": email,
+            "email_verified": True,
+            "name": "Bench User",
+            "iat": now,
+            "exp": now + 3600,
+        }
+        id_token = jwt.encode(
+            claims, self.private_key, algorithm="RS256", headers={"kid": FAKE_KID}
+        )
+        self._reply(200, {"access_token": "bench", "id_token": id_token, "expires_in": 3600})
+
+
+class FakeResend(_StandIn):
+    """Batch endpoint that hands each login token to whoever waits for that address."""
+
+    inbox: dict[str, tuple[str, float]] = {}
+    delivered = threading.Condition()
+
+    def do_POST(self) -> None:
+        batch = json.loads(self._body())
+        with self.delivered:
+            for message in batch:
+                token = message["text"].rsplit(": ", 1)[-1]
+                self.inbox[message["to"][0]] = (token, time.perf_counter())
+            self.delivered.notify_all()
+        self._reply(200, {"data": [{"id": str(uuid.uuid4())} for _ in batch]})
+
+    @classmethod
+    def wait_for(cls, address: str, timeout: float) -> tuple[str, float]:
+        with cls.delivered:
+            if not cls.delivered.wait_for(lambda: address in cls.inbox, timeout):
+                raise TimeoutError(f"No email for {address} within {timeout}s")
+            return cls.inbox.pop(address)
+
+
+def _serve(handler: type[BaseHTTPRequestHandler]) -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+_route = contextvars.ContextVar("bench_route", default=None)
+
+
+class StatementCounter:
+    """Counts requests and SQL statements per route, tagged by an ASGI wrapper."""
+
+    def __init__(self, app) -> None:
+        self._app = app
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.statements: Counter = Counter()
+        self.limiter_statements: Counter = Counter()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+        token = _route.set(scope["path"])
+        with self._lock:
+            self.requests[scope["path"]] += 1
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            _route.reset(token)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        route = _route.get()
+        if route is None:
+            return
+        with self._lock:
+            if "rate_limit_windows" in statement:
+                self.limiter_statements[route] += 1
+            else:
+                self.statements[route] += 1
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def call(self, name: str, send, *, expect: int = 200) -> httpx.Response:
+        started = time.perf_counter()
+        response = send()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.latencies[name].append(elapsed_ms)
+            self.statuses[name][response.status_code] += 1
+        if response.status_code != expect:
+            raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.latencies[name].append(elapsed_ms)
+
+
+def _summarize(samples_ms: list[float], seconds: float) -> dict[str, float]:
+    # quantiles() needs two points; a single sample is its own percentile.
+    points = samples_ms if len(samples_ms) > 1 else samples_ms * 2
+    percentiles = statistics.quantiles(points, n=100, method="inclusive")
+    return {
+        "requests": len(samples_ms),
+        "per_second": round(len(samples_ms) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentiles[49], 3),
+        "p95_ms": round(percentiles[94], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def _client_ip(n: int) -> str:
+    return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def _limiter_state(backend: str) -> dict[str, Any]:
+    from sqlalchemy import text
+
+    from app.api.dependencies.rate_limit import get_rate_limiter
+    from app.db.session import SessionLocal
+
+    if backend == "memory":
+        state: dict[str, Any] = {"keys": len(get_rate_limiter())}
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(True, "*app/core/rate_limit.py")]
+            )
+            state["bytes"] = sum(stat.size for stat in snapshot.statistics("filename"))
+        return state
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            text(
+                "SELECT count(*) AS keys, pg_total_relation_size('rate_limit_windows') AS bytes "
+                "FROM rate_limit_windows"
+            )
+        ).one()
+    finally:
+        db.close()
+    return {"keys": row.keys, "bytes": row.bytes}
+
+
+def run(args: argparse.Namespace) -> None:
+    google_url = _serve(FakeGoogle)
+    resend_url = _serve(FakeResend)
+    os.environ.update(
+        {
+            "GOOGLE_OAUTH_TOKEN_URL": f"{google_url}/token",
+            "GOOGLE_JWKS_URL": f"{google_url}/certs",
+            "GOOGLE_JWKS_CACHE_PATH": str(Path(tempfile.mkdtemp()) / "jwks.json"),
+            "EMAIL_API_BASE_URL": resend_url,
+            "EMAIL_OUTBOX_DISPATCHER_ENABLED": "true",
+            "AUTH_RATE_LIMIT_ENABLED": "true",
+            "RATE_LIMIT_BACKEND": args.rate_limit_backend,
+        }
+    )
+    if args.trace_memory:
+        tracemalloc.start()
+
+    # The app reads settings at import, so it is imported once the stand-ins are up.
+    import uvicorn
+    from sqlalchemy import event
+
+    from app.db.session import SessionLocal, async_engine
+    from app.main import app
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    counter = StatementCounter(app)
+    # Routes and the Postgres limiter run on the asyncpg engine.
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter.on_execute)
+    server = uvicorn.Server(
+        uvicorn.Config(
+            counter,
+            host="127.0.0.1",
+            port=0,
+            log_level="warning",
+            proxy_headers=True,
+            forwarded_allow_ips="*",
+        )
+    )
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    client = httpx.Client(
+        base_url=f"http://127.0.0.1:{port}",
+        limits=httpx.Limits(
+            max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+        ),
+        timeout=30.0,
+    )
+    limiter_before = _limiter_state(args.rate_limit_backend)
+    phases: dict[str, float] = {}
+
+    def magic_link(n: int) -> str:
+        email = f"bench-auth-{run_id}-{n}@bench.invalid"
+        headers = {"X-Forwarded-For": _client_ip(n)}
+        recorder.call(
+            "magic_link_request",
+            lambda: client.post(
+                "/api/auth/magic-link/request", json={"email": email}, headers=headers
+            ),
+        )
+        requested = time.perf_counter()
+        token, delivered_at = FakeResend.wait_for(email, args.email_timeout)
+        recorder.add("email_delivery", (delivered_at - requested) * 1000)
+        response = recorder.call(
+            "magic_link_consume",
+            lambda: client.post(
+                "/api/auth/magic-link/consume", json={"token": token}, headers=headers
+            ),
+        )
+        return response.json()["refresh_token"]
+
+    def refresh(n: int, refresh_token: str) -> None:
+        for _ in range(args.refreshes):
+            response = recorder.call(
+                "refresh",
+                lambda: client.post(
+                    "/api/auth/refresh",
+                    json={"refresh_token": refresh_token},
+                    headers={"X-Forwarded-For": _client_ip(n)},
+                ),
+            )
+            refresh_token = response.json()["refresh_token"]
+
+    def oauth(n: int) -> None:
+        headers = {"X-Forwarded-For": _client_ip(args.users + n)}
+        code = f"bench-auth-{run_id}-g{n}@bench.invalid"
+        start = recorder.call(
+            "google_start", lambda: client.get("/api/auth/google/start", headers=headers)
+        )
+        query = parse_qs(urlparse(start.json()["authorization_url"]).query)
+        recorder.call(
+            "google_callback",
+            lambda: client.get(
+                "/api/auth/google/callback",
+                params={"code": code, "state": query["state"][0]},
+                headers=headers,
+            ),
+        )
+
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            started = time.perf_counter()
+            sessions = list(pool.map(magic_link, range(args.users)))
+            phases["magic_link"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            list(pool.map(refresh, range(args.users), sessions))
+            phases["refresh"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            list(pool.map(oauth, range(args.users)))
+            phases["oauth"] = time.perf_counter() - started
+        limiter_after = _limiter_state(args.rate_limit_backend)
+    finally:
+        client.close()
+        server.should_exit = True
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter.on_execute)
+
+    phase_of = {
+        "magic_link_request": "magic_link",
+        "email_delivery": "magic_link",
+        "magic_link_consume": "magic_link",
+        "refresh": "refresh",
+        "google_start": "oauth",
+        "google_callback": "oauth",
+    }
+    paths = {
+        "magic_link_request": "/api/auth/magic-link/request",
+        "magic_link_consume": "/api/auth/magic-link/consume",
+        "refresh": "/api/auth/refresh",
+        "google_start": "/api/auth/google/start",
+        "google_callback": "/api/auth/google/callback",
+    }
+    endpoints: dict[str, Any] = {}
+    for name, samples in recorder.latencies.items():
+        summary = _summarize(samples, phases[phase_of[name]])
+        path = paths.get(name)
+        if path:
+            requests = counter.requests[path] or 1
+            summary["statuses"] = dict(recorder.statuses[name])
+            summary["statements_per_request"] = round(counter.statements[path] / requests, 2)
+            summary["limiter_statements_per_request"] = round(
+                counter.limiter_statements[path] / requests, 2
+            )
+        endpoints[name] = summary
+
+    report = {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "rate_limit_backend": args.rate_limit_backend,
+        "phase_seconds": {name: round(seconds, 2) for name, seconds in phases.items()},
+        "endpoints": endpoints,
+        "rate_limiter": {"before": limiter_before, "after": limiter_after},
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+def cleanup(args: argparse.Namespace) -> None:
+    from sqlalchemy import text
+
+    from app.db.session import SessionLocal
+    from app.db.unit_of_work import unit_of_work
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    params = {"pattern": BENCH_EMAIL_PATTERN}
+    try:
+        with unit_of_work(db):
+            links = db.execute(
+                text("DELETE FROM auth_magic_link_tokens WHERE email LIKE :pattern"), params
+            ).rowcount
+            emails = db.execute(
+                text("DELETE FROM email_outbox WHERE to_address LIKE :pattern"), params
+            ).rowcount
+            users = db.execute(text("DELETE FROM users WHERE email LIKE :pattern"), params).rowcount
+    finally:
+        db.close()
+    print(
+        json.dumps(
+            {"users_deleted": users, "magic_links_deleted": links, "emails_deleted": emails}
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Drive the auth endpoints and report")
+    run_parser.add_argument("--users", type=int, default=500)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--refreshes", type=int, default=5)
+    run_parser.add_argument(
+        "--rate-limit-backend", choices=["postgres", "memory"], default="postgres"
+    )
+    run_parser.add_argument("--trace-memory", action="store_true")
+    run_parser.add_argument("--email-timeout", type=float, default=30.0)
+    run_parser.add_argument("--out", default=None)
+    run_parser.set_defaults(handler=run)
+
+    cleanup_parser = subparsers.add_parser("cleanup", help="Delete bench-auth users and tokens")
+    cleanup_parser.set_defaults(handler=cleanup)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Send due email_outbox messages until none are left.
+
+Usage:
+  python scripts/dispatch_email_outbox.py [--batch-size 100]
+
+The API process normally drains the outbox in a background thread; run this when
+EMAIL_OUTBOX_DISPATCHER_ENABLED=false or to flush a backlog. It is safe alongside
+running dispatchers (rows are claimed with SKIP LOCKED). Messages waiting on a
+retry backoff are left for later. Requires DATABASE_URL and the email settings.
+"""
+import argparse
+import json
+import sys
+from dataclasses import asdict, fields
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.integrations.http_clients import close_http_clients  # noqa: E402
+from app.integrations.resend_client import MAX_BATCH_SIZE, ResendClient  # noqa: E402
+from app.services.email_outbox import DispatchResult, dispatch_due_emails  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    sender = ResendClient()
+    totals = {field.name: 0 for field in fields(DispatchResult)}
+    try:
+        while True:
+            result = dispatch_due_emails(db, sender, batch_size=args.batch_size)
+            for name, value in asdict(result).items():
+                totals[name] += value
+            if result.claimed < min(args.batch_size, MAX_BATCH_SIZE):
+                break
+    finally:
+        db.close()
+        close_http_clients()
+    print(json.dumps(totals))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Release quota reservations whose holder never committed or released them.
+
+Usage:
+  python scripts/expire_quota_reservations.py
+
+Safe to run at any interval (e.g. every minute from cron); reserve() also
+sweeps a user's own expired holds before rejecting them. Requires DATABASE_URL.
+"""
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.quota_service import expire_reservations  # noqa: E402
+
+
+def main() -> None:
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    try:
+        released = expire_reservations(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(json.dumps({"released": released}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Bulk-import usage events into usage_ledger.
+
+Usage:
+  python scripts/import_usage_events.py --file events.jsonl [--batch-size 50000]
+  cat events.jsonl | python scripts/import_usage_events.py --file -
+
+Each line is a JSON object with `user_id`, `action_type` and `idempotency_key`, plus
+optional `occurred_at` (ISO 8601, defaults to now) and `metadata`. Every batch is
+committed on its own, so an interrupted import can simply be re-run: events already
+recorded are reported as duplicates. Requires DATABASE_URL.
+"""
+import argparse
+import json
+import sys
+import uuid
+from dataclasses import asdict
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, TextIO
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.db.unit_of_work import unit_of_work  # noqa: E402
+from app.services.quota_service import UsageEvent, record_usage_batch  # noqa: E402
+
+
+def _read_events(handle: TextIO) -> Iterator[UsageEvent]:
+    for line in handle:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        occurred_at = row.get("occurred_at")
+        yield UsageEvent(
+            user_id=uuid.UUID(row["user_id"]),
+            event_type=row["action_type"],
+            idempotency_key=row["idempotency_key"],
+            occurred_at=datetime.fromisoformat(occurred_at) if occurred_at else None,
+            metadata=row.get("metadata") or {},
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", required=True, help="JSONL file, or - for stdin")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    handle = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    db = SessionLocal()
+    totals = {"batches": 0, "inserted": 0, "duplicates": 0}
+    try:
+        events = _read_events(handle)
+        while batch := list(islice(events, args.batch_size)):
+            with unit_of_work(db):
+                result = record_usage_batch(db, batch)
+            totals["batches"] += 1
+            totals["inserted"] += result.inserted
+            totals["duplicates"] += result.duplicates
+            print(json.dumps({"batch": totals["batches"], **asdict(result)}), file=sys.stderr)
+    finally:
+        db.close()
+        if handle is not sys.stdin:
+            handle.close()
+    print(json.dumps(totals))
+
+
+if __name__ == "__main__":
+    main()
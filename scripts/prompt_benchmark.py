@@ -0,0 +1,202 @@
+"""Benchmark Fit Scan prompt changes against a fixed corpus.
+
+Usage:
+  python scripts/prompt_benchmark.py run --corpus corpus.jsonl --cassette-dir DIR \
+      --mode record|replay --out results.jsonl
+  python scripts/prompt_benchmark.py compare BASE.jsonl CANDIDATE.jsonl
+
+Corpus lines are JSON objects with `case_id`, `ngo_profile` and `funding_opportunity`
+(column names as in the DB) plus optional `user_inputs`. Date-derived prompt inputs are
+pinned to `--today` so cassette keys stay stable between runs.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.ai.fit_scan_executor import (  # noqa: E402
+    PROMPT_LIBRARY_VERSION,
+    build_chat_request,
+    parse_fit_scan_response,
+)
+from app.core.errors import DomainError  # noqa: E402
+from app.integrations.llm_scheduler import LLMAdmissionScheduler  # noqa: E402
+from app.integrations.openai_client import OpenAIClient  # noqa: E402
+from app.models.funding_opportunity import FundingOpportunity  # noqa: E402
+from app.models.ngo_profile import NGOProfile  # noqa: E402
+from app.services.fit_scan_prompt_inputs import build_fit_scan_prompt_inputs  # noqa: E402
+
+_DATE_FIELDS = {"application_deadline", "last_verified"}
+_DATETIME_FIELDS = {"created_at", "updated_at", "last_completed_at"}
+
+
+def _coerce_fields(values: dict[str, Any]) -> dict[str, Any]:
+    coerced = dict(values)
+    for name in _DATE_FIELDS & coerced.keys():
+        if isinstance(coerced[name], str):
+            coerced[name] = date.fromisoformat(coerced[name])
+    for name in _DATETIME_FIELDS & coerced.keys():
+        if isinstance(coerced[name], str):
+            coerced[name] = datetime.fromisoformat(coerced[name])
+    return coerced
+
+
+def _load_corpus(path: str) -> list[dict[str, Any]]:
+    cases = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                cases.append(json.loads(line))
+    return cases
+
+
+def _pin_today(prompt_inputs: dict[str, Any], today: date) -> None:
+    inputs = prompt_inputs["prompt_inputs"]
+    derived = inputs["derived"]
+    derived["today_utc_date"] = today.isoformat()
+    deadline = inputs["opportunity"].get("application_deadline")
+    if derived.get("deadline_days_remaining") is not None and deadline:
+        derived["deadline_days_remaining"] = (date.fromisoformat(deadline) - today).days
+
+
+def _run_case(client: OpenAIClient, case: dict[str, Any], today: date) -> dict[str, Any]:
+    profile = NGOProfile(**_coerce_fields(case["ngo_profile"]))
+    opportunity = FundingOpportunity(**_coerce_fields(case["funding_opportunity"]))
+    prompt_inputs = build_fit_scan_prompt_inputs(profile, opportunity, case.get("user_inputs"))
+    _pin_today(prompt_inputs, today)
+
+    started = time.perf_counter()
+    response = client.create_chat_completion(**build_chat_request(prompt_inputs))
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    usage = response.get("usage") or {}
+    error = None
+    try:
+        parse_fit_scan_response(response)
+    except DomainError as exc:
+        error = exc.message
+    return {
+        "case_id": case["case_id"],
+        "prompt_version": PROMPT_LIBRARY_VERSION,
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+        "latency_ms": latency_ms,
+        "valid": error is None,
+        "error": error,
+    }
+
+
+def run(args: argparse.Namespace) -> None:
+    client = OpenAIClient(
+        api_key=os.getenv("OPENAI_API_KEY", ""),
+        scheduler=LLMAdmissionScheduler(
+            max_in_flight=1, max_in_flight_per_user=1, queue_timeout_seconds=600
+        ),
+        cassette_mode=args.mode,
+        cassette_dir=args.cassette_dir,
+        replay_latency=not args.no_replay_latency,
+    )
+    with open(args.out, "w", encoding="utf-8") as out:
+        for case in _load_corpus(args.corpus):
+            result = _run_case(client, case, date.fromisoformat(args.today))
+            out.write(json.dumps(result) + "\n")
+            print(json.dumps(result))
+
+
+def _load_results(path: str) -> dict[str, dict[str, Any]]:
+    return {row["case_id"]: row for row in _load_corpus(path)}
+
+
+def _summarize(rows: list[dict[str, Any]], field: str) -> dict[str, float | None]:
+    values = [row[field] for row in rows if row.get(field) is not None]
+    if not values:
+        return {"mean": None, "p50": None, "max": None}
+    return {
+        "mean": round(statistics.fmean(values), 2),
+        "p50": round(statistics.median(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def _delta(base: float | None, candidate: float | None) -> float | None:
+    if base is None or candidate is None:
+        return None
+    return round(candidate - base, 2)
+
+
+def compare(args: argparse.Namespace) -> None:
+    base = _load_results(args.base)
+    candidate = _load_results(args.candidate)
+    shared = sorted(base.keys() & candidate.keys())
+    base_rows = [base[case_id] for case_id in shared]
+    candidate_rows = [candidate[case_id] for case_id in shared]
+
+    report: dict[str, Any] = {
+        "base_prompt_version": base_rows[0]["prompt_version"] if base_rows else None,
+        "candidate_prompt_version": candidate_rows[0]["prompt_version"]
+        if candidate_rows
+        else None,
+        "cases_compared": len(shared),
+        "cases_only_in_base": sorted(base.keys() - candidate.keys()),
+        "cases_only_in_candidate": sorted(candidate.keys() - base.keys()),
+        "metrics": {},
+    }
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens", "latency_ms"):
+        base_summary = _summarize(base_rows, field)
+        candidate_summary = _summarize(candidate_rows, field)
+        report["metrics"][field] = {
+            "base": base_summary,
+            "candidate": candidate_summary,
+            "delta_mean": _delta(base_summary["mean"], candidate_summary["mean"]),
+            "delta_p50": _delta(base_summary["p50"], candidate_summary["p50"]),
+        }
+
+    base_pass = sum(1 for row in base_rows if row["valid"])
+    candidate_pass = sum(1 for row in candidate_rows if row["valid"])
+    report["validation"] = {
+        "base_passed": base_pass,
+        "candidate_passed": candidate_pass,
+        "delta_passed": candidate_pass - base_pass,
+        "regressions": [
+            case_id
+            for case_id in shared
+            if base[case_id]["valid"] and not candidate[case_id]["valid"]
+        ],
+    }
+    print(json.dumps(report, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the corpus through the Fit Scan prompt")
+    run_parser.add_argument("--corpus", required=True)
+    run_parser.add_argument("--cassette-dir", required=True)
+    run_parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+    run_parser.add_argument("--out", required=True)
+    run_parser.add_argument("--today", default="2026-01-01")
+    run_parser.add_argument("--no-replay-latency", action="store_true")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("candidate")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Benchmark quota checks and usage recording against a synthetic ledger.
+
+Usage:
+  python scripts/quota_benchmark.py seed --users 100000 [--events-per-user 30]
+  python scripts/quota_benchmark.py run [--iterations 2000] [--out report.json]
+  python scripts/quota_benchmark.py cleanup
+
+Run against a local, migrated Postgres (`alembic upgrade head`), never production.
+seed creates users `bench-<n>@bench.invalid` split 80/15/5 across FREE/GROWTH/IMPACT,
+each with an exponentially distributed number of ledger events over the last 13
+months, then rebuilds usage_counters. run times enforce_quota, get_entitlements and
+record_usage for random bench users (p50/p99 in ms, each call in its own session and
+transaction, process cache disabled) and captures EXPLAIN ANALYZE for every statement
+each operation issues. Requires DATABASE_URL.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+# Measure database reads, not the per-process entitlement cache.
+os.environ.setdefault("ENTITLEMENTS_CACHE_TTL_SECONDS", "0")
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.errors import ForbiddenError  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.db.unit_of_work import unit_of_work  # noqa: E402
+from app.services.ledger_partitions import ensure_partitions_between  # noqa: E402
+from app.services.quota_service import (  # noqa: E402
+    EVENT_FIT_SCAN,
+    enforce_quota,
+    get_entitlements,
+    reconcile_usage_counters,
+    record_usage,
+)
+
+BENCH_EMAIL_PATTERN = "bench-%@bench.invalid"
+BENCH_KEY_PREFIX = "bench:"
+
+SEED_USERS = text(
+    """
+    INSERT INTO users (id, email, auth_provider)
+    SELECT gen_random_uuid(), format('bench-%s@bench.invalid', g), 'email'
+    FROM generate_series(:first, :last) AS g
+    ON CONFLICT ON CONSTRAINT uq_users_email DO NOTHING
+    """
+)
+
+# Paid plans were activated up to a year ago and sit in their current 30-day period.
+SEED_PLANS = text(
+    """
+    INSERT INTO user_plans (
+        user_id, plan_name, plan_activated_at, current_period_start, current_period_end
+    )
+    SELECT id, plan_name, activated_at,
+        CASE WHEN plan_name = 'FREE' THEN NULL ELSE period_start END,
+        CASE WHEN plan_name = 'FREE' THEN NULL ELSE period_start + interval '30 days' END
+    FROM (
+        SELECT id, activated_at,
+            CASE WHEN r < 0.80 THEN 'FREE' WHEN r < 0.95 THEN 'GROWTH' ELSE 'IMPACT' END
+                AS plan_name,
+            activated_at + interval '30 days' * floor(
+                extract(epoch FROM now() - activated_at) / extract(epoch FROM interval '30 days')
+            ) AS period_start
+        FROM (
+            SELECT id, random() AS r, now() - random() * interval '365 days' AS activated_at
+            FROM users WHERE email = ANY(:emails)
+        ) AS draws
+    ) AS seeded
+    ON CONFLICT (user_id) DO NOTHING
+    """
+)
+
+# Per-user event counts are exponential around events_per_user; timestamps skew recent.
+SEED_LEDGER = text(
+    """
+    WITH counts AS (
+        SELECT id, floor(-ln(1 - random()) * :events_per_user)::int AS n
+        FROM users WHERE email = ANY(:emails)
+    ),
+    draws AS (
+        SELECT c.id AS user_id, random() AS r, random() AS age
+        FROM counts c CROSS JOIN LATERAL generate_series(1, c.n)
+    ),
+    inserted AS (
+        INSERT INTO usage_ledger (id, user_id, action_type, idempotency_key, created_at)
+        SELECT gen_random_uuid(), user_id,
+            CASE
+                WHEN r < 0.70 THEN 'FIT_SCAN'
+                WHEN r < 0.90 THEN 'PROPOSAL_CREATE'
+                WHEN r < 0.97 THEN 'PROPOSAL_REGEN'
+                ELSE 'DOCX_EXPORT'
+            END,
+            :prefix || gen_random_uuid(),
+            now() - age * age * interval '395 days'
+        FROM draws
+        RETURNING id, idempotency_key, created_at
+    )
+    INSERT INTO usage_idempotency_keys (idempotency_key, ledger_id, ledger_created_at)
+    SELECT idempotency_key, id, created_at FROM inserted
+    """
+)
+
+
+def seed(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    now = datetime.now(timezone.utc)
+    try:
+        with unit_of_work(db):
+            ensure_partitions_between(db, now - timedelta(days=400), now + timedelta(days=90))
+        for first in range(1, args.users + 1, args.chunk_size):
+            last = min(first + args.chunk_size - 1, args.users)
+            emails = [f"bench-{n}@bench.invalid" for n in range(first, last + 1)]
+            started = time.perf_counter()
+            with unit_of_work(db):
+                db.execute(SEED_USERS, {"first": first, "last": last})
+                db.execute(SEED_PLANS, {"emails": emails})
+                events = db.execute(
+                    SEED_LEDGER,
+                    {
+                        "emails": emails,
+                        "events_per_user": args.events_per_user,
+                        "prefix": BENCH_KEY_PREFIX,
+                    },
+                ).rowcount
+            elapsed = round(time.perf_counter() - started, 2)
+            print(json.dumps({"users": f"{first}-{last}", "events": events, "seconds": elapsed}))
+        with unit_of_work(db):
+            counters = reconcile_usage_counters(db)
+            db.execute(text("ANALYZE"))
+    finally:
+        db.close()
+    print(json.dumps({"counters": counters}))
+
+
+def cleanup(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        with unit_of_work(db):
+            keys = db.execute(
+                text("DELETE FROM usage_idempotency_keys WHERE idempotency_key LIKE :prefix"),
+                {"prefix": f"{BENCH_KEY_PREFIX}%"},
+            ).rowcount
+            users = db.execute(
+                text("DELETE FROM users WHERE email LIKE :pattern"),
+                {"pattern": BENCH_EMAIL_PATTERN},
+            ).rowcount
+    finally:
+        db.close()
+    print(json.dumps({"users_deleted": users, "keys_deleted": keys}))
+
+
+def _sample_users(db: Session, size: int) -> list[uuid.UUID]:
+    return list(
+        db.execute(
+            text("SELECT id FROM users WHERE email LIKE :pattern ORDER BY random() LIMIT :size"),
+            {"pattern": BENCH_EMAIL_PATTERN, "size": size},
+        ).scalars()
+    )
+
+
+def _enforce(db: Session, user_id: uuid.UUID) -> None:
+    try:
+        enforce_quota(db, user_id, EVENT_FIT_SCAN)
+    except ForbiddenError:
+        pass
+
+
+def _record(db: Session, user_id: uuid.UUID) -> None:
+    record_usage(
+        db, user_id, "PROPOSAL_CREATE", idempotency_key=f"{BENCH_KEY_PREFIX}{uuid.uuid4()}"
+    )
+
+
+OPERATIONS: dict[str, Callable[[Session, uuid.UUID], Any]] = {
+    "enforce_quota": _enforce,
+    "get_entitlements": get_entitlements,
+    "record_usage": _record,
+}
+
+
+def _summarize(samples_ms: list[float]) -> dict[str, float]:
+    percentiles = statistics.quantiles(samples_ms, n=100, method="inclusive")
+    return {
+        "iterations": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(percentiles[49], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def _time_operation(
+    operation: Callable[[Session, uuid.UUID], Any], users: list[uuid.UUID], iterations: int
+) -> list[float]:
+    samples = []
+    for index in range(iterations):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            with unit_of_work(db):
+                operation(db, users[index % len(users)])
+            samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    return samples
+
+
+def _explain_operation(
+    operation: Callable[[Session, uuid.UUID], Any], user_id: uuid.UUID
+) -> list[dict[str, Any]]:
+    """Capture each statement the operation issues, then EXPLAIN ANALYZE it and roll back."""
+    captured: list[tuple[str, Any]] = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            captured.append((statement, parameters))
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        operation(db, user_id)
+        db.flush()
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+        db.rollback()
+
+    plans = []
+    try:
+        connection = db.connection()
+        for statement, parameters in captured:
+            rows = connection.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+            ).scalars()
+            plans.append({"statement": statement, "plan": list(rows)})
+    finally:
+        db.rollback()
+        db.close()
+    return plans
+
+
+def run(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        users = _sample_users(db, args.sample_users)
+        heaviest = db.execute(
+            text(
+                "SELECT user_id FROM usage_ledger WHERE idempotency_key LIKE :prefix "
+                "GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+            ),
+            {"prefix": f"{BENCH_KEY_PREFIX}%"},
+        ).scalar_one_or_none()
+        ledger_rows = db.execute(text("SELECT count(*) FROM usage_ledger")).scalar_one()
+    finally:
+        db.rollback()
+        db.close()
+    if not users:
+        raise SystemExit("No bench users; run `seed` first")
+
+    report: dict[str, Any] = {
+        "bench_users_sampled": len(users),
+        "ledger_rows": ledger_rows,
+        "operations": {},
+        "explain": {},
+    }
+    for name, operation in OPERATIONS.items():
+        _time_operation(operation, users, min(args.warmup, args.iterations))
+        report["operations"][name] = _summarize(
+            _time_operation(operation, users, args.iterations)
+        )
+        report["explain"][name] = _explain_operation(operation, heaviest or users[0])
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(json.dumps(report["operations"], indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subparsers.add_parser("seed", help="Create bench users, plans and ledger rows")
+    seed_parser.add_argument("--users", type=int, required=True)
+    seed_parser.add_argument("--events-per-user", type=float, default=30.0)
+    seed_parser.add_argument("--chunk-size", type=int, default=5000)
+    seed_parser.set_defaults(handler=seed)
+
+    run_parser = subparsers.add_parser("run", help="Time quota operations and capture plans")
+    run_parser.add_argument("--iterations", type=int, default=2000)
+    run_parser.add_argument("--warmup", type=int, default=100)
+    run_parser.add_argument("--sample-users", type=int, default=1000)
+    run_parser.add_argument("--out", default=None, help="Write the full report (with plans)")
+    run_parser.set_defaults(handler=run)
+
+    cleanup_parser = subparsers.add_parser("cleanup", help="Delete bench users and their data")
+    cleanup_parser.set_defaults(handler=cleanup)
+
+    args = parser.parse_args()
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
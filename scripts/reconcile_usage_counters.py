@@ -0,0 +1,43 @@
+"""Rebuild usage_counters from usage_ledger.
+
+Usage:
+  python scripts/reconcile_usage_counters.py [--user-id UUID]
+
+Run after manual ledger edits or restores, or whenever counters are suspected to
+have drifted. Requires DATABASE_URL.
+"""
+import argparse
+import json
+import sys
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.quota_service import reconcile_usage_counters  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=uuid.UUID, default=None)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    try:
+        rows = reconcile_usage_counters(db, args.user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(json.dumps({"user_id": str(args.user_id) if args.user_id else None, "counters": rows}))
+
+
+if __name__ == "__main__":
+    main()
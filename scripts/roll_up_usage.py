@@ -0,0 +1,59 @@
+"""Fold new usage_ledger rows into the daily usage rollups.
+
+Usage:
+  python scripts/roll_up_usage.py [--settle-seconds 600]
+  python scripts/roll_up_usage.py --since 2026-01-01
+
+Run every few minutes (cron). Rows are rolled up once they are older than the
+settle window. --since recomputes the rollups from that UTC day up to the current
+watermark; use it after backfills or ledger corrections. Requires DATABASE_URL.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.db.unit_of_work import unit_of_work  # noqa: E402
+from app.services.usage_rollup import (  # noqa: E402
+    DEFAULT_SETTLE_SECONDS,
+    rebuild_usage_rollups,
+    roll_up_usage,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--settle-seconds", type=int, default=DEFAULT_SETTLE_SECONDS)
+    parser.add_argument("--since", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    try:
+        with unit_of_work(db):
+            if args.since is not None:
+                result = rebuild_usage_rollups(db, since=args.since)
+            else:
+                result = roll_up_usage(db, settle_seconds=args.settle_seconds)
+    finally:
+        db.close()
+    print(
+        json.dumps(
+            {
+                "processed_from": result.processed_from.isoformat(),
+                "processed_until": result.processed_until.isoformat(),
+                "ledger_rows": result.ledger_rows,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
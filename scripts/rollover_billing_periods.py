@@ -0,0 +1,47 @@
+"""Advance expired paid-plan billing periods.
+
+Usage:
+  python scripts/rollover_billing_periods.py [--batch-size 5000]
+
+Run hourly (cron). Each batch is committed on its own; the script stops when no
+expired period is left. Stripe renewal webhooks remain the source of truth for
+period bounds; this keeps quotas resetting when a webhook is late or missing.
+Requires DATABASE_URL.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.db.unit_of_work import unit_of_work  # noqa: E402
+from app.services.quota_service import rollover_expired_periods  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            with unit_of_work(db):
+                updated = rollover_expired_periods(db, batch_size=args.batch_size)
+            total += updated
+            if updated < args.batch_size:
+                break
+    finally:
+        db.close()
+    print(json.dumps({"rolled_over": total}))
+
+
+if __name__ == "__main__":
+    main()
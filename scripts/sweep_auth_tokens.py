@@ -0,0 +1,51 @@
+"""Delete refresh tokens and magic links that ended before the retention window.
+
+Usage:
+  python scripts/sweep_auth_tokens.py [--batch-size 5000] [--retention-days 7]
+
+Run hourly (cron) unless AUTH_TOKEN_SWEEPER_ENABLED runs the sweeper in the API
+process. Each batch is committed on its own and rows are claimed with SKIP
+LOCKED, so it is safe alongside other sweeps. --retention-days defaults to
+AUTH_TOKEN_RETENTION_DAYS. Requires DATABASE_URL.
+"""
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.auth_service import (  # noqa: E402
+    DEFAULT_SWEEP_BATCH_SIZE,
+    sweep_expired_tokens,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_SWEEP_BATCH_SIZE)
+    parser.add_argument("--retention-days", type=int, default=None)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    retention_days = args.retention_days
+    if retention_days is None:
+        retention_days = get_settings().AUTH_TOKEN_RETENTION_DAYS
+    db = SessionLocal()
+    try:
+        result = sweep_expired_tokens(
+            db, retention_days=retention_days, batch_size=args.batch_size
+        )
+    finally:
+        db.close()
+    print(json.dumps(asdict(result)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Create future usage_ledger partitions and archive old ones.
+
+Usage:
+  python scripts/usage_ledger_maintenance.py ensure-partitions [--months-ahead 3]
+  python scripts/usage_ledger_maintenance.py archive --out-dir DIR [--retain-months 13] [--dry-run]
+
+Run ensure-partitions daily (cron); rows arriving for a month without a partition
+land in usage_ledger_default and are moved when that month's partition is created.
+archive detaches each partition older than the retention window, exports it to
+DIR/<partition>.csv.gz and drops it. Requires DATABASE_URL.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.db.unit_of_work import unit_of_work  # noqa: E402
+from app.services.ledger_partitions import (  # noqa: E402
+    archivable_partitions,
+    detach_partition,
+    drop_partition,
+    ensure_partitions,
+    export_partition,
+)
+
+
+def _ensure(db, args: argparse.Namespace) -> None:
+    with unit_of_work(db):
+        created = ensure_partitions(db, months_ahead=args.months_ahead)
+    print(json.dumps({"created": created}))
+
+
+def _archive(db, args: argparse.Namespace) -> None:
+    with unit_of_work(db):
+        partitions = archivable_partitions(db, retain_months=args.retain_months)
+    for partition in partitions:
+        if args.dry_run:
+            print(json.dumps({"partition": partition.name, "dry_run": True}))
+            continue
+        with unit_of_work(db):
+            detach_partition(db, partition)
+        with unit_of_work(db):
+            path = export_partition(db, partition, Path(args.out_dir))
+        with unit_of_work(db):
+            drop_partition(db, partition)
+        print(json.dumps({"partition": partition.name, "exported_to": str(path)}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ensure_parser = subparsers.add_parser("ensure-partitions")
+    ensure_parser.add_argument("--months-ahead", type=int, default=3)
+    ensure_parser.set_defaults(handler=_ensure)
+
+    archive_parser = subparsers.add_parser("archive")
+    archive_parser.add_argument("--out-dir", required=True)
+    archive_parser.add_argument("--retain-months", type=int, default=13)
+    archive_parser.add_argument("--dry-run", action="store_true")
+    archive_parser.set_defaults(handler=_archive)
+
+    args = parser.parse_args()
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+    db = SessionLocal()
+    try:
+        args.handler(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
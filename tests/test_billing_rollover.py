@@ -0,0 +1,90 @@
+"""Billing-period rollover for paid plans.
+
+Runs against a migrated Postgres database (`alembic upgrade head`) named by
+TEST_DATABASE_URL; skipped otherwise.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.user import User
+from app.models.user_plan import UserPlan
+from app.services import quota_service
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(TEST_DATABASE_URL)
+    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _paid_plan(db, period_start: datetime, period_end: datetime) -> uuid.UUID:
+    user = User(email=f"{uuid.uuid4()}@example.org")
+    db.add(user)
+    db.flush()
+    db.add(
+        UserPlan(
+            user_id=user.id,
+            plan_name=quota_service.PLAN_GROWTH,
+            plan_activated_at=period_start,
+            current_period_start=period_start,
+            current_period_end=period_end,
+        )
+    )
+    db.commit()
+    return user.id
+
+
+def _roll_over_all(db, now: datetime) -> None:
+    # The script calls until 0; a row that never leaves the due set loops forever.
+    for _ in range(100):
+        updated = quota_service.rollover_expired_periods(db, now=now)
+        db.commit()
+        if not updated:
+            return
+    pytest.fail("rollover_expired_periods did not converge")
+
+
+def _period(db, user_id: uuid.UUID) -> tuple[datetime, datetime]:
+    plan = db.execute(select(UserPlan).where(UserPlan.user_id == user_id)).scalar_one()
+    return plan.current_period_start, plan.current_period_end
+
+
+def test_rollover_advances_by_whole_periods(db):
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=75)
+    user_id = _paid_plan(db, start, start + timedelta(days=30))
+
+    _roll_over_all(db, now)
+
+    assert _period(db, user_id) == (start + timedelta(days=60), start + timedelta(days=90))
+
+
+def test_rollover_repairs_empty_and_inverted_periods(db):
+    now = datetime.now(timezone.utc)
+    end = now - timedelta(days=45)
+    empty = _paid_plan(db, end, end)
+    inverted = _paid_plan(db, end + timedelta(days=3), end)
+
+    _roll_over_all(db, now)
+
+    # Both become the 30 days ending at period_end, rolled forward to contain now.
+    for user_id in (empty, inverted):
+        period_start, period_end = _period(db, user_id)
+        assert (period_start, period_end) == (end + timedelta(days=30), end + timedelta(days=60))
+        assert period_start <= now < period_end
@@ -0,0 +1,105 @@
+"""Outbox delivery against a stand-in Resend transport.
+
+Runs against a migrated Postgres database (`alembic upgrade head`) named by
+TEST_DATABASE_URL; skipped otherwise.
+"""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.integrations.resend_client import ResendClient
+from app.models.email_outbox import EmailOutbox
+from app.services.email_outbox import dispatch_due_emails, enqueue_email
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+class _FakeResend:
+    def __init__(self) -> None:
+        self.fail_with: int | None = None
+        self.batches: list[list[dict]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/emails/batch"
+        batch = json.loads(request.content)
+        self.batches.append(batch)
+        if self.fail_with:
+            return httpx.Response(self.fail_with, json={"message": "nope"})
+        if any(item["to"][0].startswith("bad-") for item in batch):
+            return httpx.Response(422, json={"message": "invalid `to`"})
+        return httpx.Response(200, json={"data": [{"id": str(uuid.uuid4())} for _ in batch]})
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(TEST_DATABASE_URL)
+    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _enqueue(db, *addresses, expires_at=None):
+    messages = [
+        enqueue_email(db, to_address=address, subject="Login", body_text="t", expires_at=expires_at)
+        for address in addresses
+    ]
+    db.commit()
+    return [message.id for message in messages]
+
+
+def _statuses(db, ids):
+    db.rollback()
+    rows = db.execute(
+        select(EmailOutbox.id, EmailOutbox.status, EmailOutbox.body_text).where(
+            EmailOutbox.id.in_(ids)
+        )
+    )
+    return {row.id: (row.status, row.body_text) for row in rows}
+
+
+def test_outbox_retries_then_sends_and_isolates_bad_messages(db):
+    fake = _FakeResend()
+    sender = ResendClient(
+        api_key="re_test",
+        base_url="http://resend.local",
+        from_header="GrantPilot <noreply@example.org>",
+        client=httpx.Client(transport=httpx.MockTransport(fake)),
+    )
+    suffix = uuid.uuid4().hex
+    good, bad = _enqueue(db, f"good-{suffix}@example.org", f"bad-{suffix}@example.org")
+    (stale,) = _enqueue(
+        db, f"late-{suffix}@example.org", expires_at=datetime.now(timezone.utc) - timedelta(1)
+    )
+
+    fake.fail_with = 503
+    dispatch_due_emails(db, sender)
+    assert _statuses(db, [good, bad, stale]) == {
+        good: ("PENDING", "t"),
+        bad: ("PENDING", "t"),
+        stale: ("EXPIRED", None),
+    }
+
+    fake.fail_with = None
+    db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_([good, bad]))
+        .values(next_attempt_at=datetime.now(timezone.utc))
+    )
+    db.commit()
+    dispatch_due_emails(db, sender)
+
+    # The 422 for the whole batch is retried per message, so only the bad one fails.
+    assert _statuses(db, [good, bad]) == {good: ("SENT", None), bad: ("FAILED", None)}
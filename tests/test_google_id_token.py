@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.integrations.google_id_token import (
+    IdTokenError,
+    JwksCache,
+    verify_google_id_token,
+)
+
+CLIENT_ID = "client-123.apps.googleusercontent.com"
+JWKS_URL = "http://google.local/oauth2/v3/certs"
+
+
+class _FakeJwks:
+    def __init__(self) -> None:
+        self.keys: dict[str, rsa.RSAPrivateKey] = {}
+        self.requests = 0
+
+    def add_key(self, kid: str) -> None:
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        jwks = {
+            "keys": [
+                {
+                    **json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key())),
+                    "kid": kid,
+                    "alg": "RS256",
+                    "use": "sig",
+                }
+                for kid, key in self.keys.items()
+            ]
+        }
+        return httpx.Response(200, json=jwks, headers={"Cache-Control": "public, max-age=3600"})
+
+    def id_token(self, kid: str, **overrides) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": CLIENT_ID,
+            "sub": "1234567890",
+            "email": "Person@Example.org",
+            "email_verified": True,
+            "iat": now,
+            "exp": now + 3600,
+            **overrides,
+        }
+        return jwt.encode(claims, self.keys[kid], algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture()
+def google():
+    fake = _FakeJwks()
+    fake.add_key("k1")
+    return fake
+
+
+def _cache(google, tmp_path, now=lambda: 1000.0):
+    return JwksCache(
+        JWKS_URL,
+        cache_path=tmp_path / "jwks.json",
+        client=httpx.Client(transport=httpx.MockTransport(google)),
+        clock=now,
+    )
+
+
+def test_verifies_locally_and_reuses_the_disk_cache(google, tmp_path):
+    claims = verify_google_id_token(
+        google.id_token("k1"), client_id=CLIENT_ID, jwks=_cache(google, tmp_path)
+    )
+    assert claims["sub"] == "1234567890"
+    assert claims["email"] == "Person@Example.org"
+
+    # A fresh process within max-age reads the keys from disk, not the network.
+    cache = _cache(google, tmp_path)
+    verify_google_id_token(google.id_token("k1"), client_id=CLIENT_ID, jwks=cache)
+    assert google.requests == 1
+
+
+def test_unknown_kid_refetches_once_per_interval(google, tmp_path):
+    now = [1000.0]
+    cache = _cache(google, tmp_path, now=lambda: now[0])
+    verify_google_id_token(google.id_token("k1"), client_id=CLIENT_ID, jwks=cache)
+
+    google.add_key("k2")
+    now[0] += 120
+    verify_google_id_token(google.id_token("k2"), client_id=CLIENT_ID, jwks=cache)
+    assert google.requests == 2
+
+    with pytest.raises(IdTokenError):
+        cache.get_key("forged")
+    with pytest.raises(IdTokenError):
+        cache.get_key("forged-again")
+    assert google.requests == 2
+
+
+def test_cached_keys_are_served_while_a_refetch_is_in_flight(google, tmp_path):
+    now = [1000.0]
+    fetching, release = threading.Event(), threading.Event()
+
+    def slow_google(request: httpx.Request) -> httpx.Response:
+        if google.requests:
+            fetching.set()
+            assert release.wait(timeout=5)
+        return google(request)
+
+    cache = JwksCache(
+        JWKS_URL,
+        client=httpx.Client(transport=httpx.MockTransport(slow_google)),
+        clock=lambda: now[0],
+    )
+    cache.get_key("k1")
+    now[0] += 7200
+
+    refetch = threading.Thread(target=cache.get_key, args=("k1",))
+    refetch.start()
+    try:
+        assert fetching.wait(timeout=5)
+        # The expired key set is still used, without waiting on the fetch.
+        assert cache.get_key("k1") is not None
+    finally:
+        release.set()
+        refetch.join()
+    assert google.requests == 2
+
+
+def test_rejects_wrong_audience_issuer_and_signature(google, tmp_path):
+    cache = _cache(google, tmp_path)
+    with pytest.raises(IdTokenError):
+        verify_google_id_token(
+            google.id_token("k1", aud="someone-else"), client_id=CLIENT_ID, jwks=cache
+        )
+    with pytest.raises(IdTokenError):
+        verify_google_id_token(
+            google.id_token("k1", iss="https://evil.example"), client_id=CLIENT_ID, jwks=cache
+        )
+    header, payload, _ = google.id_token("k1").split(".")
+    _, _, other_signature = google.id_token("k1", sub="someone-else").split(".")
+    with pytest.raises(IdTokenError):
+        verify_google_id_token(
+            f"{header}.{payload}.{other_signature}", client_id=CLIENT_ID, jwks=cache
+        )
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from app.core.errors import DomainError
+from app.integrations.llm_scheduler import LLMAdmissionScheduler
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+
+def _run_queued(scheduler, plan_name, user_id, order):
+    def _worker():
+        with scheduler.admit(plan_name, user_id):
+            order.append(plan_name)
+
+    thread = threading.Thread(target=_worker)
+    thread.start()
+    return thread
+
+
+def test_paid_plans_are_admitted_before_free_under_contention():
+    scheduler = LLMAdmissionScheduler(
+        max_in_flight=1, max_in_flight_per_user=1, queue_timeout_seconds=2
+    )
+    order: list[str] = []
+
+    with scheduler.admit("FREE", "blocker"):
+        threads = [_run_queued(scheduler, "FREE", "free-user", order)]
+        _wait_for(lambda: scheduler.queue_depth("FREE") == 1)
+        threads.append(_run_queued(scheduler, "IMPACT", "impact-user", order))
+        _wait_for(lambda: scheduler.queue_depth("IMPACT") == 1)
+    for thread in threads:
+        thread.join(2.0)
+
+    assert order == ["IMPACT", "FREE"]
+
+
+def test_per_user_cap_times_out_with_llm_busy():
+    scheduler = LLMAdmissionScheduler(
+        max_in_flight=4, max_in_flight_per_user=1, queue_timeout_seconds=0.05
+    )
+    with scheduler.admit("IMPACT", "same-user"):
+        with pytest.raises(DomainError) as exc:
+            with scheduler.admit("IMPACT", "same-user"):
+                pass
+
+    assert exc.value.error_code == "LLM_BUSY"
+    assert scheduler.in_flight == 0
+    assert scheduler.queue_depth("IMPACT") == 0
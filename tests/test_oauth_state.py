@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from app.api.routes import auth
+from app.core import security
+from app.core.rate_limit import MemorySlidingWindowLimiter
+
+SIGNING_KEY = "k" * 32
+
+
+@pytest.fixture(autouse=True)
+def _settings(monkeypatch):
+    settings = SimpleNamespace(AUTH_JWT_SIGNING_KEY=SIGNING_KEY)
+    monkeypatch.setattr(security, "get_settings", lambda: settings)
+    limiter = MemorySlidingWindowLimiter()
+    monkeypatch.setattr(auth, "get_rate_limiter", lambda: limiter)
+
+
+def _consume(state: str):
+    return asyncio.run(auth._consume_oauth_state(state))
+
+
+def test_state_carries_deep_link_and_is_single_use():
+    state = security.create_oauth_state("/opportunities/42")
+
+    claims = _consume(state)
+    assert claims is not None
+    assert claims["next"] == "/opportunities/42"
+    assert _consume(state) is None
+
+
+def test_state_rejects_tampering_and_other_audiences():
+    state = security.create_oauth_state()
+    assert _consume(state[:-2] + "xx") is None
+
+    access_token = jwt.encode(
+        {"iss": security.JWT_ISSUER, "aud": security.JWT_AUDIENCE, "exp": 2**31, "nonce": "n"},
+        SIGNING_KEY,
+        algorithm="HS256",
+    )
+    assert _consume(access_token) is None
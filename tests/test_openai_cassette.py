@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.integrations import openai_client
+from app.integrations.llm_scheduler import LLMAdmissionScheduler
+from app.integrations.openai_cassette import CassetteMissError
+from app.integrations.openai_client import OpenAIClient
+
+RESPONSE = {"choices": [{"message": {"content": "{}"}}], "usage": {"total_tokens": 7}}
+
+
+def _completion(client: OpenAIClient, content: str) -> dict:
+    return client.create_chat_completion(
+        model="gpt-test",
+        messages=[{"role": "user", "content": content}],
+        response_format={"type": "json_object"},
+        temperature=0,
+        top_p=1,
+        frequency_penalty=0,
+        presence_penalty=0,
+        max_tokens=16,
+    )
+
+
+def _client(mode: str, cassette_dir, handler) -> OpenAIClient:
+    return OpenAIClient(
+        api_key="sk-test",
+        scheduler=LLMAdmissionScheduler(
+            max_in_flight=1, max_in_flight_per_user=1, queue_timeout_seconds=1
+        ),
+        cassette_mode=mode,
+        cassette_dir=str(cassette_dir),
+        replay_latency=False,
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+
+def _offline(request: httpx.Request) -> httpx.Response:
+    raise AssertionError("replay must not reach the network")
+
+
+def test_record_then_replay_and_miss(tmp_path):
+    calls = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json=RESPONSE)
+
+    recorded = _completion(_client("record", tmp_path, upstream), "hello")
+    replayed = _completion(_client("replay", tmp_path, _offline), "hello")
+
+    assert recorded == replayed == RESPONSE
+    assert len(calls) == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    with pytest.raises(CassetteMissError):
+        _completion(_client("replay", tmp_path, _offline), "not recorded")
+
+
+def test_explicit_mode_reads_cassette_dir_from_settings(tmp_path, monkeypatch):
+    settings = SimpleNamespace(
+        OPENAI_API_KEY="sk-unused", OPENAI_CASSETTE_MODE="off", OPENAI_CASSETTE_DIR=str(tmp_path)
+    )
+    monkeypatch.setattr(openai_client, "get_settings", lambda: settings)
+
+    client = OpenAIClient(
+        api_key="sk-test",
+        cassette_mode="replay",
+        replay_latency=False,
+        client=httpx.Client(transport=httpx.MockTransport(_offline)),
+    )
+
+    with pytest.raises(CassetteMissError, match=str(tmp_path)):
+        _completion(client, "hello")
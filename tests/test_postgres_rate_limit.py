@@ -0,0 +1,111 @@
+"""Sliding-window counters in rate_limit_windows.
+
+Runs against a migrated Postgres database (`alembic upgrade head`) named by
+TEST_DATABASE_URL; skipped otherwise.
+"""
+import asyncio
+import os
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import rate_limit
+from app.core.rate_limit import PostgresSlidingWindowLimiter, sliding_window_retry_after
+from app.db.session import async_database_url
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+WINDOW = 3600
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+class _Clock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    clock = _Clock((time.time() // WINDOW) * WINDOW)
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def _hits(limiter, key: str, count: int, *, limit: int = 3):
+    return [limiter.hit(key, limit=limit, window_seconds=WINDOW) for _ in range(count)]
+
+
+def test_allows_up_to_limit_then_denies_with_retry_after(clock):
+    engine = create_engine(TEST_DATABASE_URL)
+    limiter = PostgresSlidingWindowLimiter(engine)
+    key = f"test:{uuid.uuid4()}"
+    try:
+        decisions = _hits(limiter, key, 4)
+    finally:
+        engine.dispose()
+
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    assert decisions[-1].retry_after_seconds == sliding_window_retry_after(
+        previous_count=0, current_count=3, elapsed_fraction=0.0, limit=3, window_seconds=WINDOW
+    )
+
+
+def test_previous_window_count_carries_into_the_next(clock):
+    engine = create_engine(TEST_DATABASE_URL)
+    limiter = PostgresSlidingWindowLimiter(engine)
+    key = f"test:{uuid.uuid4()}"
+    try:
+        _hits(limiter, key, 3)
+        clock.now += WINDOW * 1.5
+        # 3 * 0.5 + 1 <= 3 but not + 2.
+        allowed, denied = _hits(limiter, key, 2)
+    finally:
+        engine.dispose()
+
+    assert allowed.allowed and not denied.allowed
+    assert denied.retry_after_seconds == sliding_window_retry_after(
+        previous_count=3, current_count=1, elapsed_fraction=0.5, limit=3, window_seconds=WINDOW
+    )
+
+
+def test_hit_async_shares_counters_with_hit(clock):
+    key = f"test:{uuid.uuid4()}"
+
+    async def scenario():
+        engine = create_engine(TEST_DATABASE_URL)
+        async_engine = create_async_engine(async_database_url(TEST_DATABASE_URL))
+        limiter = PostgresSlidingWindowLimiter(engine, async_engine=async_engine)
+        try:
+            first = limiter.hit(key, limit=2, window_seconds=WINDOW)
+            second = await limiter.hit_async(key, limit=2, window_seconds=WINDOW)
+            third = await limiter.hit_async(key, limit=2, window_seconds=WINDOW)
+        finally:
+            engine.dispose()
+            await async_engine.dispose()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first.allowed and second.allowed and not third.allowed
+    assert third.retry_after_seconds > 0
+
+
+def test_denied_from_state_rolls_a_stale_row_forward():
+    params = {"window_index": 10, "elapsed_fraction": 0.25, "limit": 3, "window_seconds": 3600}
+    # Stored one window back: its current count is now the previous count.
+    state = SimpleNamespace(window_index=9, current_count=4, previous_count=7)
+
+    decision = rate_limit._denied_from_state(state, params)
+
+    # 4 * (1 - f) + 0 + 1 <= 3 once f >= 0.5.
+    assert not decision.allowed
+    assert decision.retry_after_seconds == 900
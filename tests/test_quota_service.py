@@ -1,9 +1,11 @@
+from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
 
 import pytest
 
 from app.core.errors import ForbiddenError
-from app.services import quota_service
+from app.core.metrics import metrics
+from app.services import entitlement_cache, quota_service
 
 
 def test_build_quota_payload():
@@ -12,23 +14,97 @@ def test_build_quota_payload():
 
 
 def test_enforce_quota_exhausted(monkeypatch):
-    plan = SimpleNamespace(
+    state = SimpleNamespace(
         plan_name=quota_service.PLAN_FREE,
-        current_period_start=None,
-        current_period_end=None,
-        plan_activated_at=None,
+        period_start=None,
+        period_end=None,
+        fit_scans_used=1,
+        proposals_used=0,
     )
 
-    def fake_plan(_db, _user_id):
-        return plan
+    def fake_state(_db, _user_id):
+        return state
 
-    def fake_count(_db, _user_id, _event_type, _start, _end):
-        return 1
-
-    monkeypatch.setattr(quota_service, "get_or_create_user_plan", fake_plan)
-    monkeypatch.setattr(quota_service, "_usage_count", fake_count)
+    monkeypatch.setattr(quota_service, "_load_usage_state", fake_state)
 
     with pytest.raises(ForbiddenError) as exc:
         quota_service.enforce_quota(SimpleNamespace(), "user", quota_service.EVENT_FIT_SCAN)
 
     assert exc.value.error_code == "QUOTA_EXCEEDED"
+
+
+def test_get_entitlements_single_read_without_writes(monkeypatch):
+    row = SimpleNamespace(
+        plan_name=quota_service.PLAN_FREE,
+        period_start=None,
+        period_end=None,
+        fit_scans_used=1,
+        proposals_used=0,
+    )
+    executed = []
+
+    class FakeResult:
+        def one(self):
+            return row
+
+    class FakeSession:
+        def __init__(self) -> None:
+            self.info: dict = {}
+
+        def execute(self, statement, params=None):
+            executed.append(statement)
+            return FakeResult()
+
+        def commit(self):  # pragma: no cover - must not be called
+            raise AssertionError("read path must not commit")
+
+    def process_hits() -> float:
+        hits = metrics.snapshot().get("entitlement_cache_hits_total", {"series": {}})
+        return hits["series"].get("tier=process", 0)
+
+    cache = entitlement_cache.EntitlementCache(ttl_seconds=5)
+    monkeypatch.setattr(entitlement_cache, "get_entitlement_cache", lambda: cache)
+
+    payload = quota_service.get_entitlements(FakeSession(), "user")
+    hits_before = process_hits()
+    # Second read in another request is served by the process tier.
+    quota_service.get_entitlements(FakeSession(), "user")
+
+    assert process_hits() == hits_before + 1
+    assert executed == [quota_service.ENTITLEMENTS_QUERY]
+    assert payload["period"]["type"] == "LIFETIME"
+    assert payload["quotas"]["fit_scans"] == {"allowed": 1, "used": 1, "remaining": 0}
+
+
+def test_reserve_rejects_exhausted_quota_without_holding(monkeypatch):
+    state = SimpleNamespace(
+        plan_name=quota_service.PLAN_GROWTH,
+        period_start=None,
+        period_end=None,
+        fit_scans_used=10,
+        proposals_used=0,
+    )
+    monkeypatch.setattr(quota_service, "_load_usage_state", lambda _db, _user_id: state)
+
+    def fail_reserve(*_args, **_kwargs):  # pragma: no cover - must not be called
+        raise AssertionError("exhausted quota must not take a hold")
+
+    monkeypatch.setattr(quota_service, "_try_reserve", fail_reserve)
+
+    with pytest.raises(ForbiddenError) as exc:
+        quota_service.reserve(
+            SimpleNamespace(), "user", quota_service.EVENT_FIT_SCAN, ttl_seconds=60
+        )
+
+    assert exc.value.error_code == "QUOTA_EXCEEDED"
+    assert exc.value.details["remaining"] == 0
+
+
+def test_plan_claims_go_stale_on_version_or_period_end():
+    now = datetime(2026, 3, 16, tzinfo=timezone.utc)
+    claims = quota_service.PlanClaims(
+        plan_name=quota_service.PLAN_GROWTH, period_end=now + timedelta(days=1), version=3
+    )
+    assert claims.is_fresh(3, now)
+    assert not claims.is_fresh(4, now)
+    assert not claims.is_fresh(3, now + timedelta(days=1))
@@ -0,0 +1,118 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.dependencies import rate_limit as rate_limit_dependency
+from app.core.errors import DomainError
+from app.core.rate_limit import MemorySlidingWindowLimiter, sliding_window_retry_after
+from app.services.principal_cache import Principal
+from app.services.quota_service import EVENT_FIT_SCAN, PLAN_GROWTH, PlanClaims
+
+
+class _Clock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_retry_after_waits_for_next_window_when_current_is_full():
+    # 3/3 used with a third of the hour left: wait out the window, then until
+    # the decaying estimate (3 * (1 - f)) drops to 2.
+    retry_after = sliding_window_retry_after(
+        previous_count=0,
+        current_count=3,
+        elapsed_fraction=2 / 3,
+        limit=3,
+        window_seconds=3600,
+    )
+    assert retry_after == 1200 + 1200
+
+
+def test_retry_after_waits_for_previous_window_to_decay():
+    retry_after = sliding_window_retry_after(
+        previous_count=4,
+        current_count=1,
+        elapsed_fraction=0.25,
+        limit=3,
+        window_seconds=3600,
+    )
+    # 4 * (1 - f) + 1 + 1 <= 3 once f >= 0.75.
+    assert retry_after == 1800
+
+
+def test_memory_limiter_slides_previous_window():
+    clock = _Clock(3600 * 1000.0)
+    limiter = MemorySlidingWindowLimiter(clock=clock)
+    assert [limiter.hit("k", limit=3, window_seconds=3600).allowed for _ in range(4)] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    clock.now += 3600 * 1.5
+    # 3 * 0.5 + 1 <= 3 but not + 2; the second hit fits once 3 * (1 - f) <= 1.
+    assert limiter.hit("k", limit=3, window_seconds=3600).allowed
+    denied = limiter.hit("k", limit=3, window_seconds=3600)
+    assert not denied.allowed
+    assert denied.retry_after_seconds == 600
+
+
+def test_memory_limiter_evicts_idle_and_excess_keys():
+    clock = _Clock(0.0)
+    limiter = MemorySlidingWindowLimiter(max_keys=8, stripes=1, clock=clock)
+    for n in range(20):
+        limiter.hit(f"ip:{n}", limit=5, window_seconds=60)
+    assert len(limiter) == 8
+
+    clock.now += 120
+    limiter.hit("fresh", limit=5, window_seconds=60)
+    assert len(limiter) == 1
+
+
+class _PlanLookupSession:
+    def __init__(self, plan_name: str) -> None:
+        self.plan_name = plan_name
+        self.lookups = 0
+
+    async def run_sync(self, fn, *args):
+        self.lookups += 1
+        return self.plan_name
+
+
+def test_plan_rate_limit_uses_fresh_claim_and_returns_retry_after(monkeypatch):
+    limiter = MemorySlidingWindowLimiter()
+    monkeypatch.setattr(rate_limit_dependency, "get_rate_limiter", lambda: limiter)
+    claims = PlanClaims(
+        plan_name=PLAN_GROWTH,
+        period_end=datetime.now(timezone.utc) + timedelta(days=1),
+        version=2,
+    )
+    user = Principal(id=uuid.uuid4(), email="a@example.org", plan_version=2, token_plan=claims)
+    db = _PlanLookupSession(PLAN_GROWTH)
+
+    def enforce(principal):
+        return asyncio.run(
+            rate_limit_dependency.enforce_plan_rate_limit(db, principal, EVENT_FIT_SCAN)
+        )
+
+    # GROWTH allows three Fit Scans an hour.
+    for _ in range(3):
+        enforce(user)
+    assert db.lookups == 0
+
+    with pytest.raises(DomainError) as exc:
+        enforce(user)
+    assert exc.value.status_code == 429
+    assert exc.value.error_code == "RATE_LIMITED"
+    retry_after = exc.value.details["retry_after_seconds"]
+    assert retry_after > 0
+    assert exc.value.headers == {"Retry-After": str(retry_after)}
+
+    # A stale claim (the plan changed since the token was issued) reads the plan.
+    stale = Principal(id=uuid.uuid4(), email="b@example.org", plan_version=3, token_plan=claims)
+    enforce(stale)
+    assert db.lookups == 1
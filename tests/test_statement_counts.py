@@ -0,0 +1,297 @@
+"""Pin the number of SQL statements and commits on the quota and auth hot paths.
+
+Runs against a migrated Postgres database (`alembic upgrade head`) named by
+TEST_DATABASE_URL; skipped otherwise. Fit scans run on an asyncpg session, as
+the route does; the other paths on the sync session scripts use.
+"""
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import async_database_url
+from app.models.funding_opportunity import FundingOpportunity
+from app.models.ngo_profile import NGOProfile
+from app.models.user import User
+from app.services import auth_service, entitlement_cache, fit_scan_service, principal_cache
+from app.services.principal_cache import Principal
+from app.services.fit_scan_service import FitScanService
+from app.services.quota_service import (
+    PLAN_FREE,
+    PlanClaims,
+    UsageEvent,
+    get_entitlements,
+    record_usage_batch,
+)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+class _Recorder:
+    def __init__(self, engine) -> None:
+        self.statements: list[str] = []
+        self.commits = 0
+        self.attach(engine)
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.commits = 0
+
+
+class _StubExecutor:
+    def execute(self, prompt_inputs, *, plan_name=None, user_id=None):
+        return {
+            "fit_summary": {
+                "overall_fit_rating": "STRONG",
+                "subscores": {"eligibility": 5},
+                "primary_rationale": "stub",
+            },
+            "risk_flags": [],
+        }
+
+
+@pytest.fixture()
+def db_and_recorder():
+    engine = create_engine(TEST_DATABASE_URL)
+    recorder = _Recorder(engine)
+    db = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    try:
+        yield db, recorder
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _run_async(recorder, scenario):
+    """Run scenario(db) on an AsyncSession configured like the app's, recording its SQL."""
+
+    async def main():
+        engine = create_async_engine(async_database_url(TEST_DATABASE_URL))
+        recorder.attach(engine.sync_engine)
+        session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        try:
+            async with session_factory() as db:
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def _seed(db):
+    user = User(email=f"{uuid.uuid4()}@example.org")
+    db.add(user)
+    db.flush()
+    db.add(
+        NGOProfile(
+            user_id=user.id,
+            organization_name="Org",
+            country_of_registration="Kenya",
+            mission_statement="Mission",
+            focus_sectors=["Health"],
+            geographic_areas_of_work=["Kenya"],
+            target_groups=["Youth"],
+            past_projects=[{"title": "Clinic"}],
+            profile_status="COMPLETE",
+            completeness_score=100,
+            missing_fields=[],
+        )
+    )
+    opportunity = FundingOpportunity(
+        source_url="https://example.org/grant",
+        application_url="https://example.org/apply",
+        title="Grant",
+        donor_organization="Donor",
+        funding_type="GRANT",
+        applicant_type="NGO",
+        location_text="Kenya",
+        focus_areas="Health",
+        deadline_type="ROLLING",
+        short_summary="Summary",
+        status="PUBLISHED",
+        requirements_json={},
+    )
+    db.add(opportunity)
+    db.commit()
+    return user, opportunity
+
+
+def test_fit_scan_statement_budget(db_and_recorder, monkeypatch):
+    db, recorder = db_and_recorder
+    user, opportunity = _seed(db)
+    # The principal as get_current_principal would return it for a fresh FREE token.
+    user = Principal(
+        id=user.id,
+        email=user.email,
+        plan_version=0,
+        token_plan=PlanClaims(plan_name=PLAN_FREE, period_end=None, version=0),
+    )
+    opportunity_id = opportunity.id
+    monkeypatch.setattr(fit_scan_service, "FitScanExecutor", _StubExecutor)
+    monkeypatch.setattr(
+        fit_scan_service, "get_plan_name", lambda *_: pytest.fail("plan lookup with a fresh claim")
+    )
+    monkeypatch.setattr(
+        fit_scan_service,
+        "get_settings",
+        lambda: SimpleNamespace(QUOTA_RESERVATION_TTL_SECONDS=300),
+    )
+    cache = entitlement_cache.EntitlementCache(ttl_seconds=5)
+    monkeypatch.setattr(entitlement_cache, "get_entitlement_cache", lambda: cache)
+
+    async def scenario(adb):
+        recorder.reset()
+        await FitScanService(adb).run_fit_scan(user=user, funding_opportunity_id=opportunity_id)
+
+        # Reservation and result are two write transactions: the hold must be
+        # visible to concurrent requests before the LLM call starts.
+        assert recorder.commits == 2
+        # The plan comes from the token claim; the one usage-state read is reserve's.
+        assert len(recorder.statements) == 7, recorder.statements
+
+        # The commit invalidated the cached state, so this read goes to the database once.
+        recorder.reset()
+        await adb.run_sync(get_entitlements, user.id)
+        entitlements = await adb.run_sync(get_entitlements, user.id)
+        assert len(recorder.statements) == 1
+        assert entitlements["quotas"]["fit_scans"]["used"] == 1
+
+    _run_async(recorder, scenario)
+
+
+def test_record_usage_batch_statement_budget(db_and_recorder, monkeypatch):
+    db, recorder = db_and_recorder
+    user, _ = _seed(db)
+    cache = entitlement_cache.EntitlementCache(ttl_seconds=5)
+    monkeypatch.setattr(entitlement_cache, "get_entitlement_cache", lambda: cache)
+    keys = [f"batch-{uuid.uuid4()}" for _ in range(3)]
+    events = [
+        UsageEvent(user_id=user.id, event_type="PROPOSAL_CREATE", idempotency_key=key)
+        for key in keys + keys[:1]
+    ]
+    recorder.reset()
+
+    result = record_usage_batch(db, events)
+    db.commit()
+
+    # CREATE staging, ensure partitions, the insert, DROP staging; COPY bypasses the hooks.
+    assert len(recorder.statements) == 4, recorder.statements
+    assert (result.inserted, result.duplicates) == (3, 1)
+    assert record_usage_batch(db, events[:2]).duplicates == 2
+
+
+def test_fit_scan_replay_with_idempotency_key(db_and_recorder, monkeypatch):
+    db, recorder = db_and_recorder
+    user, opportunity = _seed(db)
+    user = Principal(id=user.id, email=user.email, plan_version=0)
+    opportunity_id = opportunity.id
+    monkeypatch.setattr(fit_scan_service, "FitScanExecutor", _StubExecutor)
+    monkeypatch.setattr(
+        fit_scan_service,
+        "get_settings",
+        lambda: SimpleNamespace(QUOTA_RESERVATION_TTL_SECONDS=300),
+    )
+    cache = entitlement_cache.EntitlementCache(ttl_seconds=5)
+    monkeypatch.setattr(entitlement_cache, "get_entitlement_cache", lambda: cache)
+
+    admitted = []
+
+    async def admit():
+        admitted.append(True)
+
+    async def scenario(adb):
+        first = await FitScanService(adb).run_fit_scan(
+            user=user,
+            funding_opportunity_id=opportunity_id,
+            idempotency_key="retry-1",
+            admit=admit,
+        )
+        # The replay is a new request, with its own session.
+        adb.expunge_all()
+        recorder.reset()
+
+        # The Free plan's single scan is used up; a replay must not need quota
+        # or spend plan rate-limit budget.
+        replay = await FitScanService(adb).run_fit_scan(
+            user=user,
+            funding_opportunity_id=opportunity_id,
+            idempotency_key="retry-1",
+            admit=admit,
+        )
+
+        assert replay.id == first.id
+        assert admitted == [True]
+        assert len(recorder.statements) == 1
+        entitlements = await adb.run_sync(get_entitlements, user.id)
+        assert entitlements["quotas"]["fit_scans"]["used"] == 1
+
+    _run_async(recorder, scenario)
+
+
+def test_cached_principal_skips_users_lookup(db_and_recorder, monkeypatch):
+    db, recorder = db_and_recorder
+    user, _ = _seed(db)
+    user_id = user.id
+    cache = entitlement_cache.EntitlementCache(ttl_seconds=30)
+    monkeypatch.setattr(principal_cache, "get_principal_cache", lambda: cache)
+    recorder.reset()
+
+    assert principal_cache.load_principal(db, user_id).id == user_id
+    assert principal_cache.load_principal(db, user_id).id == user_id
+    assert len(recorder.statements) == 1
+
+    # Logout invalidates; the next request re-checks the user once.
+    principal_cache.invalidate_principal(db, user_id)
+    db.commit()
+    recorder.reset()
+    principal_cache.load_principal(db, user_id)
+    assert len(recorder.statements) == 1
+
+
+def test_login_and_refresh_are_one_statement_each(db_and_recorder, monkeypatch):
+    db, recorder = db_and_recorder
+    monkeypatch.setattr(
+        auth_service, "get_settings", lambda: SimpleNamespace(AUTH_REFRESH_TOKEN_TTL_DAYS=30)
+    )
+    email = f"{uuid.uuid4()}@example.org"
+    recorder.reset()
+
+    login = auth_service.login_user(db, email=email, auth_provider="email")
+    db.commit()
+    assert len(recorder.statements) == 1, recorder.statements
+
+    # A returning user: the upsert takes the conflict path and revokes the old session.
+    recorder.reset()
+    again = auth_service.login_user(db, email=email, auth_provider="google", full_name="Ada")
+    db.commit()
+    assert len(recorder.statements) == 1
+    assert (again.user_id, again.full_name) == (login.user_id, "Ada")
+
+    recorder.reset()
+    rotation = auth_service.rotate_refresh_token(db, again.refresh_token)
+    db.commit()
+    assert len(recorder.statements) == 1
+    assert rotation.user_id == login.user_id and rotation.refresh_token
+
+    assert auth_service.rotate_refresh_token(db, login.refresh_token).refresh_token is None
+    assert auth_service.rotate_refresh_token(db, again.refresh_token).revoked_at is not None
+    assert auth_service.rotate_refresh_token(db, rotation.refresh_token).refresh_token
@@ -0,0 +1,73 @@
+"""Token sweeper retention and batching.
+
+Runs against a migrated Postgres database (`alembic upgrade head`) named by
+TEST_DATABASE_URL; skipped otherwise.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models.auth_magic_link_token import AuthMagicLinkToken
+from app.models.auth_refresh_token import AuthRefreshToken
+from app.services import auth_service
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(
+        auth_service, "get_settings", lambda: SimpleNamespace(AUTH_REFRESH_TOKEN_TTL_DAYS=30)
+    )
+    engine = create_engine(TEST_DATABASE_URL)
+    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_sweep_deletes_tokens_past_retention_only(db):
+    now = datetime.now(timezone.utc)
+    email = f"{uuid.uuid4()}@example.org"
+    first = auth_service.login_user(db, email=email, auth_provider="email", now=now)
+    db.commit()
+    # Rotation leaves the first token revoked, pointing at the second.
+    second = auth_service.rotate_refresh_token(db, first.refresh_token, now=now)
+    third = auth_service.rotate_refresh_token(db, second.refresh_token, now=now)
+    magic_link_hash = uuid.uuid4().hex
+    db.add(
+        AuthMagicLinkToken(
+            email=email, token_hash=magic_link_hash, expires_at=now - timedelta(days=10)
+        )
+    )
+    user_tokens = AuthRefreshToken.user_id == first.user_id
+    # Both rotated-out tokens were revoked ten days ago; the third is still active.
+    db.execute(
+        update(AuthRefreshToken)
+        .where(user_tokens, AuthRefreshToken.revoked_at.is_not(None))
+        .values(revoked_at=now - timedelta(days=10))
+    )
+    db.commit()
+
+    auth_service.sweep_expired_tokens(db, retention_days=30, batch_size=1)
+    assert len(db.execute(select(AuthRefreshToken.id).where(user_tokens)).all()) == 3
+
+    swept = auth_service.sweep_expired_tokens(db, retention_days=7, batch_size=1)
+    assert swept.refresh_tokens >= 2 and swept.magic_links >= 1
+    assert db.execute(
+        select(AuthMagicLinkToken.id).where(AuthMagicLinkToken.token_hash == magic_link_hash)
+    ).first() is None
+    remaining = db.execute(select(AuthRefreshToken.revoked_at).where(user_tokens)).all()
+    assert remaining == [(None,)]
+    assert auth_service.rotate_refresh_token(db, third.refresh_token).refresh_token